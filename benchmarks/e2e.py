@@ -0,0 +1,201 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BENCHMARK_MODULES = ['claim_starknet', 'transfer_strk', 'collect_from_sub_okx', 'collect_from_sub_binance']
+
+
+def get_synthetic_wallets(count: int, seed: int) -> tuple[list, list]:
+    generator = random.Random(seed)
+    account_names = [f'Bench-{index}' for index in range(1, count + 1)]
+    private_keys = [hex(generator.randint(1, 2 ** 250)) for _ in range(count)]
+    return account_names, private_keys
+
+
+def get_starknet_addresses(private_keys: list) -> list:
+    from starknet_py.net.signer.stark_curve_signer import KeyPair
+    from modules.stark_client import StarknetClient
+
+    return [StarknetClient.get_argent_address(KeyPair.from_private_key(private_key), 1)
+            for private_key in private_keys]
+
+
+def prepare_work_path(work_path: str, account_names: list, addresses: list, route: list, cold: bool):
+    for folder in ('data/services', 'data/logs', 'data/provision_data/starknet'):
+        os.makedirs(os.path.join(work_path, folder), exist_ok=True)
+
+    def save_json(file_path: str, data):
+        with open(os.path.join(work_path, file_path), 'w') as file:
+            json.dump(data, file)
+
+    save_json('data/services/wallets_progress.json', {
+        account_name: {'current_step': 0, 'route': route} for account_name in account_names
+    })
+    save_json('data/services/cex_withdraw_list.json', {
+        account_name: hex(random.getrandbits(250) | 1) for account_name in account_names
+    })
+
+    eligibles = [
+        {'identity': hex(address), 'amount': '100.5', 'merkle_index': str(index),
+         'merkle_path': [hex(random.getrandbits(250) | 1) for _ in range(17)]}
+        for index, address in enumerate(addresses)
+    ]
+    for file_index in range(11):
+        save_json(f'data/provision_data/starknet/starknet-{file_index}.json',
+                  {'eligibles': eligibles if file_index == 0 else []})
+
+    if not cold:
+        save_json('data/services/stark_data.json', {
+            account_name: {'address': address, 'wallet_type': 0}
+            for account_name, address in zip(account_names, addresses)
+        })
+
+
+def patch_endpoints(urls: dict, retry_sleep: int, quiet: bool):
+    import utils.tools
+    import utils.networks
+    import modules.interfaces
+    from modules.cexs.okx import OKX
+    from modules.cexs.binance import Binance
+    from utils.gas_oracle import StarknetGasOracle
+
+    for network in vars(utils.networks).values():
+        if isinstance(network, utils.networks.Network):
+            network.rpc = [urls['starknet'] if network is utils.networks.StarknetRPC else urls['evm']]
+
+    OKX.api_url = urls['okx']
+    Binance.api_url = urls['binance']
+    StarknetGasOracle.feeder_url = urls['feeder']
+    utils.tools.SLEEP_TIME_RETRY = (retry_sleep, retry_sleep)
+
+    if quiet:
+        modules.interfaces.stderr = open(os.devnull, 'w')
+
+
+def get_peak_memory_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def get_server_stats(stats_url: str) -> dict:
+    from aiohttp import ClientSession
+
+    async with ClientSession() as session:
+        async with session.get(stats_url) as response:
+            return await response.json()
+
+
+async def run_benchmark(accounts_in_stream: int, stats_url: str) -> dict:
+    from benchmarks.signing_lag import measure_loop_lag
+    from utils.events_summary import percentile
+    from utils.modules_runner import Runner
+    from utils.signing import shutdown_signing_pools
+
+    stop_event = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop_event, interval=0.01))
+
+    start_time = time.perf_counter()
+    results = await Runner(wallets_to_work=0, accounts_in_stream=accounts_in_stream, processes=1).run_accounts()
+    duration = time.perf_counter() - start_time
+
+    stop_event.set()
+    lags = await lag_task
+    shutdown_signing_pools()
+
+    stats = await get_server_stats(stats_url)
+    completed = sum(1 for result in results.values() if result)
+    rpc_calls = sum(count for name, count in stats['requests'].items() if ' ' not in name)
+    cex_calls = sum(count for name, count in stats['requests'].items() if ' ' in name)
+
+    return {
+        'accounts': len(results),
+        'completed': completed,
+        'duration': duration,
+        'accounts_per_minute': completed / duration * 60 if duration else 0.0,
+        'rpc_calls_per_account': rpc_calls / max(len(results), 1),
+        'cex_calls_per_account': cex_calls / max(len(results), 1),
+        'server_errors': sum(stats['errors'].values()),
+        'peak_memory_mb': get_peak_memory_mb(),
+        'lag_p50_ms': percentile(lags, 50) * 1000,
+        'lag_p99_ms': percentile(lags, 99) * 1000,
+        'lag_max_ms': max(lags, default=0.0) * 1000,
+        'requests': stats['requests'],
+    }
+
+
+def print_result(result: dict, verbose: bool):
+    peak_memory = result['peak_memory_mb']
+    print(f"Accounts: {result['completed']}/{result['accounts']} completed in {result['duration']:.1f} s | "
+          f"{result['accounts_per_minute']:.1f} accounts/min")
+    print(f"Calls per account: RPC {result['rpc_calls_per_account']:.1f}, CEX {result['cex_calls_per_account']:.1f} | "
+          f"injected errors: {result['server_errors']}")
+    print(f"Peak memory: {'n/a' if peak_memory is None else f'{peak_memory:.0f} MB'} | "
+          f"loop lag p50 {result['lag_p50_ms']:.2f} ms, p99 {result['lag_p99_ms']:.2f} ms, "
+          f"max {result['lag_max_ms']:.2f} ms")
+
+    if verbose:
+        for name, count in sorted(result['requests'].items(), key=lambda item: item[1], reverse=True):
+            print(f'{name:<50} {count:>8}')
+
+
+def main(args: list = None):
+    parser = argparse.ArgumentParser(description='End-to-end Runner throughput against local RPC and CEX stand-ins')
+    parser.add_argument('--wallets', type=int, default=1000, help='synthetic wallets to run')
+    parser.add_argument('--accounts-in-stream', type=int, default=250)
+    parser.add_argument('--route', nargs='+', default=['claim_starknet', 'transfer_strk'], choices=BENCHMARK_MODULES)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every server response')
+    parser.add_argument('--jitter', type=float, default=0.02, help='random +/- seconds around latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of failed server responses, 0..1')
+    parser.add_argument('--subaccounts', type=int, default=20, help='CEX subaccounts with balance')
+    parser.add_argument('--retry-sleep', type=int, default=1, help='SLEEP_TIME_RETRY override, seconds')
+    parser.add_argument('--cold', action='store_true', help='do not precompute stark_data.json addresses')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--work-path', help='folder for data/ of the run, temporary by default')
+    parser.add_argument('--quiet', action='store_true', help='hide human logs from the console')
+    parser.add_argument('--save', help='save results to json file')
+    parser.add_argument('--verbose', action='store_true', help='show requests per method')
+    options = parser.parse_args(args)
+
+    if ROOT_PATH not in sys.path:
+        sys.path.insert(0, ROOT_PATH)
+
+    from benchmarks.fake_servers import start_servers
+
+    save_path = os.path.abspath(options.save) if options.save else None
+    server_process, urls = start_servers(options.latency, options.jitter, options.error_rate, options.subaccounts)
+    try:
+        work_path = os.path.abspath(options.work_path or tempfile.mkdtemp(prefix='starkclaimer-e2e-'))
+        account_names, private_keys = get_synthetic_wallets(options.wallets, options.seed)
+        prepare_work_path(work_path, account_names, get_starknet_addresses(private_keys), options.route, options.cold)
+        os.chdir(work_path)
+
+        from config import set_accounts_data
+
+        set_accounts_data((account_names, private_keys, [], [None] * len(account_names)))
+        patch_endpoints(urls, options.retry_sleep, options.quiet)
+
+        print(f"{options.wallets} wallets | route: {' -> '.join(options.route)} | stream {options.accounts_in_stream} | "
+              f"latency {options.latency * 1000:.0f} ms | error rate {options.error_rate:.1%} | work path {work_path}")
+        result = asyncio.run(run_benchmark(options.accounts_in_stream, urls['stats']))
+    finally:
+        server_process.terminate()
+
+    print_result(result, options.verbose)
+    if save_path:
+        with open(save_path, 'w') as file:
+            json.dump(result, file, indent=4)
+    return 0 if result['completed'] == result['accounts'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
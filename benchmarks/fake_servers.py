@@ -0,0 +1,358 @@
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+
+from collections import Counter
+
+STARKNET_PATH = '/starknet'
+EVM_PATH = '/evm'
+OKX_PATH = '/okx'
+BINANCE_PATH = '/binance'
+FEEDER_PATH = '/feeder_gateway'
+STATS_PATH = '/__stats'
+
+RPC_ERROR = {'code': -32603, 'message': 'Internal error'}
+
+
+def get_selectors() -> dict:
+    from starknet_py.hash.selector import get_selector_from_name
+
+    return {get_selector_from_name(name): name for name in ('balanceOf', 'decimals', 'symbol', 'claim', 'transfer')}
+
+
+class FakeServers:
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02, error_rate: float = 0.0,
+                 subaccounts: int = 20, sub_balance: float = 10.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.selectors = get_selectors()
+        self.requests = Counter()
+        self.errors = Counter()
+        self.nonces = Counter()
+        self.block_number = 500_000
+        self.start_time = time.time()
+        self.okx_subs = {f'okx-sub-{index}': sub_balance for index in range(1, subaccounts + 1)}
+        self.binance_subs = {f'binance-sub-{index}@mail.com': sub_balance for index in range(1, subaccounts + 1)}
+        self.main_balances = {'okx': 0.0, 'binance': 0.0}
+
+    def get_block_number(self) -> int:
+        # a new block every 2 seconds is close enough to Starknet and zkSync Era
+        return self.block_number + int((time.time() - self.start_time) / 2)
+
+    async def delay(self):
+        await asyncio.sleep(max(self.latency + random.uniform(-self.jitter, self.jitter), 0))
+
+    def is_failed(self, name: str) -> bool:
+        self.requests[name] += 1
+        if self.error_rate and random.random() < self.error_rate:
+            self.errors[name] += 1
+            return True
+        return False
+
+    async def handle_json_rpc(self, request, get_result):
+        from aiohttp import web
+
+        payload = await request.json()
+        await self.delay()
+
+        responses = []
+        for call in payload if isinstance(payload, list) else [payload]:
+            method = call.get('method')
+            response = {'jsonrpc': '2.0', 'id': call.get('id')}
+            if self.is_failed(method):
+                response['error'] = RPC_ERROR
+            else:
+                try:
+                    response['result'] = get_result(method, call.get('params') or {})
+                except KeyError:
+                    response['error'] = {'code': -32601, 'message': f'Method not found: {method}'}
+            responses.append(response)
+
+        return web.json_response(responses if isinstance(payload, list) else responses[0])
+
+    def get_starknet_result(self, method: str, params: dict | list):
+        if method == 'starknet_call':
+            selector_name = self.selectors.get(int(params['request']['entry_point_selector'], 16))
+            return {
+                'balanceOf': [hex(100 * 10 ** 18), '0x0'],
+                'decimals': ['0x12'],
+                'symbol': [hex(int.from_bytes(b'STRK', 'big'))],
+            }.get(selector_name, ['0x0'])
+
+        if method == 'starknet_estimateFee':
+            return [{'overall_fee': hex(10 ** 13), 'gas_price': hex(10 ** 10), 'gas_consumed': hex(1000),
+                     'unit': 'WEI'} for _ in params['request']]
+
+        if method == 'starknet_addInvokeTransaction':
+            sender_address = int(params['invoke_transaction']['sender_address'], 16)
+            self.nonces[sender_address] += 1
+            return {'transaction_hash': hex(random.getrandbits(250) | 1)}
+
+        if method == 'starknet_getTransactionStatus':
+            return {'finality_status': 'ACCEPTED_ON_L2', 'execution_status': 'SUCCEEDED'}
+
+        if method == 'starknet_getTransactionReceipt':
+            return {
+                'transaction_hash': params['transaction_hash'],
+                'execution_status': 'SUCCEEDED',
+                'finality_status': 'ACCEPTED_ON_L2',
+                'block_number': self.get_block_number(),
+                'block_hash': hex(random.getrandbits(250) | 1),
+                'actual_fee': {'amount': hex(10 ** 13), 'unit': 'WEI'},
+                'type': 'INVOKE',
+                'events': [],
+                'messages_sent': [],
+                'execution_resources': {'steps': hex(5000)},
+            }
+
+        if method == 'starknet_getNonce':
+            return hex(self.nonces[int(params['contract_address'], 16)])
+
+        if method == 'starknet_getClassHashAt':
+            return hex(0x01a736d6ed154502257f02b1ccdf4d9d1089f80811cd6acad48e6b6a9d1f2003)
+
+        if method == 'starknet_getClassAt':
+            return {
+                'sierra_program': ['0x1'],
+                'contract_class_version': '0.1.0',
+                'entry_points_by_type': {'CONSTRUCTOR': [], 'EXTERNAL': [], 'L1_HANDLER': []},
+                'abi': '[]',
+            }
+
+        return {
+            'starknet_chainId': hex(int.from_bytes(b'SN_MAIN', 'big')),
+            'starknet_blockNumber': self.get_block_number(),
+            'starknet_specVersion': '0.6.0',
+        }[method]
+
+    def get_evm_result(self, method: str, params: list):
+        if method == 'eth_getTransactionCount':
+            return hex(self.nonces[params[0].lower()])
+
+        if method == 'eth_sendRawTransaction':
+            from eth_utils import keccak, to_bytes
+
+            raw_transaction = to_bytes(hexstr=params[0])
+            return '0x' + keccak(raw_transaction).hex()
+
+        if method == 'eth_getTransactionReceipt':
+            return {
+                'transactionHash': params[0],
+                'transactionIndex': '0x0',
+                'blockHash': '0x' + random.getrandbits(256).to_bytes(32, 'big').hex(),
+                'blockNumber': hex(self.get_block_number()),
+                'from': '0x' + '00' * 20,
+                'to': '0x' + '00' * 20,
+                'cumulativeGasUsed': hex(21000),
+                'gasUsed': hex(21000),
+                'effectiveGasPrice': hex(25 * 10 ** 7),
+                'contractAddress': None,
+                'logs': [],
+                'logsBloom': '0x' + '00' * 256,
+                'status': '0x1',
+                'type': '0x2',
+            }
+
+        if method == 'eth_getBlockByNumber':
+            return {
+                'number': hex(self.get_block_number()),
+                'hash': '0x' + random.getrandbits(256).to_bytes(32, 'big').hex(),
+                'timestamp': hex(int(time.time())),
+                'baseFeePerGas': hex(25 * 10 ** 7),
+                'gasLimit': hex(30_000_000),
+                'gasUsed': hex(15_000_000),
+                'transactions': [],
+            }
+
+        if method == 'eth_feeHistory':
+            blocks_count = int(params[0], 16) if isinstance(params[0], str) else int(params[0])
+            return {
+                'oldestBlock': hex(self.get_block_number() - blocks_count),
+                'baseFeePerGas': [hex(25 * 10 ** 7)] * (blocks_count + 1),
+                'gasUsedRatio': [0.5] * blocks_count,
+                'reward': [[hex(10 ** 6)] * len(params[2] if len(params) > 2 else [])] * blocks_count,
+            }
+
+        return {
+            'eth_chainId': hex(324),
+            'net_version': '324',
+            'eth_blockNumber': hex(self.get_block_number()),
+            'eth_getBalance': hex(10 ** 18),
+            'eth_call': '0x' + (10 ** 18).to_bytes(32, 'big').hex(),
+            'eth_estimateGas': hex(21000),
+            'eth_gasPrice': hex(25 * 10 ** 7),
+            'eth_maxPriorityFeePerGas': hex(10 ** 6),
+        }[method]
+
+    async def handle_starknet(self, request):
+        return await self.handle_json_rpc(request, self.get_starknet_result)
+
+    async def handle_evm(self, request):
+        return await self.handle_json_rpc(request, self.get_evm_result)
+
+    async def handle_okx(self, request):
+        from aiohttp import web
+
+        await self.delay()
+        path = request.path[len(OKX_PATH):]
+        if self.is_failed(f'okx {path}'):
+            return web.json_response({'code': '50001', 'msg': 'Service temporarily unavailable', 'data': []})
+
+        ccy = request.query.get('ccy', 'STRK')
+        if path == '/api/v5/users/subaccount/list':
+            data = [{'subAcct': sub_name} for sub_name in self.okx_subs]
+        elif path == '/api/v5/asset/subaccount/balances':
+            data = [{'ccy': ccy, 'availBal': str(self.okx_subs.get(request.query.get('subAcct'), 0.0))}]
+        elif path == '/api/v5/asset/balances':
+            data = [{'ccy': ccy, 'availBal': str(self.main_balances['okx'])}]
+        elif path == '/api/v5/account/balance':
+            data = [{'details': [{'ccy': ccy, 'availBal': '0'}]}]
+        elif path == '/api/v5/asset/currencies':
+            data = [{'ccy': ccy, 'chain': f'{ccy}-Starknet', 'minFee': '0.1', 'canWd': True}]
+        elif path == '/api/v5/asset/transfer':
+            body = json.loads((await request.text()).replace("'", '"'))
+            amount = min(float(body['amt']), self.okx_subs.get(body.get('subAcct'), 0.0))
+            if body.get('subAcct') in self.okx_subs:
+                self.okx_subs[body['subAcct']] -= amount
+            self.main_balances['okx'] += amount
+            data = [{'transId': str(random.getrandbits(32)), 'ccy': body['ccy'], 'amt': body['amt']}]
+        else:
+            return web.json_response({'code': '404', 'msg': f'Unknown path {path}', 'data': []}, status=404)
+
+        return web.json_response({'code': '0', 'msg': '', 'data': data})
+
+    async def handle_binance(self, request):
+        from aiohttp import web
+
+        await self.delay()
+        path = request.path[len(BINANCE_PATH):]
+        if self.is_failed(f'binance {path}'):
+            return web.json_response({'code': -1003, 'msg': 'Too many requests'}, status=429)
+
+        if path == '/api/v3/time':
+            data = {'serverTime': int(time.time() * 1000)}
+        elif path == '/sapi/v1/sub-account/list':
+            limit, page = int(request.query.get('limit', 10)), int(request.query.get('page', 1))
+            sub_emails = list(self.binance_subs)[(page - 1) * limit:page * limit]
+            data = {'subAccounts': [{'email': sub_email} for sub_email in sub_emails]}
+        elif path == '/sapi/v3/sub-account/assets':
+            sub_balance = self.binance_subs.get(request.query.get('email'), 0.0)
+            data = {'balances': [{'asset': 'STRK', 'free': str(sub_balance), 'locked': '0'}]}
+        elif path == '/sapi/v3/asset/getUserAsset':
+            data = [{'asset': 'STRK', 'free': str(self.main_balances['binance']), 'locked': '0'}]
+        elif path == '/sapi/v1/capital/config/getall':
+            data = [{'coin': 'STRK', 'networkList': [{'network': 'STARKNET', 'withdrawFee': '0.1'}]}]
+        elif path == '/sapi/v1/sub-account/universalTransfer':
+            sub_email = request.query.get('fromEmail')
+            amount = min(float(request.query.get('amount', 0)), self.binance_subs.get(sub_email, 0.0))
+            if sub_email in self.binance_subs:
+                self.binance_subs[sub_email] -= amount
+            self.main_balances['binance'] += amount
+            data = {'tranId': random.getrandbits(32)}
+        else:
+            return web.json_response({'code': -1, 'msg': f'Unknown path {path}'}, status=404)
+
+        return web.json_response(data)
+
+    async def handle_feeder(self, request):
+        from aiohttp import web
+
+        await self.delay()
+        if self.is_failed('feeder_get_block'):
+            return web.json_response({'code': 'StarknetErrorCode.UNDECLARED_CLASS'}, status=503)
+
+        return web.json_response({
+            'block_number': self.get_block_number(),
+            'strk_l1_gas_price': hex(random.randint(30, 60) * 10 ** 12),
+        })
+
+    async def handle_stats(self, request):
+        from aiohttp import web
+
+        return web.json_response({'requests': dict(self.requests), 'errors': dict(self.errors)})
+
+    def get_app(self):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_post(STARKNET_PATH, self.handle_starknet)
+        app.router.add_post(EVM_PATH, self.handle_evm)
+        app.router.add_route('*', OKX_PATH + '/{tail:.*}', self.handle_okx)
+        app.router.add_route('*', BINANCE_PATH + '/{tail:.*}', self.handle_binance)
+        app.router.add_get(FEEDER_PATH + '/get_block', self.handle_feeder)
+        app.router.add_get(STATS_PATH, self.handle_stats)
+        return app
+
+
+def get_free_port() -> int:
+    import socket
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get_urls(port: int) -> dict:
+    base_url = f'http://127.0.0.1:{port}'
+    return {
+        'starknet': base_url + STARKNET_PATH,
+        'evm': base_url + EVM_PATH,
+        'okx': base_url + OKX_PATH,
+        'binance': base_url + BINANCE_PATH,
+        'feeder': base_url + FEEDER_PATH,
+        'stats': base_url + STATS_PATH,
+    }
+
+
+def run_servers(port: int, latency: float, jitter: float, error_rate: float, subaccounts: int):
+    from aiohttp import web
+
+    servers = FakeServers(latency=latency, jitter=jitter, error_rate=error_rate, subaccounts=subaccounts)
+    web.run_app(servers.get_app(), host='127.0.0.1', port=port, print=None, access_log=None)
+
+
+def start_servers(latency: float = 0.05, jitter: float = 0.02, error_rate: float = 0.0, subaccounts: int = 20,
+                  timeout: int = 30):
+    import socket
+    import multiprocessing
+
+    port = get_free_port()
+    process = multiprocessing.get_context('spawn').Process(
+        target=run_servers, args=(port, latency, jitter, error_rate, subaccounts), daemon=True)
+    process.start()
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return process, get_urls(port)
+        except OSError:
+            if not process.is_alive():
+                break
+            time.sleep(0.1)
+
+    process.terminate()
+    raise RuntimeError('Fake servers did not start')
+
+
+def main(args: list = None):
+    parser = argparse.ArgumentParser(description='Local Starknet/EVM JSON-RPC and OKX/Binance REST stand-ins')
+    parser.add_argument('--port', type=int, default=8545)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.02, help='random +/- seconds around latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of failed requests, 0..1')
+    parser.add_argument('--subaccounts', type=int, default=20, help='CEX subaccounts with balance')
+    options = parser.parse_args(args)
+
+    for name, url in get_urls(options.port).items():
+        print(f'{name:<8} | {url}')
+    run_servers(options.port, options.latency, options.jitter, options.error_rate, options.subaccounts)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
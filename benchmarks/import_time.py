@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_TARGETS = {
+    'menu': 'import main',
+    'tools': 'import utils.tools',
+    'route_generator': 'import utils.route_generator',
+    'runner': 'import utils.modules_runner',
+    'clients': 'import modules.client, modules.stark_client',
+}
+
+
+def measure_import(statement: str) -> tuple[float, list]:
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=ROOT_PATH, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'import failed')
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_time, cumulative_time, package = line[len('import time:'):].split('|', 2)
+        imports.append((int(cumulative_time), int(self_time), package[1:]))
+
+    top_level = [item for item in imports if not item[2].startswith('  ')]
+    total_ms = sum(cumulative for cumulative, _, _ in top_level) / 1000
+    heaviest = sorted(imports, key=lambda item: item[1], reverse=True)[:10]
+    return total_ms, heaviest
+
+
+def main(args: list = None):
+    parser = argparse.ArgumentParser(description='Cold-start import time of StarkClaimer entry points')
+    parser.add_argument('targets', nargs='*', default=list(IMPORT_TARGETS), choices=list(IMPORT_TARGETS))
+    parser.add_argument('--repeat', type=int, default=3, help='runs per target, the best one is reported')
+    parser.add_argument('--save', help='save results to json file')
+    parser.add_argument('--baseline', help='compare with results saved earlier by --save')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown against baseline')
+    parser.add_argument('--verbose', action='store_true', help='show the heaviest modules of each target')
+    options = parser.parse_args(args)
+
+    baseline = {}
+    if options.baseline:
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+
+    interpreter_ms = min(measure_import('pass')[0] for _ in range(max(options.repeat, 1)))
+
+    results, regressions = {}, []
+    for target in options.targets:
+        try:
+            runs = [measure_import(IMPORT_TARGETS[target]) for _ in range(max(options.repeat, 1))]
+        except RuntimeError as error:
+            print(f'{target:<16} failed: {error}')
+            regressions.append(target)
+            continue
+
+        total_ms, heaviest = min(runs, key=lambda run: run[0])
+        total_ms = max(total_ms - interpreter_ms, 0.0)
+        results[target] = round(total_ms, 1)
+
+        info = ''
+        if target in baseline:
+            info = f' (baseline {baseline[target]:.1f} ms)'
+            if total_ms > baseline[target] * (1 + options.tolerance):
+                info += ' REGRESSION'
+                regressions.append(target)
+        print(f'{target:<16} {total_ms:>8.1f} ms{info}')
+
+        if options.verbose:
+            for cumulative, self_time, package in heaviest:
+                print(f'    {self_time / 1000:>8.1f} ms self | {cumulative / 1000:>8.1f} ms total | {package.strip()}')
+
+    if options.save:
+        with open(options.save, 'w') as file:
+            json.dump(results, file, indent=4)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,92 @@
+import sys
+import time
+import random
+import asyncio
+import argparse
+
+from utils.events_summary import percentile
+from utils.signing import run_signing, sign_evm_transaction, shutdown_signing_pools
+
+
+def sign_stark_message(private_key: int, message_hash: int):
+    from starknet_py.hash.utils import message_signature
+
+    return message_signature(msg_hash=message_hash, priv_key=private_key)
+
+
+def get_evm_transaction() -> dict:
+    return {
+        'chainId': 324,
+        'nonce': random.randint(0, 1000),
+        'to': '0x000000000000000000000000000000000000dEaD',
+        'value': 1,
+        'gas': 21000,
+        'maxFeePerGas': 250_000_000,
+        'maxPriorityFeePerGas': 1_000_000,
+        'type': 2,
+        'data': b'',
+    }
+
+
+async def measure_loop_lag(stop_event: asyncio.Event, interval: float = 0.005) -> list:
+    lags = []
+    while not stop_event.is_set():
+        start_time = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(max(time.perf_counter() - start_time - interval, 0.0))
+    return lags
+
+
+async def run_account(signatures: int, signer: str, executor_type: str | None):
+    private_key = random.randint(1, 2 ** 250)
+    for _ in range(signatures):
+        if signer == 'stark':
+            await run_signing(sign_stark_message, private_key, random.randint(1, 2 ** 250),
+                              executor_type=executor_type)
+        else:
+            await run_signing(sign_evm_transaction, get_evm_transaction(), f'0x{private_key:064x}',
+                              executor_type=executor_type)
+        await asyncio.sleep(0)
+
+
+async def run_scenario(accounts: int, signatures: int, signer: str, executor_type: str | None) -> dict:
+    stop_event = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop_event))
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*[run_account(signatures, signer, executor_type) for _ in range(accounts)])
+    duration = time.perf_counter() - start_time
+
+    stop_event.set()
+    lags = await lag_task
+    return {
+        'duration': duration,
+        'signatures_per_second': accounts * signatures / duration,
+        'lag_p50_ms': percentile(lags, 50) * 1000,
+        'lag_p99_ms': percentile(lags, 99) * 1000,
+        'lag_max_ms': max(lags, default=0.0) * 1000,
+    }
+
+
+def main(args: list = None):
+    parser = argparse.ArgumentParser(description='Event-loop lag while many accounts sign transactions')
+    parser.add_argument('--accounts', type=int, default=200)
+    parser.add_argument('--signatures', type=int, default=5, help='signatures per account')
+    parser.add_argument('--signer', choices=['stark', 'evm'], default='stark')
+    parser.add_argument('--executors', nargs='+', default=['inline', 'thread', 'process'],
+                        choices=['inline', 'thread', 'process'])
+    options = parser.parse_args(args)
+
+    print(f'{options.accounts} accounts x {options.signatures} {options.signer} signatures')
+    for executor_name in options.executors:
+        executor_type = None if executor_name == 'inline' else executor_name
+        result = asyncio.run(run_scenario(options.accounts, options.signatures, options.signer, executor_type))
+        print(f"{executor_name:<8} | {result['duration']:>7.2f} s | {result['signatures_per_second']:>8.1f} sig/s | "
+              f"loop lag p50 {result['lag_p50_ms']:>7.2f} ms, p99 {result['lag_p99_ms']:>7.2f} ms, "
+              f"max {result['lag_max_ms']:>7.2f} ms")
+        shutdown_signing_pools()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,131 @@
+import sys
+import json
+import asyncio
+import argparse
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_ERROR = 2
+EXIT_INTERRUPTED = 130
+
+
+def parse_wallets(value: str) -> int | tuple | list:
+    value = value.replace(' ', '')
+    try:
+        if '-' in value:
+            first, last = value.split('-', 1)
+            return [int(first), int(last)]
+        if ',' in value:
+            return tuple(int(item) for item in value.split(',') if item)
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'Bad wallets value: {value}. Examples: 0 | 3 | 4,20 | 5-25')
+
+
+def parse_shard(value: str) -> tuple:
+    try:
+        shard_index, shards_count = [int(item) for item in value.split('/')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'Bad shard value: {value}. Example: 1/4')
+    if not 1 <= shard_index <= shards_count:
+        raise argparse.ArgumentTypeError(f'Shard index must be between 1 and {shards_count}')
+    return shard_index, shards_count
+
+
+def print_results(results: dict, as_json: bool):
+    if as_json:
+        print(json.dumps(results, indent=4, default=str))
+        return
+
+    for name, result in results.items():
+        print(f'{name}: {result}')
+
+
+def get_runner(options):
+    from utils.modules_runner import Runner
+    from settings import WALLETS_TO_WORK, ACCOUNTS_IN_STREAM, WORKER_PROCESSES
+
+    return Runner(
+        wallets_to_work=WALLETS_TO_WORK if options.wallets is None else options.wallets,
+        accounts_in_stream=ACCOUNTS_IN_STREAM if options.accounts_in_stream is None else options.accounts_in_stream,
+        shard=options.shard,
+        processes=WORKER_PROCESSES if options.processes is None else options.processes,
+    )
+
+
+def command_run(options) -> int:
+    results = asyncio.run(get_runner(options).run_accounts())
+    print_results({name: 'completed' if result else 'failed' for name, result in results.items()}, options.json)
+    return EXIT_OK if all(results.values()) else EXIT_FAILED
+
+
+def command_generate_routes(options) -> int:
+    from utils.route_generator import RouteGenerator
+
+    RouteGenerator().classic_routes_json_save()
+    return EXIT_OK
+
+
+def command_check_proxies(options) -> int:
+    results = asyncio.run(get_runner(options).check_proxies_status())
+    print_results({proxy: 'ok' if result else 'bad' for proxy, result in results.items()}, options.json)
+    return EXIT_OK if results and all(results.values()) else EXIT_FAILED
+
+
+def command_eligibility_scan(options) -> int:
+    results = asyncio.run(get_runner(options).run_eligibility_scan())
+    print_results(results, options.json)
+    return EXIT_FAILED if any('error' in result for result in results.values()) else EXIT_OK
+
+
+def command_balances(options) -> int:
+    results = asyncio.run(get_runner(options).run_balances_check(options.token))
+    print_results(results, options.json)
+    return EXIT_FAILED if any('error' in result for result in results.values()) else EXIT_OK
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='main.py', description='StarkClaimer headless mode')
+
+    wallets_parser = argparse.ArgumentParser(add_help=False)
+    wallets_parser.add_argument('--wallets', type=parse_wallets, default=None,
+                                help='WALLETS_TO_WORK override: 0 | 3 | 4,20 | 5-25')
+    wallets_parser.add_argument('--accounts-in-stream', type=int, default=None,
+                                help='ACCOUNTS_IN_STREAM override, also used as concurrency for checks')
+    wallets_parser.add_argument('--shard', type=parse_shard, default=None,
+                                help='run only the K-th of N wallet shards, e.g. 2/4')
+    wallets_parser.add_argument('--processes', type=int, default=None,
+                                help='WORKER_PROCESSES override, splits wallets between worker processes')
+    wallets_parser.add_argument('--json', action='store_true', help='print results as json')
+
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('run', parents=[wallets_parser], help='run classic routes').set_defaults(
+        handler=command_run)
+    subparsers.add_parser('generate-routes', help='generate classic routes').set_defaults(
+        handler=command_generate_routes)
+    subparsers.add_parser('check-proxies', parents=[wallets_parser], help='check every proxy').set_defaults(
+        handler=command_check_proxies)
+    subparsers.add_parser('eligibility-scan', parents=[wallets_parser],
+                          help='check $STRK eligibility of wallets').set_defaults(handler=command_eligibility_scan)
+
+    balances_parser = subparsers.add_parser('balances', parents=[wallets_parser], help='check wallets balances')
+    balances_parser.add_argument('--token', default='STRK', help='token from TOKENS_PER_CHAIN["Starknet"]')
+    balances_parser.set_defaults(handler=command_balances)
+
+    return parser
+
+
+def main(args: list = None) -> int:
+    options = get_parser().parse_args(args)
+    try:
+        return options.handler(options)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    except Exception as error:
+        print(f'Error: {error}', file=sys.stderr)
+        return EXIT_ERROR
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
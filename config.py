@@ -1,5 +1,3 @@
-from utils.tools import get_accounts_data
-
 ERC20_ABI = [{'inputs': [{'internalType': 'string', 'name': '_name', 'type': 'string'}, {'internalType': 'string', 'name': '_symbol', 'type': 'string'}, {'internalType': 'uint256', 'name': '_initialSupply', 'type': 'uint256'}], 'stateMutability': 'nonpayable', 'type': 'constructor'}, {'anonymous': False, 'inputs': [{'indexed': True, 'internalType': 'address', 'name': 'owner', 'type': 'address'}, {'indexed': True, 'internalType': 'address', 'name': 'spender', 'type': 'address'}, {'indexed': False, 'internalType': 'uint256', 'name': 'value', 'type': 'uint256'}], 'name': 'Approval', 'type': 'event'}, {'anonymous': False, 'inputs': [{'indexed': True, 'internalType': 'address', 'name': 'from', 'type': 'address'}, {'indexed': True, 'internalType': 'address', 'name': 'to', 'type': 'address'}, {'indexed': False, 'internalType': 'uint256', 'name': 'value', 'type': 'uint256'}], 'name': 'Transfer', 'type': 'event'}, {'inputs': [{'internalType': 'address', 'name': 'owner', 'type': 'address'}, {'internalType': 'address', 'name': 'spender', 'type': 'address'}], 'name': 'allowance', 'outputs': [{'internalType': 'uint256', 'name': '', 'type': 'uint256'}], 'stateMutability': 'view', 'type': 'function'}, {'inputs': [{'internalType': 'address', 'name': 'spender', 'type': 'address'}, {'internalType': 'uint256', 'name': 'amount', 'type': 'uint256'}], 'name': 'approve', 'outputs': [{'internalType': 'bool', 'name': '', 'type': 'bool'}], 'stateMutability': 'nonpayable', 'type': 'function'}, {'inputs': [{'internalType': 'address', 'name': 'account', 'type': 'address'}], 'name': 'balanceOf', 'outputs': [{'internalType': 'uint256', 'name': '', 'type': 'uint256'}], 'stateMutability': 'view', 'type': 'function'}, {'inputs': [], 'name': 'decimals', 'outputs': [{'internalType': 'uint8', 'name': '', 'type': 'uint8'}], 'stateMutability': 'view', 'type': 'function'}, {'inputs': [{'internalType': 'address', 'name': 'spender', 'type': 'address'}, {'internalType': 'uint256', 'name': 'subtractedValue', 'type': 'uint256'}], 'name': 'decreaseAllowance', 'outputs': [{'internalType': 'bool', 'name': '', 'type': 'bool'}], 'stateMutability': 'nonpayable', 'type': 'function'}, {'inputs': [{'internalType': 'address', 'name': 'spender', 'type': 'address'}, {'internalType': 'uint256', 'name': 'addedValue', 'type': 'uint256'}], 'name': 'increaseAllowance', 'outputs': [{'internalType': 'bool', 'name': '', 'type': 'bool'}], 'stateMutability': 'nonpayable', 'type': 'function'}, {'inputs': [], 'name': 'name', 'outputs': [{'internalType': 'string', 'name': '', 'type': 'string'}], 'stateMutability': 'view', 'type': 'function'}, {'inputs': [{'internalType': 'uint8', 'name': 'decimals_', 'type': 'uint8'}], 'name': 'setupDecimals', 'outputs': [], 'stateMutability': 'nonpayable', 'type': 'function'}, {'inputs': [], 'name': 'symbol', 'outputs': [{'internalType': 'string', 'name': '', 'type': 'string'}], 'stateMutability': 'view', 'type': 'function'}, {'inputs': [], 'name': 'totalSupply', 'outputs': [{'internalType': 'uint256', 'name': '', 'type': 'uint256'}], 'stateMutability': 'view', 'type': 'function'}, {'inputs': [{'internalType': 'address', 'name': 'recipient', 'type': 'address'}, {'internalType': 'uint256', 'name': 'amount', 'type': 'uint256'}], 'name': 'transfer', 'outputs': [{'internalType': 'bool', 'name': '', 'type': 'bool'}], 'stateMutability': 'nonpayable', 'type': 'function'}, {'inputs': [{'internalType': 'address', 'name': 'sender', 'type': 'address'}, {'internalType': 'address', 'name': 'recipient', 'type': 'address'}, {'internalType': 'uint256', 'name': 'amount', 'type': 'uint256'}], 'name': 'transferFrom', 'outputs': [{'internalType': 'bool', 'name': '', 'type': 'bool'}], 'stateMutability': 'nonpayable', 'type': 'function'}]
 
 STARK_ERC20_ABI = [{'name': 'Uint256', 'size': 2, 'type': 'struct', 'members': [{'name': 'low', 'type': 'felt', 'offset': 0}, {'name': 'high', 'type': 'felt', 'offset': 1}]}, {'data': [{'name': 'from_', 'type': 'felt'}, {'name': 'to', 'type': 'felt'}, {'name': 'value', 'type': 'Uint256'}], 'keys': [], 'name': 'Transfer', 'type': 'event'}, {'data': [{'name': 'owner', 'type': 'felt'}, {'name': 'spender', 'type': 'felt'}, {'name': 'value', 'type': 'Uint256'}], 'keys': [], 'name': 'Approval', 'type': 'event'}, {'name': 'name', 'type': 'function', 'inputs': [], 'outputs': [{'name': 'name', 'type': 'felt'}], 'stateMutability': 'view'}, {'name': 'symbol', 'type': 'function', 'inputs': [], 'outputs': [{'name': 'symbol', 'type': 'felt'}], 'stateMutability': 'view'}, {'name': 'totalSupply', 'type': 'function', 'inputs': [], 'outputs': [{'name': 'totalSupply', 'type': 'Uint256'}], 'stateMutability': 'view'}, {'name': 'decimals', 'type': 'function', 'inputs': [], 'outputs': [{'name': 'decimals', 'type': 'felt'}], 'stateMutability': 'view'}, {'name': 'balanceOf', 'type': 'function', 'inputs': [{'name': 'account', 'type': 'felt'}], 'outputs': [{'name': 'balance', 'type': 'Uint256'}], 'stateMutability': 'view'}, {'name': 'allowance', 'type': 'function', 'inputs': [{'name': 'owner', 'type': 'felt'}, {'name': 'spender', 'type': 'felt'}], 'outputs': [{'name': 'remaining', 'type': 'Uint256'}], 'stateMutability': 'view'}, {'name': 'permittedMinter', 'type': 'function', 'inputs': [], 'outputs': [{'name': 'minter', 'type': 'felt'}], 'stateMutability': 'view'}, {'name': 'initialized', 'type': 'function', 'inputs': [], 'outputs': [{'name': 'res', 'type': 'felt'}], 'stateMutability': 'view'}, {'name': 'get_version', 'type': 'function', 'inputs': [], 'outputs': [{'name': 'version', 'type': 'felt'}], 'stateMutability': 'view'}, {'name': 'get_identity', 'type': 'function', 'inputs': [], 'outputs': [{'name': 'identity', 'type': 'felt'}], 'stateMutability': 'view'}, {'name': 'initialize', 'type': 'function', 'inputs': [{'name': 'init_vector_len', 'type': 'felt'}, {'name': 'init_vector', 'type': 'felt*'}], 'outputs': []}, {'name': 'transfer', 'type': 'function', 'inputs': [{'name': 'recipient', 'type': 'felt'}, {'name': 'amount', 'type': 'Uint256'}], 'outputs': [{'name': 'success', 'type': 'felt'}]}, {'name': 'transferFrom', 'type': 'function', 'inputs': [{'name': 'sender', 'type': 'felt'}, {'name': 'recipient', 'type': 'felt'}, {'name': 'amount', 'type': 'Uint256'}], 'outputs': [{'name': 'success', 'type': 'felt'}]}, {'name': 'approve', 'type': 'function', 'inputs': [{'name': 'spender', 'type': 'felt'}, {'name': 'amount', 'type': 'Uint256'}], 'outputs': [{'name': 'success', 'type': 'felt'}]}, {'name': 'increaseAllowance', 'type': 'function', 'inputs': [{'name': 'spender', 'type': 'felt'}, {'name': 'added_value', 'type': 'Uint256'}], 'outputs': [{'name': 'success', 'type': 'felt'}]}, {'name': 'decreaseAllowance', 'type': 'function', 'inputs': [{'name': 'spender', 'type': 'felt'}, {'name': 'subtracted_value', 'type': 'Uint256'}], 'outputs': [{'name': 'success', 'type': 'felt'}]}, {'name': 'permissionedMint', 'type': 'function', 'inputs': [{'name': 'recipient', 'type': 'felt'}, {'name': 'amount', 'type': 'Uint256'}], 'outputs': []}, {'name': 'permissionedBurn', 'type': 'function', 'inputs': [{'name': 'account', 'type': 'felt'}, {'name': 'amount', 'type': 'Uint256'}], 'outputs': []}]
@@ -69,7 +67,20 @@ CHAIN_NAME = {
     33: 'Fantom',
 }
 
-ACCOUNT_NAMES, PRIVATE_KEYS, PROXIES, CEX_WALLETS = get_accounts_data()
+ACCOUNTS_DATA_NAMES = ('ACCOUNT_NAMES', 'PRIVATE_KEYS', 'PROXIES', 'CEX_WALLETS')
+
+
+def set_accounts_data(accounts_data: tuple):
+    globals().update(zip(ACCOUNTS_DATA_NAMES, accounts_data))
+
+
+def __getattr__(name):
+    if name in ACCOUNTS_DATA_NAMES:
+        from utils.tools import get_accounts_data
+
+        set_accounts_data(get_accounts_data())
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 TITLE = """
  ______     ______   ______     ______     __  __          ______     __         ______     __     __    __     ______     ______    
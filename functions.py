@@ -1,9 +1,9 @@
-from modules import *
 from utils.networks import *
 from settings import (GLOBAL_NETWORK)
 
 
-def get_client(account_number, private_key, network, proxy, bridge_from_evm:bool = False) -> Client | StarknetClient:
+def get_client(account_number, private_key, network, proxy, bridge_from_evm:bool = False):
+    from modules import Client, StarknetClient
     if GLOBAL_NETWORK != 9 or bridge_from_evm:
         return Client(account_number, private_key, network, proxy)
     return StarknetClient(account_number, private_key, network, proxy)
@@ -68,7 +68,9 @@ def get_key_by_id_from(args, chain_from_id):
 
 
 async def claim_evm(account_number, private_key, network, proxy):
-    worker = ClaimerEVM(Client(account_number, private_key, network, proxy))
+    from modules import ClaimerEVM
+    from utils.client_context import get_evm_client
+    worker = ClaimerEVM(get_evm_client(account_number, private_key, network, proxy))
     return await worker.claim_strk_tokens()
 
 
@@ -79,22 +81,30 @@ async def claim_evm(account_number, private_key, network, proxy):
 
 
 async def claim_starknet(account_number, private_key, _, proxy):
-    network = StarknetRPC
-    worker = ClaimerStarknet(StarknetClient(account_number, private_key, network, proxy))
+    from modules import ClaimerStarknet
+    from utils.client_context import get_starknet_client
+    worker = ClaimerStarknet(get_starknet_client(account_number, private_key, proxy))
     return await worker.claim_onchain()
 
 
 async def transfer_strk(account_number, private_key, _, proxy):
-    network = StarknetRPC
-    worker = Starknet(StarknetClient(account_number, private_key, network, proxy))
+    from modules import Starknet
+    from utils.client_context import get_starknet_client
+    worker = Starknet(get_starknet_client(account_number, private_key, proxy))
     return await worker.transfer_strk()
 
 
 async def collect_from_sub_okx(account_number, private_key, network, proxy):
-    worker = OKX(Client(account_number, private_key, network, proxy))
-    return await worker.transfer_from_subs()
+    from modules import OKX
+    from utils.cex_sweep import get_sweep_job
+    from utils.client_context import get_evm_client
+    worker = OKX(get_evm_client(account_number, private_key, network, proxy))
+    return await get_sweep_job('OKX').request(account_number, worker)
 
 
 async def collect_from_sub_binance(account_number, private_key, network, proxy):
-    worker = Binance(Client(account_number, private_key, network, proxy))
-    return await worker.transfer_from_subs()
+    from modules import Binance
+    from utils.cex_sweep import get_sweep_job
+    from utils.client_context import get_evm_client
+    worker = Binance(get_evm_client(account_number, private_key, network, proxy))
+    return await get_sweep_job('Binance').request(account_number, worker)
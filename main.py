@@ -4,9 +4,6 @@ import sys
 from config import TITLE
 from termcolor import cprint
 from questionary import Choice, select
-from utils.modules_runner import Runner
-from utils.route_generator import RouteGenerator
-from utils.tools import create_okx_withdrawal_list
 
 
 def main():
@@ -27,21 +24,23 @@ def main():
             pointer='👉'
         ).ask()
 
-        runner = Runner()
-
         if answer == 'check_proxy':
+            from utils.modules_runner import Runner
             print()
-            asyncio.run(runner.check_proxies_status())
+            asyncio.run(Runner().check_proxies_status())
             print()
         elif answer == 'classic_routes_run':
+            from utils.modules_runner import Runner
             print()
-            asyncio.run(runner.run_accounts())
+            asyncio.run(Runner().run_accounts())
             print()
         elif answer == 'create_okx_list':
+            from utils.tools import create_okx_withdrawal_list
             print()
             create_okx_withdrawal_list()
             print()
         elif answer == 'classic_routes_gen':
+            from utils.route_generator import RouteGenerator
             generator = RouteGenerator()
             generator.classic_routes_json_save()
         elif answer == 'exit':
@@ -53,4 +52,7 @@ def main():
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        from cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
     main()
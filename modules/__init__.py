@@ -1,5 +1,23 @@
-from .interfaces import Logger, CEX
-from .client import Client
-from .stark_client import StarknetClient
-from .claimers import ClaimerStarknet, ClaimerEVM, Starknet
-from .cexs import OKX, Binance
+import importlib
+
+LAZY_EXPORTS = {
+    'Logger': '.interfaces',
+    'CEX': '.interfaces',
+    'Client': '.client',
+    'StarknetClient': '.stark_client',
+    'ClaimerStarknet': '.claimers',
+    'ClaimerEVM': '.claimers',
+    'Starknet': '.claimers',
+    'OKX': '.cexs',
+    'Binance': '.cexs',
+}
+
+__all__ = list(LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    if name in LAZY_EXPORTS:
+        value = getattr(importlib.import_module(LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
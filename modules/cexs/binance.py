@@ -4,30 +4,88 @@ import time
 
 from hashlib import sha256
 from modules import CEX, Logger
-from modules.interfaces import SoftwareExceptionWithoutRetry
+from modules.interfaces import SoftwareException, SoftwareExceptionWithoutRetry
+from utils.address_book import get_deposit_address
+from utils.deposit_watcher import get_deposit_watcher
+from utils.profiler import create_shared_task
+from utils.rate_limiter import get_weight_limiter
 from utils.tools import helper
+from settings import CEX_SWEEP_WORKERS, BINANCE_RECV_WINDOW
+
+# request weight per minute from the Binance API docs, a part is left for other software on the same IP/key
+BINANCE_WEIGHT_LIMITS = {
+    'IP': 12000,
+    'UID': 180000,
+}
+BINANCE_WEIGHT_HEADROOM = 0.9
+
+# the biggest page of /sapi/v1/sub-account/list
+BINANCE_SUB_LIST_LIMIT = 200
+
+# server time minus local time in seconds, shared by every account of the process
+SERVER_TIME = {
+    'offset': 0.0,
+    'updated_at': 0.0,
+    'task': None,
+}
+BINANCE_TIME_SYNC_INTERVAL = 300
+BINANCE_TIMESTAMP_ERROR = 'Error code: -1021'
+
+# (limit type, weight) per endpoint
+BINANCE_WEIGHTS = {
+    '/sapi/v1/capital/config/getall': ('IP', 10),
+    '/sapi/v1/capital/deposit/hisrec': ('IP', 1),
+    '/sapi/v1/sub-account/list': ('IP', 1),
+    '/sapi/v3/sub-account/assets': ('UID', 60),
+    '/sapi/v3/asset/getUserAsset': ('IP', 5),
+    '/sapi/v1/sub-account/universalTransfer': ('IP', 360),
+}
 
 
 class Binance(CEX, Logger):
+    api_url = "https://api.binance.com"
+
     def __init__(self, client):
         self.client = client
         Logger.__init__(self)
         CEX.__init__(self, client, 'Binance')
 
-        self.api_url = "https://api.binance.com"
         self.headers = {
             "Content-Type": "application/json",
             "X-MBX-APIKEY": self.api_key,
         }
 
-    @staticmethod
-    def parse_params(params: dict | None = None):
+    async def sync_server_time(self):
+        # one request refreshes the offset for every account, the others wait for its result
+        if SERVER_TIME['task'] is None or SERVER_TIME['task'].done():
+            SERVER_TIME['task'] = create_shared_task(self.request_server_time())
+        await asyncio.shield(SERVER_TIME['task'])
+
+    async def request_server_time(self):
+        url = f"{self.api_url}/api/v3/time"
+        try:
+            request_start_time = time.time()
+            server_time = (await self.make_request(url=url, module_name='Server time'))['serverTime']
+            local_time = (request_start_time + time.time()) / 2
+            SERVER_TIME['offset'] = server_time / 1000 - local_time
+        except Exception as error:
+            self.logger_msg(
+                *self.client.acc_info, msg=f'Can not get Binance server time, the last offset is used: {error}',
+                type_msg='warning')
+        SERVER_TIME['updated_at'] = time.monotonic()
+
+    async def get_timestamp(self) -> int:
+        if time.monotonic() - SERVER_TIME['updated_at'] > BINANCE_TIME_SYNC_INTERVAL:
+            await self.sync_server_time()
+        return int((time.time() + SERVER_TIME['offset']) * 1000)
+
+    async def parse_params(self, params: dict | None = None):
         if params:
             sorted_keys = sorted(params)
-            params_str = "&".join(["%s=%s" % (x, params[x]) for x in sorted_keys])
+            params_str = "&".join(["%s=%s" % (x, params[x]) for x in sorted_keys]) + "&"
         else:
             params_str = ''
-        return params_str + "&timestamp=" + str(int(time.time() * 1000))
+        return params_str + f"recvWindow={BINANCE_RECV_WINDOW}&timestamp={await self.get_timestamp()}"
 
     def get_sign(self, payload: str = ""):
         try:
@@ -38,53 +96,100 @@ class Binance(CEX, Logger):
         except Exception as error:
             raise SoftwareExceptionWithoutRetry(f'Bad signature for Binance request: {error}')
 
+    @staticmethod
+    def get_weight_limiter(limit_type: str):
+        return get_weight_limiter(
+            f'Binance {limit_type}', int(BINANCE_WEIGHT_LIMITS[limit_type] * BINANCE_WEIGHT_HEADROOM))
+
+    def update_limits(self, response):
+        for limit_type in BINANCE_WEIGHT_LIMITS:
+            used_weight = response.headers.get(f'X-SAPI-USED-{limit_type}-WEIGHT-1M')
+            if used_weight is not None:
+                self.get_weight_limiter(limit_type).update(int(used_weight))
+
+        retry_after = response.headers.get('Retry-After')
+        if response.status in (418, 429) and retry_after is not None:
+            for limit_type in BINANCE_WEIGHT_LIMITS:
+                self.get_weight_limiter(limit_type).block(int(retry_after))
+
+    async def request_weighted(self, path: str, params: dict = None, method: str = 'GET',
+                               module_name: str = 'Request', content_type: str | None = "application/json"):
+        limit_type, weight = BINANCE_WEIGHTS[path]
+        for resync in (False, True):
+            await self.get_weight_limiter(limit_type).acquire(weight)
+
+            # signed only after the weight wait, a timestamp taken before it can leave recvWindow while waiting
+            parse_params = await self.parse_params(params)
+            url = f"{self.api_url}{path}?{parse_params}&signature={self.get_sign(parse_params)}"
+            try:
+                return await self.make_request(method=method, url=url, headers=self.headers,
+                                               content_type=content_type, module_name=module_name)
+            except SoftwareException as error:
+                if BINANCE_TIMESTAMP_ERROR not in str(error):
+                    raise
+                if resync:
+                    raise SoftwareExceptionWithoutRetry(f'{error}. Request was rejected again after time sync')
+                # the clock went away from the server time, the request is signed again with a fresh offset
+                SERVER_TIME['updated_at'] = 0.0
+
     async def deposit(self):
         pass
 
     async def get_currencies(self, ccy):
-        path = '/sapi/v1/capital/config/getall'
-
-        params = {
-            'timestamp': str(int(time.time() * 1000))
-        }
-
-        parse_params = self.parse_params(params)
-
-        url = f"{self.api_url}{path}?{parse_params}&signature={self.get_sign(parse_params)}"
-        data = await self.make_request(url=url, headers=self.headers, module_name='Token info')
+        data = await self.request_weighted('/sapi/v1/capital/config/getall', module_name='Token info')
         return [item for item in data if item['coin'] == ccy]
 
-    async def get_sub_list(self):
-        path = "/sapi/v1/sub-account/list"
-
-        parse_params = self.parse_params()
-        url = f"{self.api_url}{path}?{parse_params}&signature={self.get_sign(parse_params)}"
-
-        await asyncio.sleep(2)
-        return await self.make_request(url=url, headers=self.headers, module_name='Get subAccounts list')
+    async def get_sub_list(self) -> list:
+        sub_list, page = [], 1
+        while True:
+            params = {
+                "limit": BINANCE_SUB_LIST_LIMIT,
+                "page": page
+            }
+
+            sub_page = (await self.request_weighted('/sapi/v1/sub-account/list', params,
+                                                    module_name='Get subAccounts list'))['subAccounts']
+            sub_list.extend(sub_page)
+            if len(sub_page) < BINANCE_SUB_LIST_LIMIT:
+                return sub_list
+            page += 1
 
     async def get_sub_balance(self, sub_email):
-        path = '/sapi/v3/sub-account/assets'
-
         params = {
             "email": sub_email
         }
 
-        parse_params = self.parse_params(params)
-        url = f"{self.api_url}{path}?{parse_params}&signature={self.get_sign(parse_params)}"
+        return await self.request_weighted('/sapi/v3/sub-account/assets', params,
+                                           module_name='Get subAccount balance')
+
+    async def get_sub_balances(self, sub_list: list, ccy: str) -> dict:
+        sub_emails = [sub_data['email'] for sub_data in sub_list]
+        sub_assets = await asyncio.gather(*[self.get_sub_balance(sub_email) for sub_email in sub_emails])
 
-        await asyncio.sleep(2)
-        return await self.make_request(url=url, headers=self.headers, module_name='Get subAccount balance')
+        sub_balances = {}
+        for sub_email, assets in zip(sub_emails, sub_assets):
+            asset_balances = [balance for balance in assets['balances'] if balance['asset'] == ccy]
+            sub_balances[sub_email] = 0.0 if len(asset_balances) == 0 else float(asset_balances[0]['free'])
+        return sub_balances
 
     async def get_main_balance(self):
-        path = '/sapi/v3/asset/getUserAsset'
+        return await self.request_weighted('/sapi/v3/asset/getUserAsset', method='POST', content_type=None,
+                                           module_name='Get main account balance')
 
-        parse_params = self.parse_params()
-        url = f"{self.api_url}{path}?{parse_params}&signature={self.get_sign(parse_params)}"
+    async def transfer_from_subaccount(self, sub_email: str, ccy: str, amount: float):
+        params = {
+            "amount": amount,
+            "asset": ccy,
+            "fromAccountType": "SPOT",
+            "toAccountType": "SPOT",
+            "fromEmail": sub_email
+        }
+
+        await self.request_weighted('/sapi/v1/sub-account/universalTransfer', params, method="POST",
+                                    module_name='SubAccount transfer')
 
-        await asyncio.sleep(2)
-        return await self.make_request(method='POST', url=url, headers=self.headers, content_type=None,
-                                       module_name='Get main account balance')
+        self.logger_msg(*self.client.acc_info,
+                        msg=f"Transfer {amount} {ccy} from {sub_email} to main account complete", type_msg='success')
 
     async def transfer_from_subaccounts(self, ccy: str = 'ETH', amount: float = None, silent_mode:bool = False):
         if ccy == 'USDC.e':
@@ -93,41 +198,45 @@ class Binance(CEX, Logger):
         if not silent_mode:
             self.logger_msg(*self.client.acc_info, msg=f'Checking subAccounts balance')
 
-        flag = True
-        sub_list = (await self.get_sub_list())['subAccounts']
-
-        for sub_data in sub_list:
-            sub_email = sub_data['email']
-
-            sub_balances = await self.get_sub_balance(sub_email)
-            asset_balances = [balance for balance in sub_balances['balances'] if balance['asset'] == ccy]
-            sub_balance = 0.0 if len(asset_balances) == 0 else float(asset_balances[0]['free'])
-
-            if sub_balance != 0.0:
-                flag = False
-                amount = amount if amount else sub_balance
-                self.logger_msg(*self.client.acc_info, msg=f'{sub_email} | subAccount balance : {sub_balance} {ccy}')
-
-                params = {
-                    "amount": amount,
-                    "asset": ccy,
-                    "fromAccountType": "SPOT",
-                    "toAccountType": "SPOT",
-                    "fromEmail": sub_email
-                }
-
-                path = "/sapi/v1/sub-account/universalTransfer"
-                parse_params = self.parse_params(params)
-
-                url = f"{self.api_url}{path}?{parse_params}&signature={self.get_sign(parse_params)}"
-                await self.make_request(method="POST", url=url, headers=self.headers, module_name='SubAccount transfer')
-
-                self.logger_msg(*self.client.acc_info,
-                                msg=f"Transfer {amount} {ccy} to main account complete", type_msg='success')
-
-                break
-        if flag and not silent_mode:
-            self.logger_msg(*self.client.acc_info, msg=f'subAccounts balance: 0 {ccy}', type_msg='warning')
+        phases = {}
+        phase_start_time = time.perf_counter()
+        sub_list = await self.get_sub_list()
+        phases['list'] = time.perf_counter() - phase_start_time
+
+        phase_start_time = time.perf_counter()
+        sub_balances = await self.get_sub_balances(sub_list, ccy)
+        funded = {sub_email: sub_balance for sub_email, sub_balance in sub_balances.items() if sub_balance > 0}
+        phases['balances'] = time.perf_counter() - phase_start_time
+
+        if not funded:
+            if not silent_mode:
+                self.logger_msg(*self.client.acc_info, msg=f'subAccounts balance: 0 {ccy}', type_msg='warning')
+            return True
+
+        for sub_email, sub_balance in funded.items():
+            self.logger_msg(*self.client.acc_info, msg=f'{sub_email} | subAccount balance : {sub_balance} {ccy}')
+
+        semaphore = asyncio.Semaphore(CEX_SWEEP_WORKERS)
+
+        async def transfer_worker(sub_email: str, sub_amount: float):
+            async with semaphore:
+                await self.transfer_from_subaccount(sub_email, ccy, sub_amount)
+                return sub_amount
+
+        phase_start_time = time.perf_counter()
+        sub_amounts = {sub_email: amount if amount else sub_balance for sub_email, sub_balance in funded.items()}
+        transfers = await asyncio.gather(
+            *[transfer_worker(sub_email, sub_amount) for sub_email, sub_amount in sub_amounts.items()],
+            return_exceptions=True)
+        phases['transfers'] = time.perf_counter() - phase_start_time
+
+        moved = {sub_email: result for sub_email, result in zip(sub_amounts, transfers)
+                 if not isinstance(result, Exception)}
+        self.report_sweep(ccy, len(sub_list), funded, moved, phases)
+
+        errors = [result for result in transfers if isinstance(result, Exception)]
+        if errors:
+            raise errors[0]
         return True
 
     async def get_cex_balances(self, ccy: str = 'ETH'):
@@ -143,41 +252,42 @@ class Binance(CEX, Logger):
         if available_balance:
             balances['Main CEX Account'] = float(available_balance[0]['free'])
 
-        sub_list = (await self.get_sub_list())['subAccounts']
+        sub_list = await self.get_sub_list()
+        balances.update(await self.get_sub_balances(sub_list, ccy))
 
-        for sub_data in sub_list:
-            sub_name = sub_data['email']
-            sub_balances = await self.get_sub_balance(sub_name)
-            balances[sub_name] = float(
-                [balance for balance in sub_balances['balances'] if balance['asset'] == ccy][0]['free'])
+        return balances
 
-            await asyncio.sleep(3)
+    async def get_deposit_history(self, ccy: str, since: int) -> list:
+        params = {
+            "coin": ccy,
+            "startTime": since
+        }
 
-        return balances
+        history = await self.request_weighted('/sapi/v1/capital/deposit/hisrec', params,
+                                              module_name='Deposit history')
+
+        # status 1 - success, 6 - credited but cannot withdraw, others are still waiting or rejected
+        return [
+            {'id': deposit['id'], 'address': deposit['address'], 'amount': float(deposit['amount']),
+             'ts': int(deposit['insertTime']), 'final': deposit['status'] in (1, 6)}
+            for deposit in history
+        ]
 
-    async def wait_deposit_confirmation(self, amount: float, old_balances: dict, ccy: str = 'ETH',
-                                        check_time: int = 45, timeout: int = 1200):
+    async def wait_deposit_confirmation(self, amount: float, ccy: str = 'ETH', check_time: int = 45,
+                                        timeout: int = 1200, address: str = None):
 
         if ccy == 'USDC.e':
             ccy = 'USDC'
 
-        self.logger_msg(*self.client.acc_info, msg=f"Start checking CEX balances")
-
-        await asyncio.sleep(10)
-        total_time = 0
-        while total_time < timeout:
-            new_sub_balances = await self.get_cex_balances(ccy=ccy)
-            for acc_name, acc_balance in new_sub_balances.items():
-
-                if acc_balance > old_balances[acc_name]:
-                    self.logger_msg(*self.client.acc_info, msg=f"Deposit {amount} {ccy} complete", type_msg='success')
-                    return True
-                else:
-                    continue
-            else:
-                total_time += check_time
-                self.logger_msg(*self.client.acc_info, msg=f"Deposit still in progress...", type_msg='warning')
-                await asyncio.sleep(check_time)
+        # the exchange reports the address a deposit came to, so it is matched to the wallet that sent it
+        address = address or get_deposit_address(self.client.account_name).address
+
+        self.logger_msg(*self.client.acc_info, msg=f"Start checking CEX deposits to {address}")
+
+        deposit = await get_deposit_watcher(self, ccy, check_time).wait(amount, address, timeout)
+        if deposit:
+            self.logger_msg(*self.client.acc_info, msg=f"Deposit {amount} {ccy} complete", type_msg='success')
+            return True
 
         self.logger_msg(*self.client.acc_info, msg=f"Deposit does not complete in {timeout} seconds", type_msg='error')
 
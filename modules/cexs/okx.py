@@ -1,4 +1,5 @@
 import hmac
+import time
 import base64
 import asyncio
 
@@ -7,10 +8,25 @@ from modules import CEX, Logger
 from datetime import datetime, timezone
 
 from modules.interfaces import SoftwareExceptionWithoutRetry
+from utils.address_book import get_deposit_address
+from utils.deposit_watcher import get_deposit_watcher
+from utils.rate_limiter import get_rate_limiter
 from utils.tools import helper
+from settings import CEX_SWEEP_WORKERS
+
+# (requests, seconds) per endpoint from the OKX API docs, shared by every account of the process
+OKX_RATE_LIMITS = {
+    'subaccount_list': (2, 2),
+    'subaccount_balances': (6, 1),
+    'balances': (6, 1),
+    'deposit_history': (6, 1),
+    'transfer': (1, 1),
+}
 
 
 class OKX(CEX, Logger):
+    api_url = "https://www.okx.cab"
+
     def __init__(self, client):
         self.client = client
         Logger.__init__(self)
@@ -19,7 +35,7 @@ class OKX(CEX, Logger):
     async def get_headers(self, request_path: str, method: str = "GET", body: str = ""):
         try:
             timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
-            prehash_string = timestamp + method.upper() + request_path[19:] + body
+            prehash_string = timestamp + method.upper() + request_path[len(self.api_url):] + body
             secret_key_bytes = self.api_secret.encode('utf-8')
             signature = hmac.new(secret_key_bytes, prehash_string.encode('utf-8'), sha256).digest()
             encoded_signature = base64.b64encode(signature).decode('utf-8')
@@ -36,7 +52,7 @@ class OKX(CEX, Logger):
             raise SoftwareExceptionWithoutRetry(f'Bad headers for OKX request: {error}')
 
     async def get_currencies(self, ccy: str = 'ETH'):
-        url = 'https://www.okx.cab/api/v5/asset/currencies'
+        url = f'{self.api_url}/api/v5/asset/currencies'
 
         params = {'ccy': ccy}
 
@@ -44,6 +60,46 @@ class OKX(CEX, Logger):
 
         return await self.make_request(url=url, headers=headers, params=params, module_name='Token info')
 
+    async def request_limited(self, endpoint: str, url: str, method: str = 'GET', body: str = '',
+                              module_name: str = 'Request'):
+        await get_rate_limiter(f'OKX {endpoint}', *OKX_RATE_LIMITS[endpoint]).acquire()
+        # signed only after the wait, OKX rejects a timestamp older than 30 seconds
+        headers = await self.get_headers(request_path=url, method=method, body=body)
+        return await self.make_request(method=method, url=url, data=body or None, headers=headers,
+                                       module_name=module_name)
+
+    async def get_sub_list(self) -> list:
+        url_sub_list = f"{self.api_url}/api/v5/users/subaccount/list"
+        return await self.request_limited('subaccount_list', url=url_sub_list, module_name='Get subAccounts list')
+
+    async def get_sub_balance(self, sub_name: str, ccy: str) -> float:
+        url_sub_balance = f"{self.api_url}/api/v5/asset/subaccount/balances?subAcct={sub_name}&ccy={ccy}"
+        sub_balance = await self.request_limited('subaccount_balances', url=url_sub_balance,
+                                                 module_name='Get subAccount balance')
+        return float(sub_balance[0]['availBal']) if sub_balance else 0.0
+
+    async def get_sub_balances(self, sub_list: list, ccy: str) -> dict:
+        sub_names = [sub_data['subAcct'] for sub_data in sub_list]
+        sub_balances = await asyncio.gather(*[self.get_sub_balance(sub_name, ccy) for sub_name in sub_names])
+        return dict(zip(sub_names, sub_balances))
+
+    async def transfer_from_subaccount(self, sub_name: str, ccy: str, amount: float):
+        body = {
+            "ccy": ccy,
+            "type": "2",
+            "amt": f"{amount}",
+            "from": "6",
+            "to": "6",
+            "subAcct": sub_name
+        }
+
+        url_transfer = f"{self.api_url}/api/v5/asset/transfer"
+        await self.request_limited('transfer', method="POST", url=url_transfer, body=str(body),
+                                   module_name='SubAccount transfer')
+
+        self.logger_msg(*self.client.acc_info,
+                        msg=f"Transfer {amount} {ccy} from {sub_name} to main account complete", type_msg='success')
+
     @helper
     async def transfer_from_subaccounts(self, ccy:str = 'ETH', amount:float = None, silent_mode:bool = False):
 
@@ -53,50 +109,46 @@ class OKX(CEX, Logger):
         if not silent_mode:
             self.logger_msg(*self.client.acc_info, msg=f'Checking subAccounts balance')
 
-        url_sub_list = "https://www.okx.cab/api/v5/users/subaccount/list"
-
-        flag = True
-        headers = await self.get_headers(request_path=url_sub_list)
-        sub_list = await self.make_request(url=url_sub_list, headers=headers, module_name='Get subAccounts list')
-        await asyncio.sleep(1)
-
-        for sub_data in sub_list:
-            sub_name = sub_data['subAcct']
-
-            url_sub_balance = f"https://www.okx.cab/api/v5/asset/subaccount/balances?subAcct={sub_name}&ccy={ccy}"
-            headers = await self.get_headers(request_path=url_sub_balance)
-
-            sub_balance = (await self.make_request(url=url_sub_balance, headers=headers,
-                                                   module_name='Get subAccount balance'))
-
-            if sub_balance:
-                sub_balance = float(sub_balance[0]['availBal'])
-
-            await asyncio.sleep(1)
-
-            if sub_balance != 0.0:
-                flag = False
-                amount = amount if amount else sub_balance
-                self.logger_msg(*self.client.acc_info, msg=f'{sub_name} | subAccount balance : {sub_balance} {ccy}')
-
-                body = {
-                    "ccy": ccy,
-                    "type": "2",
-                    "amt": f"{amount}",
-                    "from": "6",
-                    "to": "6",
-                    "subAcct": sub_name
-                }
-
-                url_transfer = "https://www.okx.cab/api/v5/asset/transfer"
-                headers = await self.get_headers(method="POST", request_path=url_transfer, body=str(body))
-                await self.make_request(method="POST", url=url_transfer, data=str(body), headers=headers,
-                                        module_name='SubAccount transfer')
-
-                self.logger_msg(*self.client.acc_info,
-                                msg=f"Transfer {amount} {ccy} to main account complete", type_msg='success')
-        if flag and not silent_mode:
-            self.logger_msg(*self.client.acc_info, msg=f'subAccounts balance: 0 {ccy}', type_msg='warning')
+        phases = {}
+        phase_start_time = time.perf_counter()
+        sub_list = await self.get_sub_list()
+        phases['list'] = time.perf_counter() - phase_start_time
+
+        phase_start_time = time.perf_counter()
+        sub_balances = await self.get_sub_balances(sub_list, ccy)
+        funded = {sub_name: sub_balance for sub_name, sub_balance in sub_balances.items() if sub_balance > 0}
+        phases['balances'] = time.perf_counter() - phase_start_time
+
+        if not funded:
+            if not silent_mode:
+                self.logger_msg(*self.client.acc_info, msg=f'subAccounts balance: 0 {ccy}', type_msg='warning')
+            return True
+
+        for sub_name, sub_balance in funded.items():
+            self.logger_msg(*self.client.acc_info, msg=f'{sub_name} | subAccount balance : {sub_balance} {ccy}')
+
+        semaphore = asyncio.Semaphore(CEX_SWEEP_WORKERS)
+
+        async def transfer_worker(sub_name: str, sub_amount: float):
+            async with semaphore:
+                await self.transfer_from_subaccount(sub_name, ccy, sub_amount)
+                return sub_amount
+
+        phase_start_time = time.perf_counter()
+        sub_amounts = {sub_name: amount if amount else sub_balance for sub_name, sub_balance in funded.items()}
+        transfers = await asyncio.gather(
+            *[transfer_worker(sub_name, sub_amount) for sub_name, sub_amount in sub_amounts.items()],
+            return_exceptions=True)
+        phases['transfers'] = time.perf_counter() - phase_start_time
+
+        moved = {sub_name: result for sub_name, result in zip(sub_amounts, transfers)
+                 if not isinstance(result, Exception)}
+        self.report_sweep(ccy, len(sub_list), funded, moved, phases)
+
+        errors = [result for result in transfers if isinstance(result, Exception)]
+        if errors:
+            # moved subAccounts have zero balance on the next try, so only the failed ones are transferred again
+            raise errors[0]
         return True
 
     @helper
@@ -107,7 +159,7 @@ class OKX(CEX, Logger):
         if ccy == 'USDC.e':
             ccy = 'USDC'
 
-        url_balance = f"https://www.okx.cab/api/v5/account/balance?ccy={ccy}"
+        url_balance = f"{self.api_url}/api/v5/account/balance?ccy={ccy}"
         headers = await self.get_headers(request_path=url_balance)
         balance = (await self.make_request(url=url_balance, headers=headers,
                                            module_name='Trading account'))[0]["details"]
@@ -125,7 +177,7 @@ class OKX(CEX, Logger):
                     "to": "6"
                 }
 
-                url_transfer = "https://www.okx.cab/api/v5/asset/transfer"
+                url_transfer = f"{self.api_url}/api/v5/asset/transfer"
                 headers = await self.get_headers(request_path=url_transfer, body=str(body), method="POST")
                 await self.make_request(url=url_transfer, data=str(body), method="POST", headers=headers,
                                         module_name='Trading account')
@@ -141,62 +193,51 @@ class OKX(CEX, Logger):
 
     async def get_cex_balances(self, ccy:str = 'ETH'):
         balances = {}
-        url_sub_list = "https://www.okx.cab/api/v5/users/subaccount/list"
 
         await asyncio.sleep(10)
 
         if ccy == 'USDC.e':
             ccy = 'USDC'
 
-        headers = await self.get_headers(request_path=url_sub_list)
-        sub_list = await self.make_request(url=url_sub_list, headers=headers, module_name='Get subAccounts list')
-
-        url_balance = f"https://www.okx.cab/api/v5/asset/balances?ccy={ccy}"
+        sub_list = await self.get_sub_list()
 
-        headers = await self.get_headers(request_path=url_balance)
+        url_balance = f"{self.api_url}/api/v5/asset/balances?ccy={ccy}"
 
-        balance = (await self.make_request(url=url_balance, headers=headers, module_name='Get Account balance'))
+        balance = await self.request_limited('balances', url=url_balance, module_name='Get Account balance')
 
         if balance:
             balances['Main CEX Account'] = float(balance[0]['availBal'])
 
-        for sub_data in sub_list:
-            sub_name = sub_data['subAcct']
+        balances.update(await self.get_sub_balances(sub_list, ccy))
 
-            url_sub_balance = f"https://www.okx.cab/api/v5/asset/subaccount/balances?subAcct={sub_name}&ccy={ccy}"
-            headers = await self.get_headers(request_path=url_sub_balance)
-
-            sub_balance = (await self.make_request(url=url_sub_balance, headers=headers,
-                                                   module_name='Get subAccount balance'))
-            await asyncio.sleep(3)
+        return balances
 
-            if sub_balance:
-                balances[sub_name] = float(sub_balance[0]['availBal'])
+    async def get_deposit_history(self, ccy: str, since: int) -> list:
+        url_history = f"{self.api_url}/api/v5/asset/deposit-history?ccy={ccy}&before={since}"
+        history = await self.request_limited('deposit_history', url=url_history, module_name='Deposit history')
 
-        return balances
+        # state 1 - credited, 2 - successful, others are still waiting or stopped
+        return [
+            {'id': deposit['depId'], 'address': deposit['to'], 'amount': float(deposit['amt']),
+             'ts': int(deposit['ts']), 'final': deposit['state'] in ('1', '2')}
+            for deposit in history
+        ]
 
-    async def wait_deposit_confirmation(self, amount:float, old_sub_balances:dict, ccy:str = 'ETH',
-                                        check_time:int = 45, timeout:int = 1200):
+    async def wait_deposit_confirmation(self, amount:float, ccy:str = 'ETH', check_time:int = 45,
+                                        timeout:int = 1200, address:str = None):
 
         if ccy == 'USDC.e':
             ccy = 'USDC'
 
-        self.logger_msg(*self.client.acc_info, msg=f"Start checking CEX balances")
+        # the exchange reports the address a deposit came to, so it is matched to the wallet that sent it
+        address = address or get_deposit_address(self.client.account_name).address
 
-        await asyncio.sleep(10)
-        total_time = 0
-        while total_time < timeout:
-            new_sub_balances = await self.get_cex_balances(ccy=ccy)
-            for sub_name, sub_balance in new_sub_balances.items():
-                if sub_balance > old_sub_balances[sub_name]:
-                    self.logger_msg(*self.client.acc_info, msg=f"Deposit {amount} {ccy} complete", type_msg='success')
-                    return True
-                else:
-                    continue
-            else:
-                total_time += check_time
-                self.logger_msg(*self.client.acc_info, msg=f"Deposit still in progress...", type_msg='warning')
-                await asyncio.sleep(check_time)
+        self.logger_msg(*self.client.acc_info, msg=f"Start checking CEX deposits to {address}")
+
+        deposit = await get_deposit_watcher(self, ccy, check_time).wait(amount, address, timeout)
+        if deposit:
+            self.logger_msg(*self.client.acc_info, msg=f"Deposit {amount} {ccy} complete", type_msg='success')
+            return True
 
         raise SoftwareExceptionWithoutRetry(f"Deposit does not complete in {timeout} seconds")
 
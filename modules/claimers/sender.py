@@ -1,5 +1,5 @@
 from modules import Logger
-from modules.interfaces import SoftwareExceptionWithoutRetry
+from utils.address_book import get_deposit_address
 from utils.tools import helper
 from config import TOKENS_PER_CHAIN
 
@@ -13,27 +13,16 @@ class Starknet(Logger):
     async def transfer_strk(self):
         await self.client.initialize_account()
 
-        try:
-            with open('./data/services/cex_withdraw_list.json') as file:
-                from json import load
-                cex_withdraw_list = load(file)
-        except:
-            self.logger_msg(None, None, f"Bad data in cex_withdraw_list.json", 'error')
-
-        try:
-            cex_wallet = cex_withdraw_list[self.client.account_name]
-        except Exception as error:
-            raise SoftwareExceptionWithoutRetry(f'There is no wallet listed for deposit to CEX: {error}')
+        deposit_address = get_deposit_address(self.client.account_name)
 
         amount_in_wei, amount, _ = await self.client.get_token_balance(token_name='STRK')
-        cex_wallet_info = f"{cex_wallet[:10]}....{cex_wallet[-10:]}"
-        self.logger_msg(*self.client.acc_info, msg=f'Transfer {amount} STRK to {cex_wallet_info}')
+        self.logger_msg(*self.client.acc_info, msg=f'Transfer {amount} STRK to {deposit_address.short_info}')
 
         transfer_call = self.client.prepare_call(
             contract_address=TOKENS_PER_CHAIN['Starknet']['STRK'],
             selector_name="transfer",
             calldata=[
-                int(cex_wallet, 16),
+                deposit_address.felt,
                 amount_in_wei, 0
             ]
         )
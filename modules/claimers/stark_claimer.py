@@ -1,5 +1,6 @@
-import asyncio
 import json
+import asyncio
+import functools
 from time import time
 
 from datetime import datetime, timezone
@@ -8,11 +9,21 @@ from eth_utils import to_wei
 
 from config import STARKNET_CLAIM_CONTRACT, ETHEREUM_CLAIM_CONTRACT
 from modules import Logger, StarknetClient
-from modules.interfaces import RequestClient, SoftwareException
+from modules.interfaces import RequestClient, SoftwareException, SoftwareExceptionWithoutRetry
 from settings import TWO_CAPTCHA_API_KEY
 from utils.tools import helper
 
 
+@functools.cache
+def load_provision_data() -> dict:
+    provision_data = {}
+    for i in range(11):
+        with open(f'./data/provision_data/starknet/starknet-{i}.json') as file:
+            for item in json.load(file)["eligibles"]:
+                provision_data[int(item['identity'], 16)] = item
+    return provision_data
+
+
 class ClaimerStarknet(Logger, RequestClient):
     def __init__(self, client: StarknetClient):
         self.client = client
@@ -158,25 +169,21 @@ class ClaimerStarknet(Logger, RequestClient):
 
         self.logger_msg(*self.client.acc_info, msg=f'$STRK successfully claimed', type_msg='success')
 
+    def get_eligibility(self):
+        eligible_data = load_provision_data().get(self.client.address)
+        if eligible_data:
+            amount = eligible_data['amount']
+            return amount, to_wei(amount, 'ether'), eligible_data['merkle_index'], eligible_data['merkle_path']
+
     @helper
     async def claim_onchain(self):
         await self.client.initialize_account()
 
         self.logger_msg(*self.client.acc_info, msg=f'On-chain claim $STRK')
-        merkly_index = 0
-        amount = 0
-        merkle_path = None
-        for i in range(11):
-            with open(f'./data/provision_data/starknet/starknet-{i}.json') as file:
-                data = json.load(file)
-                for item in data["eligibles"]:
-                    if hex(int(item['identity'], 16)) == hex(self.client.address):
-                        merkle_path = item['merkle_path']
-                        amount = item['amount']
-                        merkly_index = item['merkle_index']
-                        amount_in_wei = to_wei(item['amount'], 'ether')
-
-        if merkle_path and merkly_index and amount_in_wei:
+
+        eligible_data = self.get_eligibility()
+        if eligible_data:
+            amount, amount_in_wei, merkly_index, merkle_path = eligible_data
             self.logger_msg(
                 *self.client.acc_info, msg=f'This wallet is eligible to claim {amount} $STRK', type_msg='success')
 
@@ -193,4 +200,4 @@ class ClaimerStarknet(Logger, RequestClient):
             )
 
             return await self.client.send_transaction(claim_call)
-        raise SoftwareException('This account is not eligible!')
+        raise SoftwareExceptionWithoutRetry('This account is not eligible!')
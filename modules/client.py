@@ -1,21 +1,26 @@
+import time
 import asyncio
 import random
 
 from asyncio import sleep
-from aiohttp import ClientSession, TCPConnector
-from aiohttp_socks import ProxyConnector
 from eth_typing import HexStr
 from web3.contract import AsyncContract
 from web3.exceptions import TransactionNotFound, TimeExhausted
-from modules.interfaces import BlockchainException, SoftwareException
+from modules.interfaces import BlockchainException, SoftwareException, classify_error
 from modules import Logger
 from utils.networks import Network
+from utils.events import emit_event
+from utils.signing import run_signing, sign_evm_transaction
+from utils.gas_oracle import get_gas_oracle
+from utils.retry import CIRCUIT_BREAKER
+from utils.web3_pool import get_client_session, get_pooled_w3
 from config import ERC20_ABI, TOKENS_PER_CHAIN
-from web3 import AsyncHTTPProvider, AsyncWeb3
+from web3 import AsyncWeb3
 
 
 class Client(Logger):
-    def __init__(self, account_name: str | int, private_key: str, network: Network, proxy: None | str = None):
+    def __init__(self, account_name: str | int, private_key: str, network: Network, proxy: None | str = None,
+                 managed: bool = False):
         Logger.__init__(self)
         self.network = network
         self.eip1559_support = network.eip1559_support
@@ -24,13 +29,13 @@ class Client(Logger):
         self.chain_id = network.chain_id
 
         self.proxy_init = proxy
-        self.session = ClientSession(connector=ProxyConnector.from_url(f"http://{proxy}", verify_ssl=False)
-                                     if proxy else TCPConnector(verify_ssl=False))
+        self.session = get_client_session(proxy)
         self.request_kwargs = {"proxy": f"http://{proxy}"} if proxy else {}
         self.rpc = random.choice(network.rpc)
-        self.w3 = AsyncWeb3(AsyncHTTPProvider(self.rpc, request_kwargs=self.request_kwargs))
+        self.w3 = self.get_w3(self.rpc)
         self.account_name = str(account_name)
         self.private_key = private_key
+        self.managed = managed
         self.address = AsyncWeb3.to_checksum_address(self.w3.eth.account.from_key(private_key).address)
         self.acc_info = account_name, self.address
 
@@ -49,14 +54,22 @@ class Client(Logger):
         except:
             return error
 
+    def get_w3(self, rpc: str) -> AsyncWeb3:
+        return get_pooled_w3(rpc, self.proxy_init)
+
+    async def close(self):
+        # connections and the provider are shared with other clients on the same proxy, see close_web3_pool
+        if not self.session.closed:
+            await self.session.close()
+
     async def change_rpc(self):
         self.logger_msg(
             self.account_name, None, msg=f'Trying to replace RPC', type_msg='warning')
 
         if len(self.network.rpc) != 1:
-            rpcs_list = [rpc for rpc in self.network.rpc if rpc != self.rpc]
-            new_rpc = random.choice(rpcs_list)
-            self.w3 = AsyncWeb3(AsyncHTTPProvider(new_rpc, request_kwargs=self.request_kwargs))
+            new_rpc = CIRCUIT_BREAKER.pick_endpoint(self.network.rpc, exclude=self.rpc)
+            self.rpc = new_rpc
+            self.w3 = self.get_w3(new_rpc)
             self.logger_msg(
                 self.account_name, None,
                 msg=f'RPC successfully replaced. New RPC: {new_rpc}', type_msg='success')
@@ -136,14 +149,7 @@ class Client(Logger):
         ).call()
 
     async def get_priotiry_fee(self) -> int:
-        fee_history = await self.w3.eth.fee_history(25, 'latest', [20.0])
-        non_empty_block_priority_fees = [fee[0] for fee in fee_history["reward"] if fee[0] != 0]
-
-        divisor_priority = max(len(non_empty_block_priority_fees), 1)
-
-        priority_fee = int(round(sum(non_empty_block_priority_fees) / divisor_priority))
-
-        return priority_fee
+        return (await get_gas_oracle(self.network).get_fees())['priority_fee']
 
     async def prepare_transaction(self, value: int = 0) -> dict:
         try:
@@ -156,8 +162,9 @@ class Client(Logger):
 
             if self.network.eip1559_support:
 
-                base_fee = await self.w3.eth.gas_price
-                max_priority_fee_per_gas = await self.get_priotiry_fee()
+                fees = await get_gas_oracle(self.network).get_fees()
+                base_fee = fees['gas_price']
+                max_priority_fee_per_gas = fees['priority_fee']
 
                 if self.network.name == 'Fantom':
                     max_priority_fee_per_gas = int(base_fee / 4)
@@ -171,11 +178,11 @@ class Client(Logger):
                 if self.network.name == 'BNB Chain':
                     tx_params['gasPrice'] = self.w3.to_wei(round(random.uniform(1.2, 1.5), 1), 'gwei')
                 else:
-                    tx_params['gasPrice'] = await self.w3.eth.gas_price
+                    tx_params['gasPrice'] = (await get_gas_oracle(self.network).get_fees())['gas_price']
 
             return tx_params
         except Exception as error:
-            raise BlockchainException(f'{self.get_normalize_error(error)}')
+            raise BlockchainException(f'{self.get_normalize_error(error)}', code=classify_error(error))
 
     async def make_approve(self, token_address: str, spender_address: str, amount_in_wei: int) -> bool:
         transaction = await self.get_contract(token_address).functions.approve(
@@ -212,7 +219,7 @@ class Client(Logger):
             await sleep(random.randint(5, 9))
             return result
         except Exception as error:
-            raise BlockchainException(f'{self.get_normalize_error(error)}')
+            raise BlockchainException(f'{self.get_normalize_error(error)}', code=classify_error(error))
 
     async def send_transaction(
             self, transaction, need_hash: bool = False, without_gas: bool = False, poll_latency: int = 10,
@@ -222,19 +229,23 @@ class Client(Logger):
             if not without_gas:
                 transaction['gas'] = int((await self.w3.eth.estimate_gas(transaction)) * 1.5)
         except Exception as error:
-            raise BlockchainException(f'{self.get_normalize_error(error)}')
+            raise BlockchainException(f'{self.get_normalize_error(error)}', code=classify_error(error))
 
         try:
-            singed_tx = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-            tx_hash = self.w3.to_hex(await self.w3.eth.send_raw_transaction(singed_tx.rawTransaction))
+            submit_start_time = time.perf_counter()
+            raw_tx = await run_signing(sign_evm_transaction, transaction, self.private_key)
+            tx_hash = self.w3.to_hex(await self.w3.eth.send_raw_transaction(raw_tx))
+            emit_event('tx_submit', tx_hash=tx_hash, endpoint=self.rpc,
+                       duration=round(time.perf_counter() - submit_start_time, 3))
         except Exception as error:
             if self.get_normalize_error(error) == 'already known':
                 self.logger_msg(*self.acc_info, msg='RPC got error, but tx was send', type_msg='warning')
                 return True
             else:
-                raise BlockchainException(f'{self.get_normalize_error(error)}')
+                raise BlockchainException(f'{self.get_normalize_error(error)}', code=classify_error(error))
 
         total_time = 0
+        confirm_start_time = time.perf_counter()
         timeout = timeout if self.network.name != 'Polygon' else 1200
 
         while True:
@@ -242,6 +253,8 @@ class Client(Logger):
                 receipts = await self.w3.eth.get_transaction_receipt(tx_hash)
                 status = receipts.get("status")
                 if status == 1:
+                    emit_event('tx_confirm', tx_hash=tx_hash, endpoint=self.rpc, status='success',
+                               duration=round(time.perf_counter() - confirm_start_time, 3))
                     message = f'Transaction was successful: {self.explorer}tx/{tx_hash}'
                     self.logger_msg(*self.acc_info, msg=message, type_msg='success')
                     if need_hash:
@@ -250,6 +263,8 @@ class Client(Logger):
                 elif status is None:
                     await asyncio.sleep(poll_latency)
                 else:
+                    emit_event('tx_confirm', tx_hash=tx_hash, endpoint=self.rpc, status='failed',
+                               duration=round(time.perf_counter() - confirm_start_time, 3))
                     self.logger_msg(*self.acc_info, msg=f'Transaction failed: {self.explorer}tx/{tx_hash}',
                                     type_msg='error')
                     return False
@@ -266,6 +281,7 @@ class Client(Logger):
                 await asyncio.sleep(poll_latency)
 
             except Exception as error:
+                emit_event('rpc_error', endpoint=self.rpc, error=str(error))
                 self.logger_msg(*self.acc_info, msg=f'RPC got autims response. Error: {error}', type_msg='warning')
                 total_time += poll_latency
                 await asyncio.sleep(poll_latency)
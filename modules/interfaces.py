@@ -1,8 +1,8 @@
-from aiohttp import ClientSession
 from loguru import logger
 from sys import stderr
 from datetime import datetime
 from abc import ABC
+from enum import Enum
 from random import uniform
 from config import CHAIN_NAME
 from settings import GLOBAL_NETWORK, OKX_API_KEY, OKX_API_PASSPHRAS, OKX_API_SECRET, BINANCE_API_KEY, BINANCE_API_SECRET
@@ -14,52 +14,166 @@ def get_user_agent():
             f' Chrome/119.0.0.0 Safari/{random_version} Edg/119.0.0.0')
 
 
-class PriceImpactException(Exception):
+class ErrorCode(str, Enum):
+    UNKNOWN = 'unknown'
+    NODE = 'node'
+    RATE_LIMITED = 'rate_limited'
+    INVALID_NONCE = 'invalid_nonce'
+    DUPLICATE_TX = 'duplicate_tx'
+    TX_REJECTED = 'tx_rejected'
+    FEE_TOO_LOW = 'fee_too_low'
+    INSUFFICIENT_FUNDS = 'insufficient_funds'
+    ALREADY_CLAIMED = 'already_claimed'
+    NOT_DEPLOYED = 'not_deployed'
+    VALIDATION_FAILED = 'validation_failed'
+    EXECUTION_REVERTED = 'execution_reverted'
+
+
+NON_RETRYABLE_CODES = {
+    ErrorCode.INSUFFICIENT_FUNDS, ErrorCode.ALREADY_CLAIMED, ErrorCode.NOT_DEPLOYED,
+    ErrorCode.VALIDATION_FAILED, ErrorCode.EXECUTION_REVERTED,
+}
+RESYNC_NONCE_CODES = {ErrorCode.INVALID_NONCE, ErrorCode.DUPLICATE_TX, ErrorCode.TX_REJECTED}
+
+# Starknet JSON-RPC error codes and HTTP statuses
+STARKNET_ERROR_CODES = {
+    '20': ErrorCode.NOT_DEPLOYED,
+    '52': ErrorCode.INVALID_NONCE,
+    '53': ErrorCode.FEE_TOO_LOW,
+    '54': ErrorCode.INSUFFICIENT_FUNDS,
+    '55': ErrorCode.VALIDATION_FAILED,
+    '59': ErrorCode.DUPLICATE_TX,
+    '429': ErrorCode.RATE_LIMITED,
+    '500': ErrorCode.NODE,
+    '502': ErrorCode.NODE,
+    '503': ErrorCode.NODE,
+    '504': ErrorCode.NODE,
+}
+
+# the order matters: a contract error about balance is insufficient funds, not a plain revert
+ERROR_MARKERS = (
+    (ErrorCode.RATE_LIMITED, ('too many requests', 'rate limit', 'too many visits')),
+    (ErrorCode.INVALID_NONCE, ('invalid transaction nonce', 'nonce too low', 'nonce too high', 'invalid nonce')),
+    (ErrorCode.DUPLICATE_TX, ('already exists in the mempool', 'already known', 'replacement transaction underpriced')),
+    (ErrorCode.FEE_TOO_LOW, ('max fee is smaller than the minimal', 'insufficient max fee',
+                             'max fee per gas less than block base fee', 'fee too low')),
+    (ErrorCode.INSUFFICIENT_FUNDS, ('insufficient funds', 'gas required exceeds', 'account balance is smaller',
+                                    'exceeds balance', 'u256_sub overflow', 'insufficient balance')),
+    (ErrorCode.ALREADY_CLAIMED, ('already claimed', 'already_claimed')),
+    (ErrorCode.NOT_DEPLOYED, ('contract not found', 'is not deployed', 'no contract with address')),
+    (ErrorCode.VALIDATION_FAILED, ('account validation failed', 'invalid signature')),
+    (ErrorCode.TX_REJECTED, ('was rejected',)),
+    (ErrorCode.EXECUTION_REVERTED, ('execution reverted', 'contract error', 'transaction execution error',
+                                    'was reverted')),
+    (ErrorCode.NODE, ('rpc request failed', 'bad gateway', 'service unavailable', 'internal error',
+                      'server disconnected', 'cannot connect to host', 'connection reset')),
+)
+
+
+def classify_error(error: Exception | str) -> ErrorCode:
+    code = getattr(error, 'code', None)
+    if isinstance(code, ErrorCode):
+        return code
+    if code is not None and str(code) in STARKNET_ERROR_CODES:
+        return STARKNET_ERROR_CODES[str(code)]
+
+    message = str(error).lower()
+    for error_code, markers in ERROR_MARKERS:
+        if any(marker in message for marker in markers):
+            return error_code
+    return ErrorCode.UNKNOWN
+
+
+class CodedException(Exception):
+    def __init__(self, *args, code: ErrorCode = None, endpoint: str = None):
+        super().__init__(*args)
+        self.code = code or classify_error(args[0] if args else '')
+        self.endpoint = endpoint
+
+
+class PriceImpactException(CodedException):
     pass
 
 
-class BlockchainException(Exception):
+class BlockchainException(CodedException):
     pass
 
 
-class BlockchainExceptionWithoutRetry(Exception):
+class BlockchainExceptionWithoutRetry(CodedException):
     pass
 
 
-class SoftwareException(Exception):
+class SoftwareException(CodedException):
     pass
 
 
-class SoftwareExceptionWithoutRetry(Exception):
+class SoftwareExceptionWithoutRetry(CodedException):
     pass
 
 
-class BridgeExceptionWithoutRetry(Exception):
+class BridgeExceptionWithoutRetry(CodedException):
     pass
 
 
-class DepositExceptionWithoutRetry(Exception):
+class DepositExceptionWithoutRetry(CodedException):
     pass
 
 
+LOGGER_FORMAT = "<cyan>{time:HH:mm:ss}</cyan> | <level>" "{level: <8}</level> | <level>{message}</level>"
+LOGGER_CONFIGURED = False
+ACCOUNT_INDEXES = {}
+
+
+def is_event_record(record) -> bool:
+    return 'event' in record['extra']
+
+
+def is_human_record(record) -> bool:
+    return 'event' not in record['extra']
+
+
+def configure_logger(forwarder=None):
+    global LOGGER_CONFIGURED
+    if LOGGER_CONFIGURED and forwarder is None:
+        return
+
+    logger.remove()
+    if forwarder is not None:
+        logger.add(lambda message: forwarder.put({'log': message.record['message'],
+                                                  'level': message.record['level'].name}),
+                   format="{message}", filter=is_human_record)
+        LOGGER_CONFIGURED = True
+        return
+
+    logger.add(stderr, format=LOGGER_FORMAT, filter=is_human_record, enqueue=True)
+    date = datetime.today().date()
+    logger.add(f"./data/logs/{date}.log", rotation="500 MB", level="INFO", format=LOGGER_FORMAT,
+               filter=is_human_record, enqueue=True)
+    logger.add(f"./data/logs/{date}.events.jsonl", rotation="500 MB", level="INFO", format="{message}",
+               filter=is_event_record, enqueue=True)
+    LOGGER_CONFIGURED = True
+
+
+def get_account_index(account_name) -> str:
+    if not ACCOUNT_INDEXES:
+        from config import ACCOUNT_NAMES
+        for index, name in enumerate(ACCOUNT_NAMES, 1):
+            ACCOUNT_INDEXES.setdefault(name, f"{index}/{len(ACCOUNT_NAMES)}")
+    return ACCOUNT_INDEXES.get(account_name, "1/1")
+
+
 class Logger(ABC):
     def __init__(self):
         self.logger = logger
-        self.logger.remove()
-        logger_format = "<cyan>{time:HH:mm:ss}</cyan> | <level>" "{level: <8}</level> | <level>{message}</level>"
-        self.logger.add(stderr, format=logger_format)
-        date = datetime.today().date()
-        self.logger.add(f"./data/logs/{date}.log", rotation="500 MB", level="INFO", format=logger_format)
+        configure_logger()
 
     def logger_msg(self, account_name, address, msg, type_msg: str = 'info'):
-        from config import ACCOUNT_NAMES
         class_name = self.__class__.__name__
         software_chain = CHAIN_NAME[GLOBAL_NETWORK]
         acc_index = '1/1'
 
         if account_name:
-            account_index = ACCOUNT_NAMES.index(account_name) + 1
-            acc_index = f"{account_index}/{len(ACCOUNT_NAMES)}"
+            acc_index = get_account_index(account_name)
 
         if isinstance(address, int):
             address = hex(address)
@@ -94,13 +208,19 @@ class CEX(ABC):
         else:
             raise SoftwareException('CEX don`t available now')
 
+    def update_limits(self, response):
+        pass
+
     async def make_request(self, method:str = 'GET', url:str = None, data:str = None, params:dict = None,
                            headers:dict = None, json:dict = None, module_name:str = 'Request',
                            content_type:str | None = "application/json"):
+        from aiohttp import ClientSession
+        from utils.profiler import get_trace_configs
 
-        async with ClientSession() as session:
+        async with ClientSession(trace_configs=get_trace_configs()) as session:
             async with session.request(method=method, url=url, headers=headers, data=data, json=json,
                                        params=params) as response:
+                self.update_limits(response)
                 data: dict = await response.json(content_type=content_type)
 
                 if self.class_name == 'Binance' and response.status in [200, 201]:
@@ -114,6 +234,19 @@ class CEX(ABC):
                 # self.logger.success(f"{self.info} {module_name}")
                 return data['data']
 
+    def report_sweep(self, ccy: str, subs_count: int, funded: dict, moved: dict, phases: dict):
+        from utils.events import emit_event
+
+        phases_info = ', '.join(f'{phase} {duration:.1f} s' for phase, duration in phases.items())
+        self.logger_msg(
+            *self.client.acc_info,
+            msg=f'Swept {len(moved)}/{len(funded)} funded subAccounts out of {subs_count}: '
+                f'{round(sum(moved.values()), 6)} {ccy} | {phases_info}',
+            type_msg='success' if moved else 'warning')
+        emit_event('cex_sweep', exchange=self.class_name, ccy=ccy, subaccounts=subs_count, funded=len(funded),
+                   transferred=len(moved), amount=round(sum(moved.values()), 6),
+                   phases={phase: round(duration, 3) for phase, duration in phases.items()})
+
 
 class RequestClient(ABC):
     def __init__(self, client):
@@ -122,6 +255,10 @@ class RequestClient(ABC):
     async def make_request(self, method:str = 'GET', url:str = None, headers:dict = None, params: dict = None,
                            data:str = None, json:dict = None):
 
+        from urllib.parse import urlparse
+
+        # API failures go to the circuit of the API host, not to the RPC of the client
+        endpoint = urlparse(url).netloc
         headers = (headers or {}) | {'User-Agent': get_user_agent()}
         async with self.client.session.request(method=method, url=url, headers=headers, data=data,
                                                params=params, json=json) as response:
@@ -133,8 +270,9 @@ class RequestClient(ABC):
                     return data
                 raise SoftwareException(
                     f"Bad request to {self.__class__.__name__} API. "
-                    f"Response status: {response.status}. Response: {await response.text()}")
+                    f"Response status: {response.status}. Response: {await response.text()}", endpoint=endpoint)
             except Exception as error:
                 raise SoftwareException(
                     f"Bad request to {self.__class__.__name__} API. "
-                    f"Response status: {response.status}. Response: {await response.text()} Error: {error}")
+                    f"Response status: {response.status}. Response: {await response.text()} Error: {error}",
+                    endpoint=endpoint)
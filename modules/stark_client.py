@@ -1,5 +1,6 @@
-import asyncio
 import json
+import asyncio
+import time
 import random
 
 from starknet_py.contract import Contract
@@ -11,12 +12,24 @@ from starknet_py.net.models.chains import StarknetChainId
 from starknet_py.net.full_node_client import FullNodeClient
 from starknet_py.hash.selector import get_selector_from_name
 from starknet_py.net.signer.stark_curve_signer import KeyPair
-from starknet_py.net.client_models import Call
+from starknet_py.net.client_models import Call, TransactionExecutionStatus, TransactionStatus
+from starknet_py.transaction_errors import (
+    TransactionNotReceivedError, TransactionRejectedError, TransactionRevertedError
+)
 
 from aiohttp import ClientSession, TCPConnector
 from aiohttp_socks import ProxyConnector
 from modules import Logger
-from modules.interfaces import get_user_agent, SoftwareException
+from modules.interfaces import (get_user_agent, classify_error, ErrorCode, SoftwareException,
+                               SoftwareExceptionWithoutRetry)
+from utils.events import CURRENT_MODULE, CURRENT_STEP, emit_event
+from utils.tools import file_lock
+from utils.signing import run_signing, sign_starknet_invoke
+from utils.tx_outbox import get_call_id, get_pending_tx, save_pending_tx, remove_pending_tx
+from utils.profiler import get_trace_configs
+from utils.gas_gate import get_gas_gate
+from utils.gas_oracle import get_gas_oracle
+from utils.retry import CIRCUIT_BREAKER
 from utils.networks import Network
 from config import (
     TOKENS_PER_CHAIN,
@@ -26,11 +39,21 @@ from config import (
 )
 
 
-from settings import USE_PROXY
+from settings import USE_PROXY, TX_FINALITY, TX_FINALITY_MODULES, TX_CHECK_INTERVAL
+
+FINALITY_LEVELS = {
+    TransactionStatus.RECEIVED: 1,
+    TransactionStatus.ACCEPTED_ON_L2: 2,
+    TransactionStatus.ACCEPTED_ON_L1: 3,
+}
+
+# the same 1000 checks by 20 seconds that wait_for_tx was given before
+TX_WAIT_TIMEOUT = 20000
 
 
 class StarknetClient(Logger):
-    def __init__(self, account_name: str, private_key: str, network: Network, proxy: None | str = None):
+    def __init__(self, account_name: str, private_key: str, network: Network, proxy: None | str = None,
+                 managed: bool = False):
         Logger.__init__(self)
         self.network = network
         self.token = network.token
@@ -42,16 +65,21 @@ class StarknetClient(Logger):
         key_pair = KeyPair.from_private_key(private_key)
         self.key_pair = key_pair
         self.session = self.get_proxy_for_account(self.proxy)
-        self.w3 = FullNodeClient(node_url=random.choice(network.rpc), session=self.session)
+        self.rpc = random.choice(network.rpc)
+        self.w3 = FullNodeClient(node_url=self.rpc, session=self.session)
 
         self.account_name = account_name
         self.private_key = private_key
+        self.managed = managed
         self.acc_info = None
         self.account = None
         self.address = None
         self.WALLET_TYPE = None
 
     async def initialize_account(self, check_balance:bool = False):
+        if self.account is not None:
+            return
+
         self.account, self.address, self.WALLET_TYPE = await self.get_wallet_auto(
             self.w3, self.key_pair,
             self.account_name, check_balance
@@ -61,6 +89,30 @@ class StarknetClient(Logger):
         self.acc_info = self.account_name, self.address
         self.account.ESTIMATED_FEE_MULTIPLIER = 1.5
 
+    async def close(self):
+        if not self.session.closed:
+            await self.session.close()
+
+    async def change_rpc(self):
+        self.logger_msg(
+            self.account_name, None, msg=f'Trying to replace RPC', type_msg='warning')
+
+        if len(self.network.rpc) != 1:
+            new_rpc = CIRCUIT_BREAKER.pick_endpoint(self.network.rpc, exclude=self.rpc)
+            self.rpc = new_rpc
+            self.w3 = FullNodeClient(node_url=new_rpc, session=self.session)
+            if self.account is not None:
+                self.account = Account(client=self.w3, address=self.address, key_pair=self.key_pair,
+                                       chain=StarknetChainId.MAINNET)
+                self.account.ESTIMATED_FEE_MULTIPLIER = 1.5
+            self.logger_msg(
+                self.account_name, None,
+                msg=f'RPC successfully replaced. New RPC: {new_rpc}', type_msg='success')
+        else:
+            self.logger_msg(
+                self.account_name, None,
+                msg=f'This network has only 1 RPC, no replacement is possible', type_msg='warning')
+
     async def get_wallet_auto(self, w3, key_pair, account_name, check_balance:bool = False):
         last_data = await self.check_stark_data_file(account_name)
         if last_data:
@@ -93,13 +145,14 @@ class StarknetClient(Logger):
                 except ClientError:
                     pass
 
-        raise RuntimeError('This wallet is not deployed!')
+        raise SoftwareExceptionWithoutRetry('This wallet is not deployed!', code=ErrorCode.NOT_DEPLOYED)
 
     @staticmethod
     def get_proxy_for_account(proxy):
         if USE_PROXY and proxy != "":
-            return ClientSession(connector=ProxyConnector.from_url(f"{proxy}", verify_ssl=True))
-        return ClientSession(connector=TCPConnector(verify_ssl=False))
+            return ClientSession(connector=ProxyConnector.from_url(f"{proxy}", verify_ssl=True),
+                                 trace_configs=get_trace_configs())
+        return ClientSession(connector=TCPConnector(verify_ssl=False), trace_configs=get_trace_configs())
 
     @staticmethod
     async def check_stark_data_file(account_name):
@@ -114,21 +167,26 @@ class StarknetClient(Logger):
             return data[account_name]
 
     @staticmethod
-    async def save_stark_data_file(account_name, address, wallet_type):
+    def write_stark_data_file(account_name, address, wallet_type):
         bad_progress_file_path = './data/services/stark_data.json'
-        try:
-            with open(bad_progress_file_path, 'r') as file:
-                data = json.load(file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            data = {}
+        with file_lock(bad_progress_file_path):
+            try:
+                with open(bad_progress_file_path, 'r') as file:
+                    data = json.load(file)
+            except (FileNotFoundError, json.JSONDecodeError):
+                data = {}
+
+            data[account_name] = {
+                'address': address,
+                'wallet_type': wallet_type,
+            }
 
-        data[account_name] = {
-            'address': address,
-            'wallet_type': wallet_type,
-        }
+            with open(bad_progress_file_path, 'w') as file:
+                json.dump(data, file, indent=4)
 
-        with open(bad_progress_file_path, 'w') as file:
-            json.dump(data, file, indent=4)
+    async def save_stark_data_file(self, account_name, address, wallet_type):
+        # the lock can be held by another worker process, waiting for it must not stop the event loop
+        await asyncio.to_thread(self.write_stark_data_file, account_name, address, wallet_type)
 
     @staticmethod
     def get_braavos_address(key_pair) -> int:
@@ -232,23 +290,99 @@ class StarknetClient(Logger):
             2 ** 128 - 1
         ])
 
+    @staticmethod
+    def get_finality() -> TransactionStatus:
+        return TransactionStatus(TX_FINALITY_MODULES.get(CURRENT_MODULE.get(), TX_FINALITY))
+
+    async def wait_for_finality(self, tx_hash: int, finality: TransactionStatus = None) -> TransactionStatus:
+        # unlike wait_for_tx, returns as soon as the status of the module is reached
+        finality = finality or self.get_finality()
+        total_time = 0
+        while True:
+            try:
+                tx_status = await self.account.client.get_transaction_status(tx_hash)
+            except ClientError as error:
+                if 'Transaction hash not found' not in error.message:
+                    raise
+                tx_status = None
+
+            if tx_status is not None:
+                if tx_status.finality_status == TransactionStatus.REJECTED:
+                    raise TransactionRejectedError()
+
+                if tx_status.execution_status == TransactionExecutionStatus.REVERTED:
+                    tx_receipt = await self.account.client.get_transaction_receipt(tx_hash)
+                    raise TransactionRevertedError(message=tx_receipt.revert_reason)
+
+                reached = FINALITY_LEVELS[tx_status.finality_status] >= FINALITY_LEVELS[finality]
+                if reached and tx_status.execution_status == TransactionExecutionStatus.SUCCEEDED:
+                    return tx_status.finality_status
+
+            if total_time >= TX_WAIT_TIMEOUT:
+                raise TransactionNotReceivedError()
+
+            total_time += TX_CHECK_INTERVAL
+            await asyncio.sleep(TX_CHECK_INTERVAL)
+
+    async def sign_invoke(self, calls):
+        # node requests stay in the event loop, the executor only builds and signs the transaction
+        cairo_version = await self.account.cairo_version
+        nonce = await self.account.get_nonce()
+        account_data = self.rpc, self.address, self.chain_id, cairo_version
+
+        # the estimate needs no signature with skip_validate, so it is not signed at all
+        estimate_tx = sign_starknet_invoke(account_data, None, calls, nonce, 0)
+        estimated_fee = await self.account.client.estimate_fee(estimate_tx, skip_validate=True)
+        max_fee = int(estimated_fee.overall_fee * self.account.ESTIMATED_FEE_MULTIPLIER)
+
+        return await run_signing(
+            sign_starknet_invoke, account_data, self.key_pair.private_key, calls, nonce, max_fee)
+
     async def send_transaction(self, *calls:list, check_hash:bool = False, hash_for_check:int = None):
+        module_name = CURRENT_MODULE.get()
+        outbox_key = None
+        if module_name and not check_hash:
+            outbox_key = self.account_name, module_name, CURRENT_STEP.get(), get_call_id(calls)
         try:
             tx_hash = hash_for_check
-            if not check_hash:
-                tx_hash = (await self.account.execute_v1(
-                    calls=calls,
-                    auto_estimate=True
-                )).transaction_hash
-
-            await self.account.client.wait_for_tx(tx_hash, check_interval=20, retries=1000)
+            if outbox_key:
+                # a restart after a crash waits for the transaction sent before it instead of sending a new one
+                tx_hash = await get_pending_tx(*outbox_key)
+                if tx_hash is not None:
+                    self.logger_msg(*self.acc_info, msg=f'Waiting for already sent transaction: {hex(tx_hash)}',
+                                    type_msg='warning')
+
+            if not check_hash and tx_hash is None:
+                gas_wait = await get_gas_gate(self.network).wait(self.account_name)
+                if gas_wait:
+                    emit_event('gas_hold', duration=round(gas_wait, 3))
+                submit_start_time = time.perf_counter()
+                invoke_tx = await self.sign_invoke(calls)
+                tx_hash = (await self.account.client.send_transaction(invoke_tx)).transaction_hash
+                if outbox_key:
+                    await save_pending_tx(*outbox_key, tx_hash)
+                emit_event('tx_submit', tx_hash=hex(tx_hash), endpoint=self.rpc,
+                           duration=round(time.perf_counter() - submit_start_time, 3))
+
+            confirm_start_time = time.perf_counter()
+            try:
+                finality_status = await self.wait_for_finality(tx_hash)
+            except Exception:
+                # only a crash or Ctrl-C during the wait leaves the entry, the next attempt sends a new transaction
+                if outbox_key:
+                    await remove_pending_tx(*outbox_key)
+                raise
+            if outbox_key:
+                await remove_pending_tx(*outbox_key)
+            emit_event('tx_confirm', tx_hash=hex(tx_hash), endpoint=self.rpc, finality=finality_status.value,
+                       duration=round(time.perf_counter() - confirm_start_time, 3))
 
             self.logger_msg(
                 *self.acc_info, msg=f'Transaction was successful: {self.explorer}tx/{hex(tx_hash)}', type_msg='success')
             return True
 
         except Exception as error:
-            raise SoftwareException(f'Send transaction | {self.get_normalize_error(error)}')
+            raise SoftwareException(f'Send transaction | {self.get_normalize_error(error)}', code=classify_error(error))
 
     async def make_request(self, method:str = 'GET', url:str = None, headers:dict = None, params: dict = None,
                            data:str = None, json:dict = None, module_name:str = None):
@@ -263,15 +397,7 @@ class StarknetClient(Logger):
             raise SoftwareException(f"Bad request to {module_name} API: {response.status}")
 
     async def get_gas_price(self):
-        url = 'https://alpha-mainnet.starknet.io/feeder_gateway/get_block?blockNumber=latest'
-
-        headers = {
-            'Content-Type': 'application/json; charset=utf-8'
-        }
-
-        data = (await self.make_request(url=url, headers=headers, module_name='Gas Price'))['strk_l1_gas_price']
-
-        return int(data, 16) / 10 ** 7
+        return (await get_gas_oracle(self.network).get_fees())['gas_price']
 
     async def get_token_price(self, token_name: str, vs_currency: str = 'usd') -> float:
         await asyncio.sleep(10)
@@ -12,17 +12,50 @@
     
     ACCOUNTS_IN_STREAM      | Количество кошельков в потоке на выполнение. Если всего 100 кошельков, а указать 10,
                                 то софт сделает 10 подходов по 10 кошельков
+    WORKER_PROCESSES        | Количество процессов. Кошельки делятся между процессами поровну, каждый процесс
+                                работает со своими потоками. 1 = без разделения
                                 
     EXCEL_PASSWORD          | Включает запрос пароля при входе в софт. Сначала установите пароль в таблице
     EXCEL_PAGE_NAME         | Название листа в таблице. Пример: 'Starknet' 
 """
 GLOBAL_NETWORK = 11             # 9 - для Starknet клеймера, 11 - для EVM клеймера
 ACCOUNTS_IN_STREAM = 1         # Количество кошельков в потоке
+WORKER_PROCESSES = 1            # Количество процессов
 WALLETS_TO_WORK = 0             # 0 / 3 / 3, 20 / [3, 20]
 
 '------------------------------------------------RETRY CONTROL---------------------------------------------------------'
 MAXIMUM_RETRY = 1000              # Количество повторений при ошибках
-SLEEP_TIME_RETRY = (5, 10)      # (минимум, максимум) секунд | Время сна после очередного повторения
+SLEEP_TIME_RETRY = (5, 10)      # (минимум, максимум) секунд | Время сна после первой ошибки, дальше растет с попытками
+RETRY_BACKOFF_MAX = 600         # секунд | Максимальное время сна между повторениями
+RETRY_BUDGET = 100              # Общий лимит повторений для всех кошельков процесса за RETRY_BUDGET_WINDOW
+RETRY_BUDGET_WINDOW = 60        # секунд
+CIRCUIT_FAILURES = 10           # Количество ошибок RPC/API подряд, после которых все повторения к нему встают на паузу
+CIRCUIT_COOLDOWN = 60           # секунд | Длительность паузы
+
+'------------------------------------------------TX CONTROL------------------------------------------------------------'
+TX_FINALITY = 'ACCEPTED_ON_L2'  # 'RECEIVED' / 'ACCEPTED_ON_L2' / 'ACCEPTED_ON_L1' | До какого статуса ждать транзакцию Starknet
+TX_FINALITY_MODULES = {         # Свой статус для отдельных модулей, RECEIVED засчитывается только с успешным исполнением
+    'claim_starknet': 'RECEIVED',
+}
+TX_CHECK_INTERVAL = 5           # секунд | Как часто проверять статус транзакции
+GAS_ORACLE_POLL = 2             # секунд | Как часто общий для всех кошельков оракул проверяет новый блок и цену газа
+MAX_GAS_PRICE = 0               # 0 - выключено | Транзакции Starknet ждут в очереди, пока газ выше (значение get_gas_price)
+GAS_RELEASE_RATE = 5            # Количество транзакций в секунду, которые отпускаются из очереди после падения газа
+
+'------------------------------------------------SIGNING CONTROL-------------------------------------------------------'
+# 'thread' быстрее: подпись Starknet идет в C-коде без GIL, а короткая подпись EVM дешевле передачи в процесс
+# замеры: python -m benchmarks.signing_lag --signer stark/evm
+SIGNING_EXECUTOR = 'thread'     # 'thread' / 'process' / None | Где подписывать транзакции, None = в основном потоке
+SIGNING_WORKERS = 4             # Количество потоков/процессов для подписи
+
+'------------------------------------------------PROFILE CONTROL-------------------------------------------------------'
+PROFILE_MODULES = False         # True или False | Замер времени, сети, CPU, RPC запросов и повторов по каждому модулю
+PROFILE_CPROFILE = False        # True или False | Сохраняет cProfile каждого типа модулей в data/logs/profiles
+
+'------------------------------------------------CEX CONTROL-----------------------------------------------------------'
+CEX_SWEEP_WORKERS = 5           # Количество одновременных переводов с субаккаунтов на основной аккаунт
+CEX_SWEEP_TIMEOUT = 1800        # секунд | Сбор с субаккаунтов ждет все кошельки запуска, застрявшие дольше этого не ждет
+BINANCE_RECV_WINDOW = 10000     # миллисекунд | Сколько Binance принимает подписанный запрос после его отправки, максимум 60000
 
 '------------------------------------------------SLEEP CONTROL---------------------------------------------------------'
 SLEEP_MODE = False
@@ -31,6 +64,8 @@ SLEEP_TIME_STREAM = (5, 10)      # (минимум, максимум) секун
 
 '------------------------------------------------PROXY CONTROL---------------------------------------------------------'
 USE_PROXY = False               # True или False | Включает использование прокси
+MAX_ACCOUNTS_PER_PROXY = 5      # Максимум кошельков, одновременно работающих через один прокси
+POOL_CONNECTIONS = 100          # Максимум открытых соединений через один прокси, общих для всех EVM кошельков
 
 '------------------------------------------------SECURE DATA-----------------------------------------------------------'
 # OKX API KEYS https://www.okx.com/ru/account/my-api
@@ -0,0 +1,53 @@
+import io
+
+from openpyxl import Workbook
+
+from utils.address_book import build_address_book
+from utils.tools import read_accounts_workbook
+
+ADDRESS_1 = '0x' + '01' * 32
+ADDRESS_3 = '0x' + '03' * 32
+
+
+def get_workbook(rows: list) -> io.BytesIO:
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = 'Starknet'
+    sheet.append(["Name", "Private Key", "Proxy", "CEX address"])
+    for row in rows:
+        sheet.append(row)
+
+    file = io.BytesIO()
+    workbook.save(file)
+    file.seek(0)
+    return file
+
+
+def test_empty_cex_cell_keeps_its_row():
+    file = get_workbook([
+        ['wallet-1', '0x1', 'proxy-1', ADDRESS_1],
+        ['wallet-2', '0x2', 'proxy-2', None],
+        ['wallet-3', '0x3', None, ADDRESS_3],
+    ])
+
+    account_names, private_keys, proxies, cex_wallets = read_accounts_workbook(file, 'Starknet')
+    assert account_names == ['wallet-1', 'wallet-2', 'wallet-3']
+    assert cex_wallets == [ADDRESS_1, None, ADDRESS_3]
+
+    address_book, errors = build_address_book(account_names, cex_wallets)
+    assert not errors
+    assert {account_name: item.address for account_name, item in address_book.items()} == {
+        'wallet-1': ADDRESS_1, 'wallet-3': ADDRESS_3}
+
+
+def test_lists_of_different_length_are_rejected():
+    address_book, errors = build_address_book(['wallet-1', 'wallet-2'], [ADDRESS_3])
+    assert address_book == {}
+    assert errors
+
+
+def test_bad_and_repeated_addresses_are_reported():
+    address_book, errors = build_address_book(
+        ['wallet-1', 'wallet-2', 'wallet-3'], [ADDRESS_1, 'not an address', ADDRESS_1])
+    assert list(address_book) == ['wallet-1']
+    assert len(errors) == 2
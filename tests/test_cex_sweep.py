@@ -0,0 +1,72 @@
+import asyncio
+
+from utils.cex_sweep import CexSweepJob
+
+
+class SweepWorker:
+    def __init__(self):
+        self.sweeps = 0
+
+    async def transfer_from_subs(self):
+        self.sweeps += 1
+        return True
+
+
+def test_sweep_starts_when_no_feeder_left():
+    async def main():
+        job, worker = CexSweepJob('OKX', timeout=60), SweepWorker()
+        job.add_feeder('wallet-1')
+        job.add_feeder('wallet-2')
+
+        first = asyncio.create_task(job.request('wallet-1', worker))
+        await asyncio.sleep(0.01)
+        assert not first.done() and 'wallet-1' in job.waiting
+
+        second = asyncio.create_task(job.request('wallet-2', worker))
+        assert await first is True and await second is True
+        return worker.sweeps
+
+    assert asyncio.run(main()) == 1
+
+
+def test_sweep_waits_for_feeder_until_it_finishes():
+    async def main():
+        job, worker = CexSweepJob('OKX', timeout=60), SweepWorker()
+        job.add_feeder('wallet-1')
+        job.add_feeder('wallet-2')
+
+        waiting = asyncio.create_task(job.request('wallet-1', worker))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+
+        # the route of wallet-2 ended before the sweep module
+        job.remove_feeder('wallet-2')
+        return await waiting, worker.sweeps
+
+    assert asyncio.run(main()) == (True, 1)
+
+
+def test_sweep_starts_without_stuck_feeder_after_timeout():
+    async def main():
+        job, worker = CexSweepJob('OKX', timeout=0.05), SweepWorker()
+        job.add_feeder('wallet-1')
+        job.add_feeder('wallet-2')
+        return await asyncio.wait_for(job.request('wallet-1', worker), 1), job.feeders
+
+    assert asyncio.run(main()) == (True, {'wallet-2'})
+
+
+def test_feeder_progress_restarts_timeout():
+    async def main():
+        job, worker = CexSweepJob('OKX', timeout=0.1), SweepWorker()
+        job.add_feeder('wallet-1')
+        job.add_feeder('wallet-2')
+
+        waiting = asyncio.create_task(job.request('wallet-1', worker))
+        for _ in range(4):
+            await asyncio.sleep(0.05)
+            job.touch_feeder('wallet-2')
+        assert not waiting.done()
+        return await asyncio.wait_for(waiting, 1)
+
+    assert asyncio.run(main()) is True
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from modules.interfaces import SoftwareExceptionWithoutRetry
+from utils.deposit_watcher import DepositWatcher, is_same_address
+
+ADDRESS_1 = '0x' + '1' * 64
+ADDRESS_2 = '0x' + '2' * 64
+
+
+class HistoryWorker:
+    def __init__(self, records: list):
+        self.records = records
+
+    async def get_deposit_history(self, ccy: str, since: int) -> list:
+        return self.records
+
+
+def get_record(deposit_id: str, address: str | None, amount: float = 10.0) -> dict:
+    return {'id': deposit_id, 'address': address, 'amount': amount, 'ts': 1, 'final': True}
+
+
+def test_address_is_compared_as_number():
+    assert is_same_address(ADDRESS_1, '0x' + '1' * 64)
+    assert is_same_address('0x0000ab', '0xAB')
+    assert not is_same_address(ADDRESS_1, ADDRESS_2)
+    assert not is_same_address(ADDRESS_1, None)
+
+
+def test_same_amount_goes_to_wallet_with_its_address():
+    async def main():
+        watcher = DepositWatcher(HistoryWorker([get_record('2', ADDRESS_2)]), 'STRK', check_time=0)
+        first = asyncio.create_task(watcher.wait(10.0, ADDRESS_1, timeout=0.2))
+        second = asyncio.create_task(watcher.wait(10.0, ADDRESS_2, timeout=0.2))
+        return await first, await second
+
+    first, second = asyncio.run(main())
+    assert first is None
+    assert second['id'] == '2'
+
+
+def test_deposit_without_address_matches_nobody():
+    async def main():
+        watcher = DepositWatcher(HistoryWorker([get_record('1', None)]), 'STRK', check_time=0)
+        return await watcher.wait(10.0, ADDRESS_1, timeout=0.1), watcher.unmatched
+
+    deposit, unmatched = asyncio.run(main())
+    assert deposit is None
+    assert [record['id'] for _, record in unmatched] == ['1']
+
+
+def test_deposit_credited_before_wait_is_kept_for_its_wallet():
+    async def main():
+        watcher = DepositWatcher(HistoryWorker([]), 'STRK', check_time=0)
+        watcher.keep_unmatched(get_record('1', ADDRESS_1))
+        return await watcher.wait(10.0, ADDRESS_2, timeout=0.05), await watcher.wait(10.0, ADDRESS_1, timeout=0.05)
+
+    assert asyncio.run(main()) == (None, get_record('1', ADDRESS_1))
+
+
+def test_wait_requires_address():
+    watcher = DepositWatcher(HistoryWorker([]), 'STRK')
+    with pytest.raises(SoftwareExceptionWithoutRetry):
+        asyncio.run(watcher.wait(10.0, None))
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+from modules.interfaces import SoftwareException
+from utils.retry import CircuitBreaker, get_backoff_delay, get_retry_endpoint
+
+
+def test_backoff_grows_up_to_max_delay():
+    delays = [get_backoff_delay(attempt, 'node', (5, 10), 60) for attempt in range(1, 50)]
+    assert all(5 <= delay <= 60 for delay in delays)
+
+
+def test_backoff_does_not_overflow_on_long_retries():
+    for error_kind in ('software', 'rate_limit', 'timeout', 'node', 'unknown'):
+        assert 5 <= get_backoff_delay(5000, error_kind, (5, 10), 600) <= 600
+
+
+def test_nonce_backoff_is_short():
+    assert 1 <= get_backoff_delay(100, 'nonce') <= 3
+
+
+def test_circuit_opens_after_failures_and_closes_on_success():
+    circuit_breaker = CircuitBreaker(failures=3, cooldown=60)
+    assert not circuit_breaker.record_failure('rpc-1')
+    assert not circuit_breaker.record_failure('rpc-1')
+    assert circuit_breaker.record_failure('rpc-1')
+    assert circuit_breaker.is_open('rpc-1')
+
+    circuit_breaker.record_success('rpc-1')
+    assert not circuit_breaker.is_open('rpc-1')
+
+
+def test_circuit_ignores_unknown_endpoint():
+    assert not CircuitBreaker(failures=1).record_failure(None)
+
+
+def test_pick_endpoint_skips_open_circuits():
+    circuit_breaker = CircuitBreaker(failures=1, cooldown=60)
+    circuit_breaker.record_failure('rpc-2')
+    assert {circuit_breaker.pick_endpoint(['rpc-1', 'rpc-2', 'rpc-3'], exclude='rpc-1') for _ in range(20)} == {
+        'rpc-3'}
+
+
+def test_api_errors_are_charged_to_api_host():
+    worker = SimpleNamespace(client=SimpleNamespace(rpc='https://rpc.example'))
+    error = SoftwareException('Bad request to ClaimerEVM API', endpoint='api.example')
+
+    assert get_retry_endpoint(worker, error) == 'api.example'
+    assert get_retry_endpoint(worker, SoftwareException('node error')) == 'https://rpc.example'
+    assert get_retry_endpoint(SimpleNamespace(class_name='OKX', client=worker.client), error) == 'OKX'
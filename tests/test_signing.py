@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+from starknet_py.hash.utils import verify_message_signature
+from starknet_py.net.client_models import Call
+from starknet_py.net.models.chains import StarknetChainId
+from starknet_py.net.signer.stark_curve_signer import KeyPair
+
+from utils.signing import run_signing, run_without_loop, shutdown_signing_pools, sign_starknet_invoke
+
+PRIVATE_KEY = 0x1234567890abcdef
+ACCOUNT_DATA = 'http://127.0.0.1:1', 0x123, StarknetChainId.MAINNET, 1
+CALLS = [Call(to_addr=0x456, selector=0x789, calldata=[1, 2, 3])]
+
+
+def is_signed_by_key(invoke_tx) -> bool:
+    public_key = KeyPair.from_private_key(PRIVATE_KEY).public_key
+    return verify_message_signature(invoke_tx.calculate_hash(StarknetChainId.MAINNET), invoke_tx.signature, public_key)
+
+
+@pytest.mark.parametrize('executor_type', [None, 'thread', 'process'])
+def test_invoke_is_signed_without_node(executor_type):
+    async def main():
+        try:
+            return await run_signing(sign_starknet_invoke, ACCOUNT_DATA, PRIVATE_KEY, CALLS, 7, 1000,
+                                     executor_type=executor_type)
+        finally:
+            shutdown_signing_pools()
+
+    invoke_tx = asyncio.run(main())
+    assert (invoke_tx.nonce, invoke_tx.max_fee, invoke_tx.sender_address) == (7, 1000, 0x123)
+    assert is_signed_by_key(invoke_tx)
+
+
+def test_estimate_invoke_is_not_signed():
+    invoke_tx = sign_starknet_invoke(ACCOUNT_DATA, None, CALLS, 7, 0)
+    assert invoke_tx.signature == []
+    assert invoke_tx.calldata == sign_starknet_invoke(ACCOUNT_DATA, PRIVATE_KEY, CALLS, 7, 0).calldata
+
+
+def test_waiting_coroutine_is_rejected():
+    with pytest.raises(RuntimeError):
+        run_without_loop(asyncio.sleep(1))
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from utils import tx_outbox
+from utils.tx_outbox import get_call_id, get_pending_tx, get_step_txs, remove_pending_tx, save_pending_tx
+
+
+@pytest.fixture(autouse=True)
+def outbox_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(tx_outbox, 'TX_OUTBOX_PATH', str(tmp_path / 'tx_outbox.json'))
+
+
+def test_transactions_of_one_step_do_not_collide():
+    approve_id, swap_id = get_call_id(('approve', [1, 2])), get_call_id(('swap', [1, 2]))
+    assert approve_id != swap_id
+    assert approve_id == get_call_id(('approve', [1, 2]))
+
+    async def main():
+        await save_pending_tx('wallet-1', 'swap_jediswap', 3, approve_id, 0x1)
+        await save_pending_tx('wallet-1', 'swap_jediswap', 3, swap_id, 0x2)
+        return (await get_pending_tx('wallet-1', 'swap_jediswap', 3, approve_id),
+                await get_pending_tx('wallet-1', 'swap_jediswap', 3, swap_id),
+                await get_step_txs('wallet-1', 'swap_jediswap', 3))
+
+    assert asyncio.run(main()) == (0x1, 0x2, [0x1, 0x2])
+
+
+def test_remove_one_transaction_or_whole_step():
+    async def main():
+        await save_pending_tx('wallet-1', 'swap_jediswap', 1, 'a', 0x1)
+        await save_pending_tx('wallet-1', 'swap_jediswap', 1, 'b', 0x2)
+        await save_pending_tx('wallet-1', 'swap_jediswap', 10, 'a', 0x3)
+
+        await remove_pending_tx('wallet-1', 'swap_jediswap', 1, 'a')
+        after_one = await get_step_txs('wallet-1', 'swap_jediswap', 1)
+
+        await remove_pending_tx('wallet-1', 'swap_jediswap', 1)
+        return after_one, await get_step_txs('wallet-1', 'swap_jediswap', 1), tx_outbox.load_outbox()
+
+    after_one, after_step, outbox = asyncio.run(main())
+    assert after_one == [0x2]
+    assert after_step == []
+    assert list(outbox['wallet-1']) == ['swap_jediswap:10:a']
+
+
+def test_account_is_dropped_with_its_last_transaction():
+    async def main():
+        await save_pending_tx('wallet-1', 'transfer_strk', 0, 'a', 0x1)
+        await remove_pending_tx('wallet-1', 'transfer_strk', 0, 'a')
+
+    asyncio.run(main())
+    assert tx_outbox.load_outbox() == {}
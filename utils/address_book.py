@@ -0,0 +1,99 @@
+import json
+
+ADDRESS_BOOK_PATH = './data/services/cex_withdraw_list.json'
+
+# Starknet contract addresses are felts below 2 ** 251
+STARKNET_ADDRESS_MAX = 2 ** 251
+
+ADDRESS_BOOK = None
+
+
+class DepositAddress:
+    def __init__(self, account_name: str, address: str, felt: int):
+        self.account_name = account_name
+        self.address = address
+        self.felt = felt
+
+    @property
+    def short_info(self) -> str:
+        return f"{self.address[:10]}....{self.address[-10:]}"
+
+
+def parse_deposit_address(raw_address) -> tuple[str, int]:
+    address = str(raw_address).strip()
+    if not address.lower().startswith('0x'):
+        raise ValueError(f'{address} is not a hex address')
+
+    felt = int(address, 16)
+    if not 0 < felt < STARKNET_ADDRESS_MAX:
+        raise ValueError(f'{address} is out of Starknet address range')
+    return f'0x{felt:064x}', felt
+
+
+def build_address_book(account_names: list, cex_wallets: list) -> tuple[dict, list]:
+    address_book, owners, errors = {}, {}, []
+
+    # the table keeps an empty CEX cell in its row, a shorter list would give the next addresses to wrong wallets
+    if len(account_names) != len(cex_wallets):
+        return address_book, [f'{len(account_names)} accounts, but {len(cex_wallets)} CEX wallets']
+
+    for account_name, raw_address in zip(account_names, cex_wallets):
+        if account_name is None or raw_address in (None, ''):
+            continue
+
+        account_name = str(account_name)
+        if account_name in address_book:
+            errors.append(f'{account_name}: account is listed twice')
+            continue
+
+        try:
+            address, felt = parse_deposit_address(raw_address)
+        except ValueError as error:
+            errors.append(f'{account_name}: {error}')
+            continue
+
+        # one deposit address for two wallets is almost always a copy-paste mistake in the table
+        if felt in owners:
+            errors.append(f'{account_name}: {address} is already used by {owners[felt]}')
+            continue
+
+        owners[felt] = account_name
+        address_book[account_name] = DepositAddress(account_name, address, felt)
+
+    return address_book, errors
+
+
+def save_address_book(address_book: dict):
+    global ADDRESS_BOOK
+
+    with open(ADDRESS_BOOK_PATH, 'w') as file:
+        json.dump({account_name: item.address for account_name, item in address_book.items()}, file, indent=4)
+    # the menu can regenerate the file after a run already loaded it, the next transfer must use the new addresses
+    ADDRESS_BOOK = address_book
+
+
+def load_address_book() -> dict:
+    global ADDRESS_BOOK
+    from modules.interfaces import SoftwareExceptionWithoutRetry
+
+    if ADDRESS_BOOK is None:
+        try:
+            with open(ADDRESS_BOOK_PATH) as file:
+                address_data = json.load(file)
+        except (OSError, ValueError) as error:
+            raise SoftwareExceptionWithoutRetry(f'Bad data in {ADDRESS_BOOK_PATH}: {error}')
+
+        address_book, errors = build_address_book(list(address_data), list(address_data.values()))
+        if errors:
+            raise SoftwareExceptionWithoutRetry(f'Bad data in {ADDRESS_BOOK_PATH}: {"; ".join(errors)}')
+        ADDRESS_BOOK = address_book
+    return ADDRESS_BOOK
+
+
+def get_deposit_address(account_name: str) -> DepositAddress:
+    from modules.interfaces import SoftwareExceptionWithoutRetry
+
+    deposit_address = load_address_book().get(str(account_name))
+    if deposit_address is None:
+        raise SoftwareExceptionWithoutRetry(f'There is no wallet listed for deposit to CEX: {account_name}')
+    return deposit_address
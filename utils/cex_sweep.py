@@ -0,0 +1,137 @@
+import asyncio
+
+from modules import Logger
+from utils.profiler import create_shared_task
+from utils.proxy_manager import get_proxy_manager
+from settings import CEX_SWEEP_TIMEOUT
+
+# route modules that sweep the subAccounts of one exchange master account
+SWEEP_MODULES = {
+    'collect_from_sub_okx': 'OKX',
+    'collect_from_sub_binance': 'Binance',
+}
+
+SWEEP_JOBS = {}
+
+
+class CexSweepJob(Logger):
+    def __init__(self, exchange: str, timeout: int = CEX_SWEEP_TIMEOUT):
+        Logger.__init__(self)
+        self.exchange = exchange
+        self.timeout = timeout
+        self.feeders = set()
+        self.waiting = set()
+        self.workers = []
+        self.future = None
+        self.timer = None
+        self.tasks = set()
+        self.sweeps = 0
+
+    def add_feeder(self, account_name: str):
+        self.feeders.add(account_name)
+
+    def remove_feeder(self, account_name: str):
+        if account_name in self.feeders:
+            self.feeders.discard(account_name)
+            self.schedule()
+
+    def touch_feeder(self, account_name: str):
+        # a feeder finished one more step, it is not stuck
+        if account_name in self.feeders:
+            self.schedule()
+
+    async def request(self, account_name: str, worker):
+        # every wallet of the next sweep waits for the same result, wallets coming during a sweep wait for the next one
+        self.feeders.discard(account_name)
+        if self.future is None:
+            self.future = asyncio.get_running_loop().create_future()
+        future = self.future
+        self.workers.append(worker)
+        self.waiting.add(account_name)
+
+        self.logger_msg(
+            account_name, None, f'{self.exchange} subAccounts sweep requested, waiting for '
+                                f'{len(self.feeders)} wallet(s) still on the way to it')
+        self.schedule()
+
+        # the proxy place is given to the wallets of the next streams, the sweep can wait for them too
+        proxy_manager = get_proxy_manager()
+        if proxy_manager:
+            proxy_manager.release(account_name)
+        try:
+            return await asyncio.shield(future)
+        finally:
+            self.waiting.discard(account_name)
+            if proxy_manager:
+                await proxy_manager.acquire(account_name)
+
+    def schedule(self):
+        if self.future is None:
+            return
+
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+        if not self.feeders:
+            self.start()
+            return
+
+        # the sweep waits for the feeders, the timeout only saves the waiting wallets from a feeder stuck for good
+        self.timer = asyncio.get_running_loop().call_later(self.timeout, self.start_on_timeout)
+
+    def start_on_timeout(self):
+        self.logger_msg(
+            None, None, f'{len(self.feeders)} wallet(s) made no progress for {self.timeout} s, '
+                        f'{self.exchange} subAccounts sweep starts without them', type_msg='warning')
+        self.timer = None
+        self.start()
+
+    def start(self):
+        future, workers = self.future, self.workers
+        self.future, self.workers = None, []
+
+        task = create_shared_task(self.run_sweep(future, workers))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run_sweep(self, future: asyncio.Future, workers: list):
+        self.sweeps += 1
+        self.logger_msg(
+            None, None, f'Start {self.exchange} subAccounts sweep #{self.sweeps} for {len(workers)} wallet(s)')
+        try:
+            result = await workers[0].transfer_from_subs()
+        except Exception as error:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+def get_sweep_job(exchange: str) -> CexSweepJob:
+    if exchange not in SWEEP_JOBS:
+        SWEEP_JOBS[exchange] = CexSweepJob(exchange)
+    return SWEEP_JOBS[exchange]
+
+
+def add_sweep_feeder(account_name: str, module_names: list):
+    for module_name in module_names:
+        if module_name in SWEEP_MODULES:
+            get_sweep_job(SWEEP_MODULES[module_name]).add_feeder(account_name)
+
+
+def remove_sweep_feeder(account_name: str):
+    for sweep_job in SWEEP_JOBS.values():
+        sweep_job.remove_feeder(account_name)
+
+
+def touch_sweep_feeder(account_name: str):
+    for sweep_job in SWEEP_JOBS.values():
+        sweep_job.touch_feeder(account_name)
+
+
+def is_waiting_sweep(account_name: str) -> bool:
+    return any(account_name in sweep_job.waiting for sweep_job in SWEEP_JOBS.values())
+
+
+def reset_sweep_jobs():
+    SWEEP_JOBS.clear()
@@ -0,0 +1,67 @@
+from contextvars import ContextVar
+
+from utils.networks import Network, StarknetRPC
+
+CURRENT_CLIENTS = ContextVar('current_clients', default=None)
+
+
+class ClientContext:
+    def __init__(self, account_name: str, private_key: str, proxy: str | None = None):
+        self.account_name = account_name
+        self.private_key = private_key
+        self.proxy = proxy
+        self.clients = {}
+
+    def is_for(self, account_name: str, private_key: str, proxy: str | None) -> bool:
+        return (self.account_name, self.private_key, self.proxy) == (account_name, private_key, proxy)
+
+    def get_starknet_client(self):
+        if StarknetRPC.name not in self.clients:
+            from modules import StarknetClient
+
+            self.clients[StarknetRPC.name] = StarknetClient(
+                self.account_name, self.private_key, StarknetRPC, self.proxy, managed=True)
+        return self.clients[StarknetRPC.name]
+
+    def get_evm_client(self, network: Network):
+        if network.name not in self.clients:
+            from modules import Client
+
+            self.clients[network.name] = Client(self.account_name, self.private_key, network, self.proxy, managed=True)
+        return self.clients[network.name]
+
+    def activate(self):
+        CURRENT_CLIENTS.set(self)
+        return self
+
+    async def close(self):
+        if CURRENT_CLIENTS.get() is self:
+            CURRENT_CLIENTS.set(None)
+
+        clients, self.clients = self.clients, {}
+        for client in clients.values():
+            await client.close()
+
+
+def get_client_context(account_name: str, private_key: str, proxy: str | None) -> ClientContext | None:
+    client_context = CURRENT_CLIENTS.get()
+    if client_context is not None and client_context.is_for(account_name, private_key, proxy):
+        return client_context
+
+
+def get_starknet_client(account_name: str, private_key: str, proxy: str | None = None):
+    client_context = get_client_context(account_name, private_key, proxy)
+    if client_context:
+        return client_context.get_starknet_client()
+
+    from modules import StarknetClient
+    return StarknetClient(account_name, private_key, StarknetRPC, proxy)
+
+
+def get_evm_client(account_name: str, private_key: str, network: Network, proxy: str | None = None):
+    client_context = get_client_context(account_name, private_key, proxy)
+    if client_context:
+        return client_context.get_evm_client(network)
+
+    from modules import Client
+    return Client(account_name, private_key, network, proxy)
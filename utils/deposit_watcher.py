@@ -0,0 +1,145 @@
+import math
+import time
+import asyncio
+
+from modules import Logger
+from modules.interfaces import SoftwareExceptionWithoutRetry
+from utils.profiler import create_shared_task
+
+DEPOSIT_WATCHERS = {}
+
+# exchanges round credited amounts, a deposit matches a transfer within this precision
+AMOUNT_REL_TOLERANCE = 1e-6
+AMOUNT_ABS_TOLERANCE = 1e-8
+
+# deposit history is requested a bit earlier than the watcher start, exchange clocks differ from ours
+HISTORY_MARGIN_MS = 5 * 60 * 1000
+
+# a deposit credited before its wallet started to wait is kept for this long for that wallet
+UNMATCHED_DEPOSIT_TTL = 10 * 60
+
+
+def is_same_amount(amount: float, credited_amount: float) -> bool:
+    return math.isclose(amount, credited_amount, rel_tol=AMOUNT_REL_TOLERANCE, abs_tol=AMOUNT_ABS_TOLERANCE)
+
+
+def is_same_address(address: str, deposit_address: str | None) -> bool:
+    # two wallets can send the same amount, a deposit without its address belongs to nobody
+    if not deposit_address:
+        return False
+    try:
+        return int(address, 16) == int(deposit_address, 16)
+    except ValueError:
+        return address.lower() == deposit_address.lower()
+
+
+class PendingDeposit:
+    def __init__(self, amount: float, address: str, future: asyncio.Future):
+        self.amount = amount
+        self.address = address
+        self.future = future
+
+
+class DepositWatcher(Logger):
+    # one poll of the exchange serves every wallet waiting for a deposit, no matter how many of them wait
+    def __init__(self, worker, ccy: str, check_time: int = 45):
+        Logger.__init__(self)
+        self.worker = worker
+        self.ccy = ccy
+        self.check_time = check_time
+        self.cursor = int(time.time() * 1000) - HISTORY_MARGIN_MS
+        self.seen_deposits = set()
+        self.pending = []
+        self.unmatched = []
+        self.task = None
+
+    async def wait(self, amount: float, address: str, timeout: int = 1200) -> dict | None:
+        if not address:
+            raise SoftwareExceptionWithoutRetry(
+                f'Deposit of {amount} {self.ccy} can not be matched without its address')
+
+        deposit = PendingDeposit(amount, address, asyncio.get_running_loop().create_future())
+        record = self.take_unmatched(deposit)
+        if record is not None:
+            return record
+
+        self.pending.append(deposit)
+        if self.task is None or self.task.done():
+            self.task = create_shared_task(self.run())
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(deposit.future), timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            if deposit in self.pending:
+                self.pending.remove(deposit)
+
+    def take_unmatched(self, deposit: PendingDeposit) -> dict | None:
+        now = time.monotonic()
+        self.unmatched = [(kept_at, record) for kept_at, record in self.unmatched
+                          if now - kept_at < UNMATCHED_DEPOSIT_TTL]
+
+        candidates = [(kept_at, record) for kept_at, record in self.unmatched
+                      if is_same_amount(deposit.amount, record['amount'])
+                      and is_same_address(deposit.address, record['address'])]
+        if not candidates:
+            return None
+
+        self.unmatched.remove(candidates[0])
+        return candidates[0][1]
+
+    def keep_unmatched(self, record: dict):
+        if not self.resolve(record):
+            self.unmatched.append((time.monotonic(), record))
+
+    def resolve(self, record: dict) -> bool:
+        candidates = [deposit for deposit in self.pending if is_same_amount(deposit.amount, record['amount'])
+                      and is_same_address(deposit.address, record['address'])]
+        if not candidates:
+            return False
+
+        deposit = candidates[0]
+        self.pending.remove(deposit)
+        if not deposit.future.done():
+            deposit.future.set_result(record)
+        return True
+
+    async def check_history(self):
+        records = await self.worker.get_deposit_history(self.ccy, self.cursor)
+
+        for record in records:
+            if record['final'] and record['id'] not in self.seen_deposits:
+                self.seen_deposits.add(record['id'])
+                self.keep_unmatched(record)
+
+        # deposits still waiting for confirmations are requested again on the next poll
+        unconfirmed_ts = [record['ts'] for record in records if not record['final']]
+        confirmed_ts = [record['ts'] for record in records if record['final']]
+        if unconfirmed_ts:
+            self.cursor = min(unconfirmed_ts) - 1
+        elif confirmed_ts:
+            self.cursor = max(self.cursor, max(confirmed_ts))
+
+    async def run(self):
+        while self.pending:
+            try:
+                await self.check_history()
+            except Exception as error:
+                self.logger_msg(None, None, f'Deposit check failed, next try in {self.check_time} s: {error}',
+                                type_msg='warning')
+
+            if self.pending:
+                self.logger_msg(None, None, f'{len(self.pending)} deposit(s) still in progress...', type_msg='warning')
+                await asyncio.sleep(self.check_time)
+
+
+def get_deposit_watcher(worker, ccy: str, check_time: int = 45) -> DepositWatcher:
+    key = worker.class_name, ccy
+    if key not in DEPOSIT_WATCHERS:
+        DEPOSIT_WATCHERS[key] = DepositWatcher(worker, ccy, check_time)
+    return DEPOSIT_WATCHERS[key]
+
+
+def reset_deposit_watchers():
+    DEPOSIT_WATCHERS.clear()
@@ -0,0 +1,81 @@
+import json
+import time
+import threading
+
+from queue import SimpleQueue
+from contextvars import ContextVar
+from loguru import logger
+from modules.interfaces import configure_logger
+
+CURRENT_ACCOUNT = ContextVar('current_account', default=None)
+CURRENT_MODULE = ContextVar('current_module', default=None)
+CURRENT_MODULE_TITLE = ContextVar('current_module_title', default=None)
+CURRENT_STEP = ContextVar('current_step', default=None)
+
+EVENT_FORWARDER = None
+
+
+def set_module_context(account_name, module_name: str = None, module_title: str = None, step: int = None):
+    CURRENT_ACCOUNT.set(account_name)
+    CURRENT_MODULE.set(module_name)
+    CURRENT_MODULE_TITLE.set(module_title)
+    CURRENT_STEP.set(step)
+
+
+class EventForwarder:
+    # a thread does the manager queue put, the event loop only drops the record into a local queue
+    def __init__(self, events_queue):
+        self.events_queue = events_queue
+        self.records = SimpleQueue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def put(self, record: dict):
+        self.records.put(record)
+
+    def run(self):
+        while (record := self.records.get()) is not None:
+            try:
+                self.events_queue.put(record)
+            except Exception:
+                pass
+
+    def close(self):
+        self.records.put(None)
+        self.thread.join()
+
+
+def set_event_forwarder(events_queue):
+    global EVENT_FORWARDER
+    EVENT_FORWARDER = EventForwarder(events_queue)
+    # log lines of a worker process are written by the parent, several processes can not rotate one file
+    configure_logger(EVENT_FORWARDER)
+
+
+def close_event_forwarder():
+    global EVENT_FORWARDER
+    if EVENT_FORWARDER is not None:
+        EVENT_FORWARDER.close()
+        EVENT_FORWARDER = None
+
+
+def emit_event(event: str, **fields):
+    record = {
+        'ts': round(time.time(), 3),
+        'event': event,
+        'account': fields.pop('account', CURRENT_ACCOUNT.get()),
+        'module': fields.pop('module', CURRENT_MODULE_TITLE.get()),
+        **fields
+    }
+
+    if EVENT_FORWARDER is not None:
+        EVENT_FORWARDER.put(record)
+        return
+
+    write_event(record)
+
+
+def write_event(record: dict):
+    configure_logger()
+    logger.bind(event=True).info(json.dumps(record, default=str, ensure_ascii=False))
+
@@ -0,0 +1,101 @@
+import sys
+import json
+import glob
+import math
+
+from collections import defaultdict
+
+
+def percentile(values: list, percent: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(values)) - 1, 0)
+    return values[rank]
+
+
+def load_events(paths: list):
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def summarize_events(events) -> dict:
+    module_durations = defaultdict(list)
+    module_results = defaultdict(lambda: [0, 0])
+    event_counts = defaultdict(int)
+    finished_accounts = set()
+    first_ts, last_ts = None, None
+
+    for event in events:
+        event_name = event.get('event')
+        event_counts[event_name] += 1
+
+        ts = event.get('ts')
+        if ts is not None:
+            first_ts = ts if first_ts is None else min(first_ts, ts)
+            last_ts = ts if last_ts is None else max(last_ts, ts)
+
+        if event_name == 'module_finish':
+            module_durations[event['module']].append(event.get('duration', 0.0))
+            module_results[event['module']][0 if event.get('result') else 1] += 1
+        elif event_name == 'route_finish':
+            finished_accounts.add(event.get('account'))
+
+    run_minutes = (last_ts - first_ts) / 60 if first_ts is not None and last_ts > first_ts else 0
+    modules = {
+        module_name: {
+            'count': len(durations),
+            'success': module_results[module_name][0],
+            'failed': module_results[module_name][1],
+            'p50': percentile(durations, 50),
+            'p95': percentile(durations, 95),
+        }
+        for module_name, durations in module_durations.items()
+    }
+
+    return {
+        'modules': modules,
+        'events': dict(event_counts),
+        'accounts': len(finished_accounts),
+        'minutes': run_minutes,
+        'accounts_per_minute': len(finished_accounts) / run_minutes if run_minutes else 0.0,
+    }
+
+
+def print_summary(summary: dict):
+    from prettytable import PrettyTable
+
+    table = PrettyTable(['Module', 'Count', 'Success', 'Failed', 'p50, s', 'p95, s'])
+    for module_name, data in sorted(summary['modules'].items()):
+        table.add_row([module_name, data['count'], data['success'], data['failed'],
+                       f"{data['p50']:.2f}", f"{data['p95']:.2f}"])
+    print(table)
+
+    print(', '.join(f'{name}: {count}' for name, count in sorted(summary['events'].items(), key=str)))
+    print(f"Accounts finished: {summary['accounts']} in {summary['minutes']:.1f} min | "
+          f"{summary['accounts_per_minute']:.2f} accounts/min")
+
+
+def main(args: list = None):
+    paths = []
+    for pattern in (args or ['./data/logs/*.events.jsonl']):
+        paths.extend(sorted(glob.glob(pattern)))
+
+    if not paths:
+        print('No event files found')
+        return 1
+
+    print_summary(summarize_events(load_events(paths)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,84 @@
+import time
+import asyncio
+
+from modules import Logger
+from utils.gas_oracle import get_gas_oracle
+from utils.profiler import create_shared_task
+from utils.networks import Network
+from utils.rate_limiter import RateLimiter
+from settings import MAX_GAS_PRICE, GAS_RELEASE_RATE, GAS_ORACLE_POLL
+
+GAS_GATES = {}
+
+
+class GasGate(Logger):
+    # ready transactions wait here while gas is above the ceiling, one watcher checks the price for all of them
+    def __init__(self, network: Network, max_gas_price: float = MAX_GAS_PRICE, release_rate: int = GAS_RELEASE_RATE):
+        Logger.__init__(self)
+        self.network = network
+        self.max_gas_price = max_gas_price
+        self.release_limiter = RateLimiter(release_rate, 1)
+        self.open_event = asyncio.Event()
+        self.checked_event = asyncio.Event()
+        self.holding = 0
+        self.gas_price = None
+        self.task = None
+
+    async def watch(self):
+        gas_oracle = get_gas_oracle(self.network)
+        while self.holding:
+            try:
+                self.gas_price = (await gas_oracle.get_fees())['gas_price']
+            except Exception as error:
+                self.logger_msg(None, None, f'Gas check failed: {error}', type_msg='warning')
+            else:
+                if self.gas_price <= self.max_gas_price:
+                    if self.checked_event.is_set() and not self.open_event.is_set():
+                        self.logger_msg(
+                            None, None, f'Gas {self.gas_price} is below {self.max_gas_price}, '
+                                        f'releasing {self.holding} transaction(s)', type_msg='success')
+                    self.open_event.set()
+                else:
+                    self.open_event.clear()
+                self.checked_event.set()
+            await asyncio.sleep(GAS_ORACLE_POLL)
+        self.open_event.clear()
+        self.checked_event.clear()
+
+    async def wait(self, account_name: str) -> float:
+        if not self.max_gas_price:
+            return 0.0
+
+        hold_start_time = time.perf_counter()
+        self.holding += 1
+        try:
+            if self.task is None or self.task.done():
+                self.task = create_shared_task(self.watch())
+
+            await self.checked_event.wait()
+            while True:
+                if not self.open_event.is_set():
+                    self.logger_msg(
+                        account_name, None, f'Gas {self.gas_price} is above {self.max_gas_price}, transaction is waiting '
+                                            f'in queue ({self.holding} in total)', type_msg='warning')
+                    await self.open_event.wait()
+
+                await self.release_limiter.acquire()
+                # gas could go up again while the transaction waited for its turn
+                if self.open_event.is_set():
+                    return time.perf_counter() - hold_start_time
+        finally:
+            self.holding -= 1
+
+
+def get_gas_gate(network: Network) -> GasGate:
+    if network.name not in GAS_GATES:
+        GAS_GATES[network.name] = GasGate(network)
+    return GAS_GATES[network.name]
+
+
+def reset_gas_gates():
+    for gas_gate in GAS_GATES.values():
+        if gas_gate.task is not None and not gas_gate.task.done():
+            gas_gate.task.cancel()
+    GAS_GATES.clear()
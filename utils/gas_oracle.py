@@ -0,0 +1,162 @@
+import time
+import random
+import asyncio
+
+from abc import abstractmethod
+from modules import Logger
+from utils.networks import Network, StarknetRPC
+from utils.profiler import create_shared_task
+from settings import GAS_ORACLE_POLL, USE_PROXY
+
+GAS_ORACLES = {}
+
+# the background refresh stops when nobody asked for gas for this long and starts again on the next request
+GAS_ORACLE_IDLE = 60
+
+# fees older than this are not served, the caller waits for a fresh request instead
+GAS_ORACLE_MAX_AGE = 30
+
+
+class GasOracle(Logger):
+    # one refresh per new block serves every account of the process from memory
+    def __init__(self, network: Network, poll: float = GAS_ORACLE_POLL):
+        Logger.__init__(self)
+        self.network = network
+        self.poll = poll
+        self.fees = None
+        self.block_number = None
+        self.updated_at = 0.0
+        self.requested_at = 0.0
+        self.proxy = None
+        self.task = None
+        self.update_task = None
+
+    def get_proxy(self) -> str | None:
+        from utils.proxy_manager import get_proxy_manager
+
+        # gas requests go through the proxy pool like every account request, never from the host IP
+        if not USE_PROXY:
+            return None
+
+        proxy_manager = get_proxy_manager()
+        if proxy_manager is None:
+            raise RuntimeError('Proxies are not prepared, gas request is not sent without proxy')
+
+        if self.proxy is None or self.proxy in proxy_manager.failed:
+            self.proxy = proxy_manager.pick_spare()
+            if self.proxy is None:
+                raise RuntimeError('No working proxy for gas request')
+        return self.proxy
+
+    def change_proxy(self):
+        from utils.proxy_manager import get_proxy_manager
+
+        proxy_manager = get_proxy_manager()
+        if self.proxy is not None and proxy_manager is not None:
+            self.proxy = proxy_manager.pick_spare(exclude=self.proxy) or self.proxy
+
+    @abstractmethod
+    async def refresh(self):
+        pass
+
+    async def update(self):
+        # concurrent callers share one request
+        if self.update_task is None or self.update_task.done():
+            self.update_task = create_shared_task(self.refresh())
+        await asyncio.shield(self.update_task)
+        self.updated_at = time.monotonic()
+
+    async def run(self):
+        while time.monotonic() - self.requested_at < GAS_ORACLE_IDLE:
+            await asyncio.sleep(self.poll)
+            try:
+                await self.update()
+            except Exception as error:
+                self.logger_msg(None, None, f'{self.network.name} gas refresh failed: {error}', type_msg='warning')
+
+    async def get_fees(self) -> dict:
+        self.requested_at = time.monotonic()
+        if self.task is None or self.task.done():
+            self.task = create_shared_task(self.run())
+            await self.update()
+        elif self.fees is None or time.monotonic() - self.updated_at > GAS_ORACLE_MAX_AGE:
+            await self.update()
+        return self.fees
+
+    def stop(self):
+        for task in (self.task, self.update_task):
+            if task is not None and not task.done():
+                task.cancel()
+
+
+class EvmGasOracle(GasOracle):
+    def __init__(self, network: Network, poll: float = GAS_ORACLE_POLL):
+        super().__init__(network, poll)
+        self.rpc = random.choice(network.rpc)
+
+    @staticmethod
+    def get_priority_fee(fee_history: dict) -> int:
+        non_empty_block_priority_fees = [fee[0] for fee in fee_history["reward"] if fee[0] != 0]
+        divisor_priority = max(len(non_empty_block_priority_fees), 1)
+        return int(round(sum(non_empty_block_priority_fees) / divisor_priority))
+
+    async def refresh(self):
+        from utils.retry import CIRCUIT_BREAKER
+        from utils.web3_pool import get_pooled_w3
+
+        w3 = get_pooled_w3(self.rpc, self.get_proxy())
+        try:
+            block_number = await w3.eth.block_number
+            if block_number == self.block_number and self.fees is not None:
+                return
+
+            gas_price = await w3.eth.gas_price
+            priority_fee = 0
+            if self.network.eip1559_support:
+                priority_fee = self.get_priority_fee(await w3.eth.fee_history(25, block_number, [20.0]))
+        except Exception:
+            self.rpc = CIRCUIT_BREAKER.pick_endpoint(self.network.rpc, exclude=self.rpc)
+            self.change_proxy()
+            raise
+
+        self.fees = {'gas_price': gas_price, 'priority_fee': priority_fee, 'block_number': block_number}
+        self.block_number = block_number
+
+
+class StarknetGasOracle(GasOracle):
+    feeder_url = 'https://alpha-mainnet.starknet.io/feeder_gateway'
+
+    async def refresh(self):
+        from utils.web3_pool import get_pooled_session
+
+        url = f'{self.feeder_url}/get_block?blockNumber=latest'
+        headers = {
+            'Content-Type': 'application/json; charset=utf-8'
+        }
+
+        # the latest block already carries its gas price, one request per poll is enough
+        try:
+            async with get_pooled_session(self.get_proxy()).get(url, headers=headers) as response:
+                if response.status != 200:
+                    raise RuntimeError(f'Bad request to Starknet feeder gateway: {response.status}')
+                block = await response.json(content_type=None)
+        except Exception:
+            self.change_proxy()
+            raise
+
+        strk_l1_gas_price = block.get('strk_l1_gas_price') or block['l1_gas_price']['price_in_fri']
+        self.fees = {'gas_price': int(strk_l1_gas_price, 16) / 10 ** 7, 'block_number': block['block_number']}
+        self.block_number = block['block_number']
+
+
+def get_gas_oracle(network: Network) -> GasOracle:
+    if network.name not in GAS_ORACLES:
+        oracle_class = StarknetGasOracle if network is StarknetRPC else EvmGasOracle
+        GAS_ORACLES[network.name] = oracle_class(network)
+    return GAS_ORACLES[network.name]
+
+
+def reset_gas_oracles():
+    for gas_oracle in GAS_ORACLES.values():
+        gas_oracle.stop()
+    GAS_ORACLES.clear()
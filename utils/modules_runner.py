@@ -1,53 +1,126 @@
+import os
 import json
+import math
+import time
 import random
 import asyncio
+import threading
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
 
 from modules import Logger
 from utils.networks import EthereumRPC
-from web3 import AsyncWeb3, AsyncHTTPProvider
+from utils.proxy_manager import ProxyManager
+from utils.profiler import ModulesProfiler
+from utils.client_context import ClientContext
+from utils.web3_pool import close_web3_pool
+from utils.gas_gate import reset_gas_gates
+from utils.gas_oracle import reset_gas_oracles
+from utils.cex_sweep import (add_sweep_feeder, remove_sweep_feeder, touch_sweep_feeder, is_waiting_sweep,
+                             reset_sweep_jobs)
+from utils.deposit_watcher import reset_deposit_watchers
+from utils.tx_outbox import get_step_txs, remove_pending_tx
+from utils.retry import LAST_ERROR_KIND, NETWORK_ERROR_KINDS, get_error_kind
+from utils.events import (emit_event, set_module_context, set_event_forwarder, close_event_forwarder,
+                          write_event)
 from functions import get_network_by_chain_id
 from utils.route_generator import AVAILABLE_MODULES_INFO, get_func_by_name
-from config import ACCOUNT_NAMES, PRIVATE_KEYS, PROXIES
-from settings import (USE_PROXY, WALLETS_TO_WORK, GLOBAL_NETWORK,
-                      ACCOUNTS_IN_STREAM, SLEEP_TIME_STREAM, SLEEP_TIME, SLEEP_MODE)
+from utils.tools import file_lock
+from settings import (USE_PROXY, WALLETS_TO_WORK, GLOBAL_NETWORK, WORKER_PROCESSES, MAX_ACCOUNTS_PER_PROXY,
+                      ACCOUNTS_IN_STREAM, SLEEP_TIME_STREAM, SLEEP_TIME, SLEEP_MODE, PROFILE_MODULES)
+
+
+PROGRESS_FILE_PATH = './data/services/wallets_progress.json'
+
+
+def run_worker_process(wallets: list, accounts_in_stream: int, accounts_data: tuple, proxy_latencies: dict,
+                       max_accounts_per_proxy: int, events_queue, batch_mode: bool = False):
+    from config import set_accounts_data
+
+    set_accounts_data(accounts_data)
+    set_event_forwarder(events_queue)
+
+    runner = Runner(
+        accounts_in_stream=accounts_in_stream, wallets=wallets, processes=1,
+        proxy_latencies=proxy_latencies, max_accounts_per_proxy=max_accounts_per_proxy, batch_mode=batch_mode
+    )
+    try:
+        results = asyncio.run(runner.run_parallel())
+        if runner.profiler:
+            runner.profiler.save_cprofiles(time.strftime('%Y-%m-%d_%H-%M-%S'))
+    finally:
+        close_event_forwarder()
+    return results
 
 
 class Runner(Logger):
+    def __init__(self, wallets_to_work: int | tuple | list = WALLETS_TO_WORK,
+                 accounts_in_stream: int = ACCOUNTS_IN_STREAM, shard: tuple = None, wallets: list = None,
+                 processes: int = WORKER_PROCESSES, proxy_latencies: dict = None,
+                 max_accounts_per_proxy: int = MAX_ACCOUNTS_PER_PROXY, batch_mode: bool = False):
+        Logger.__init__(self)
+        self.wallets_to_work = wallets_to_work
+        self.accounts_in_stream = max(int(accounts_in_stream), 1)
+        self.shard = shard
+        self.wallets = wallets
+        self.processes = max(int(processes), 1)
+        self.proxy_latencies = proxy_latencies
+        self.max_accounts_per_proxy = max_accounts_per_proxy
+        self.batch_mode = batch_mode
+        self.proxy_manager = None
+        self.profiler = ModulesProfiler() if PROFILE_MODULES else None
+
     @staticmethod
     def get_wallets_batch(account_list: tuple = None):
+        from config import ACCOUNT_NAMES, PRIVATE_KEYS
         range_count = range(account_list[0], account_list[1])
         account_names = [ACCOUNT_NAMES[i - 1] for i in range_count]
         accounts = [PRIVATE_KEYS[i - 1] for i in range_count]
         return zip(account_names, accounts)
 
-    @staticmethod
-    def get_wallets():
-        if WALLETS_TO_WORK == 0:
+    def get_wallets(self):
+        from config import ACCOUNT_NAMES, PRIVATE_KEYS
+        if self.wallets is not None:
+            return list(self.wallets)
+
+        wallets_to_work = self.wallets_to_work
+        if wallets_to_work == 0:
             accounts_data = zip(ACCOUNT_NAMES, PRIVATE_KEYS)
 
-        elif isinstance(WALLETS_TO_WORK, int):
-            accounts_data = zip([ACCOUNT_NAMES[WALLETS_TO_WORK - 1]], [PRIVATE_KEYS[WALLETS_TO_WORK - 1]])
+        elif isinstance(wallets_to_work, int):
+            accounts_data = zip([ACCOUNT_NAMES[wallets_to_work - 1]], [PRIVATE_KEYS[wallets_to_work - 1]])
 
-        elif isinstance(WALLETS_TO_WORK, tuple):
-            account_names = [ACCOUNT_NAMES[i - 1] for i in WALLETS_TO_WORK]
-            accounts = [PRIVATE_KEYS[i - 1] for i in WALLETS_TO_WORK]
+        elif isinstance(wallets_to_work, tuple):
+            account_names = [ACCOUNT_NAMES[i - 1] for i in wallets_to_work]
+            accounts = [PRIVATE_KEYS[i - 1] for i in wallets_to_work]
             accounts_data = zip(account_names, accounts)
 
-        elif isinstance(WALLETS_TO_WORK, list):
-            range_count = range(WALLETS_TO_WORK[0], WALLETS_TO_WORK[1] + 1)
+        elif isinstance(wallets_to_work, list):
+            range_count = range(wallets_to_work[0], wallets_to_work[1] + 1)
             account_names = [ACCOUNT_NAMES[i - 1] for i in range_count]
             accounts = [PRIVATE_KEYS[i - 1] for i in range_count]
             accounts_data = zip(account_names, accounts)
         else:
             accounts_data = []
 
-        return list(accounts_data)
+        accounts_data = list(accounts_data)
+        if self.shard:
+            shard_index, shards_count = self.shard
+            accounts_data = accounts_data[shard_index - 1::shards_count]
+
+        return accounts_data
 
     @staticmethod
     def load_routes():
-        with open('./data/services/wallets_progress.json', 'r') as f:
+        with open(PROGRESS_FILE_PATH, 'r') as f:
             return json.load(f)
 
+    @staticmethod
+    def get_account_route(routes: dict, account_name, batch_mode: bool = False) -> list:
+        # in batch mode every wallet goes by the route of the first one
+        return routes.get('Main 1' if batch_mode else str(account_name), {}).get('route') or []
+
     async def smart_sleep(self, account_name, account_number, accounts_delay=False):
         if SLEEP_MODE:
             if accounts_delay:
@@ -58,18 +131,22 @@ class Runner(Logger):
             await asyncio.sleep(duration)
 
     def update_step(self, account_name, step):
-        wallets = self.load_routes()
-        wallets[str(account_name)]["current_step"] = step
-        with open('./data/services/wallets_progress.json', 'w') as f:
-            json.dump(wallets, f, indent=4)
+        with file_lock(PROGRESS_FILE_PATH):
+            wallets = self.load_routes()
+            wallets[str(account_name)]["current_step"] = step
+            with open(f'{PROGRESS_FILE_PATH}.tmp', 'w') as f:
+                json.dump(wallets, f, indent=4)
+            os.replace(f'{PROGRESS_FILE_PATH}.tmp', PROGRESS_FILE_PATH)
 
     async def check_proxies_status(self):
+        from config import PROXIES
         tasks = []
         for proxy in PROXIES:
             tasks.append(self.check_proxy_status(None, proxy=proxy))
-        await asyncio.gather(*tasks)
+        return dict(zip(PROXIES, await asyncio.gather(*tasks)))
 
     async def check_proxy_status(self, account_name: str = None, proxy: str = None, silence: bool = False):
+        from web3 import AsyncWeb3, AsyncHTTPProvider
         try:
             w3 = AsyncWeb3(AsyncHTTPProvider(random.choice(EthereumRPC.rpc),
                                              request_kwargs={"proxy": f"http://{proxy}"}))
@@ -86,85 +163,331 @@ class Runner(Logger):
 
     def get_proxy_for_account(self, account_name):
         if USE_PROXY:
-            try:
-                account_number = ACCOUNT_NAMES.index(account_name) + 1
-                num_proxies = len(PROXIES)
-                return PROXIES[account_number % num_proxies]
-            except Exception as error:
-                self.logger_msg(account_name, None, f"Bad data in proxy, but you want proxy! Error: {error}", 'error')
+            proxy = self.proxy_manager.get_proxy(account_name)
+            if proxy is None:
+                self.logger_msg(account_name, None, f"Bad data in proxy, but you want proxy!", 'error')
                 raise RuntimeError("Proxy error")
+            return proxy
+
+    async def prepare_proxies(self):
+        from config import ACCOUNT_NAMES, PROXIES
+        if USE_PROXY and self.proxy_manager is None:
+            self.proxy_manager = ProxyManager(PROXIES, self.max_accounts_per_proxy)
+            await self.proxy_manager.prepare(ACCOUNT_NAMES, self.proxy_latencies)
+
+    async def check_proxy_failover(self, account_name, proxy):
+        if not USE_PROXY or await self.proxy_manager.is_alive(proxy):
+            return None
+        return await self.proxy_manager.failover(account_name)
 
     async def run_account_modules(self, account_name, private_key, network, proxy, batch_mode:bool = False,
                                   index:int = 1):
+        if USE_PROXY:
+            async with self.proxy_manager.lease(account_name):
+                return await self.run_account_route(
+                    account_name, private_key, network, self.get_proxy_for_account(account_name), batch_mode, index)
+        return await self.run_account_route(account_name, private_key, network, proxy, batch_mode, index)
+
+    async def resume_pending_tx(self, client_context: ClientContext, module_func, module_input_data: list,
+                                module_name: str, step: int, tx_hashes: list):
+        # the step was sent before a crash or Ctrl-C, its transactions are checked instead of running the module again
+        account_name = module_input_data[0]
+        self.logger_msg(account_name, None, f"Found sent transactions of this step: "
+                                            f"{', '.join(map(hex, tx_hashes))}, checking them")
         try:
-            if batch_mode:
-                route = self.load_routes().get('Main 1', {}).get('route')
-
-            else:
-                route = self.load_routes().get(str(account_name), {}).get('route')
+            client = client_context.get_starknet_client()
+            await client.initialize_account()
+            for tx_hash in tx_hashes:
+                await client.send_transaction(check_hash=True, hash_for_check=tx_hash)
+            return True
+        except Exception as error:
+            self.logger_msg(
+                account_name, None, f"Sent transaction was not confirmed: {error}, running the module", 'warning')
+            await remove_pending_tx(account_name, module_name, step)
+            return await module_func(*module_input_data)
+
+    async def run_account_route(self, account_name, private_key, network, proxy, batch_mode:bool = False,
+                                index:int = 1):
+        client_context = ClientContext(account_name, private_key, proxy).activate()
+        try:
+            routes = self.load_routes()
+            route = self.get_account_route(routes, account_name, batch_mode)
             if not route:
                 raise RuntimeError(f"No route available")
 
             route = [[i, 0] for i in route]
-            current_step = 0
+            # steps done before a crash or Ctrl-C are not run again, the interrupted one is checked by its outbox entry
+            current_step = min(routes.get(str(account_name), {}).get('current_step', 0), len(route))
+            if 0 < current_step < len(route):
+                self.logger_msg(account_name, None, f"Resuming route from step {current_step + 1}/{len(route)}")
             module_info = AVAILABLE_MODULES_INFO
 
             await self.smart_sleep(account_name, index, accounts_delay=True)
 
+            route_start_time = time.perf_counter()
+            set_module_context(account_name)
+            emit_event('route_start', steps=len(route))
+
             while current_step < len(route):
                 module_name = route[current_step][0]
                 module_func = get_func_by_name(module_name)
-                self.logger_msg(account_name, None, f"🚀 Launch module: {module_info[module_func][2]}")
+                module_title = module_info[module_func][2]
+                self.logger_msg(account_name, None, f"🚀 Launch module: {module_title}")
 
                 module_input_data = [account_name, private_key, network, proxy]
 
+                set_module_context(account_name, module_name, module_title, current_step)
+                emit_event('module_start', step=current_step, proxy=bool(proxy))
+                module_profile = self.profiler.start(module_name) if self.profiler else None
+                module_start_time = time.perf_counter()
+
+                pending_tx_hashes = await get_step_txs(account_name, module_name, current_step)
+                if pending_tx_hashes:
+                    module_coroutine = self.resume_pending_tx(client_context, module_func, module_input_data,
+                                                              module_name, current_step, pending_tx_hashes)
+                else:
+                    module_coroutine = module_func(*module_input_data)
+
+                LAST_ERROR_KIND.set(None)
                 try:
-                    result = await module_func(*module_input_data)
+                    if module_profile:
+                        result = await self.profiler.wrap(module_profile, module_coroutine)
+                    else:
+                        result = await module_coroutine
                 except Exception as error:
-                    info = f"Module name: {module_info[module_func][2]} | Error {error}"
+                    LAST_ERROR_KIND.set(get_error_kind(error))
+                    info = f"Module name: {module_title} | Error {error}"
                     self.logger_msg(
                         account_name, None, f"Module crashed during the route: {info}", type_msg='error')
                     result = False
 
+                module_duration = time.perf_counter() - module_start_time
+                event_fields = {'step': current_step, 'result': bool(result), 'duration': round(module_duration, 3)}
+                if module_profile:
+                    event_fields['profile'] = self.profiler.finish(module_profile, module_duration)
+                emit_event('module_finish', **event_fields)
+
+                # a business error says nothing about the proxy, only network failures are worth a probe
+                if not result and LAST_ERROR_KIND.get() in NETWORK_ERROR_KINDS:
+                    new_proxy = await self.check_proxy_failover(account_name, proxy)
+                    if new_proxy:
+                        proxy = new_proxy
+                        await client_context.close()
+                        client_context = ClientContext(account_name, private_key, proxy).activate()
+                        continue
+
                 if result:
-                    self.update_step(account_name, current_step + 1)
+                    await asyncio.to_thread(self.update_step, account_name, current_step + 1)
+                    await remove_pending_tx(account_name, module_name, current_step)
+                    touch_sweep_feeder(account_name)
                     current_step += 1
                 else:
                     break
 
                 await self.smart_sleep(account_name, account_number=1)
 
+            set_module_context(account_name)
+            emit_event('route_finish', completed=current_step == len(route), steps_done=current_step,
+                       duration=round(time.perf_counter() - route_start_time, 3))
+
             self.logger_msg(account_name, None, f"Wait for other wallets in stream!\n", 'info')
+            return current_step == len(route)
 
         except Exception as error:
             self.logger_msg(account_name, None, f"Error during the route! Error: {error}\n", 'error')
+            return False
+
+        finally:
+            remove_sweep_feeder(account_name)
+            await client_context.close()
 
     async def run_parallel(self):
         selected_wallets = list(self.get_wallets())
-        num_accounts = len(selected_wallets)
-        accounts_per_stream = ACCOUNTS_IN_STREAM
-        num_streams, remainder = divmod(num_accounts, accounts_per_stream)
+        await self.prepare_proxies()
 
-        for stream_index in range(num_streams + (remainder > 0)):
-            start_index = stream_index * accounts_per_stream
-            end_index = (stream_index + 1) * accounts_per_stream if stream_index < num_streams else num_accounts
+        results = {}
+        run_start_time = time.perf_counter()
+        try:
+            num_accounts = len(selected_wallets)
+            accounts_per_stream = self.accounts_in_stream
+            num_streams, remainder = divmod(num_accounts, accounts_per_stream)
+
+            # every wallet of the run that will reach a CEX sweep, it starts once all of them arrived or finished
+            routes = self.load_routes()
+            for account_name, _ in selected_wallets:
+                add_sweep_feeder(account_name, self.get_account_route(routes, account_name, self.batch_mode))
+
+            tasks = {}
+            for stream_index in range(num_streams + (remainder > 0)):
+                start_index = stream_index * accounts_per_stream
+                end_index = (stream_index + 1) * accounts_per_stream if stream_index < num_streams else num_accounts
+
+                accounts = selected_wallets[start_index:end_index]
+
+                stream_tasks = {}
+                for index, data in enumerate(accounts, 1):
+                    account_name, private_key = data
+                    stream_tasks[account_name] = asyncio.create_task(
+                        self.run_account_modules(
+                            account_name, private_key, get_network_by_chain_id(GLOBAL_NETWORK),
+                            self.get_proxy_for_account(account_name), batch_mode=self.batch_mode, index=index))
+                tasks.update(stream_tasks)
+
+                # a wallet waiting for the sweep frees its place, the sweep also waits for wallets of the next streams
+                pending = set(stream_tasks.values())
+                while pending and not all(is_waiting_sweep(account_name) for account_name, task
+                                          in stream_tasks.items() if task in pending):
+                    _, pending = await asyncio.wait(pending, timeout=1)
+
+                self.logger_msg(
+                    None, None, f"Wallets in stream completed their tasks, launching next stream\n", 'success')
+
+            run_results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+            for account_name, result in zip(tasks, run_results):
+                results[account_name] = result is True
+        finally:
+            # an exception must not leave sessions and tasks of this loop to the next asyncio.run of the menu
+            reset_gas_gates()
+            reset_gas_oracles()
+            await close_web3_pool()
+            reset_sweep_jobs()
+            reset_deposit_watchers()
+            if self.profiler:
+                # worker processes send it to the parent profiler like module records
+                emit_event('shared_profile', profile=self.profiler.finish_shared(time.perf_counter() - run_start_time))
 
-            accounts = selected_wallets[start_index:end_index]
+        self.logger_msg(None, None, f"All wallets completed their tasks!\n", 'success')
+        return results
 
-            tasks = []
+    def collect_worker_events(self, events_queue, total_accounts: int, stop_event: threading.Event):
+        finished_accounts = 0
+        while not stop_event.is_set() or not events_queue.empty():
+            try:
+                record = events_queue.get(timeout=0.5)
+            except Exception:
+                continue
 
-            for index, data in enumerate(accounts, 1):
-                account_name, private_key = data
-                tasks.append(asyncio.create_task(
-                    self.run_account_modules(
-                        account_name, private_key, get_network_by_chain_id(GLOBAL_NETWORK),
-                        self.get_proxy_for_account(account_name), index=index)))
+            if record is None:
+                continue
 
-            await asyncio.gather(*tasks, return_exceptions=True)
+            if 'log' in record:
+                self.logger.log(record['level'], record['log'])
+                continue
 
-            self.logger_msg(None, None, f"Wallets in stream completed their tasks, launching next stream\n", 'success')
+            write_event(record)
+            if self.profiler and record.get('profile'):
+                self.profiler.add(record['profile'])
+            if record.get('event') == 'route_finish':
+                finished_accounts += 1
+                self.logger_msg(
+                    None, None, f"Progress: {finished_accounts}/{total_accounts} wallets finished their routes")
 
-        self.logger_msg(None, None, f"All wallets completed their tasks!\n", 'success')
+    async def run_processes(self):
+        from config import ACCOUNT_NAMES, PRIVATE_KEYS, PROXIES, CEX_WALLETS
+
+        selected_wallets = list(self.get_wallets())
+        processes = min(self.processes, len(selected_wallets)) or 1
+        await self.prepare_proxies()
+
+        proxy_latencies = self.proxy_manager.latencies if self.proxy_manager else None
+        max_accounts_per_proxy = math.ceil(self.max_accounts_per_proxy / processes)
+        accounts_data = (ACCOUNT_NAMES, PRIVATE_KEYS, PROXIES, CEX_WALLETS)
+
+        self.logger_msg(None, None, f"Splitting {len(selected_wallets)} wallets between {processes} processes")
+
+        results = {}
+        loop = asyncio.get_running_loop()
+        with multiprocessing.Manager() as manager:
+            events_queue = manager.Queue()
+            stop_event = threading.Event()
+            events_thread = threading.Thread(
+                target=self.collect_worker_events, args=(events_queue, len(selected_wallets), stop_event), daemon=True)
+            events_thread.start()
+
+            try:
+                with ProcessPoolExecutor(max_workers=processes,
+                                         mp_context=multiprocessing.get_context('spawn')) as executor:
+                    workers = [
+                        loop.run_in_executor(
+                            executor, run_worker_process, selected_wallets[index::processes],
+                            self.accounts_in_stream, accounts_data, proxy_latencies, max_accounts_per_proxy,
+                            events_queue, self.batch_mode
+                        )
+                        for index in range(processes)
+                    ]
+                    for worker_results in await asyncio.gather(*workers, return_exceptions=True):
+                        if isinstance(worker_results, Exception):
+                            self.logger_msg(None, None, f"Worker process crashed! Error: {worker_results}", 'error')
+                            continue
+                        results.update(worker_results)
+            finally:
+                stop_event.set()
+                await loop.run_in_executor(None, events_thread.join)
+
+        for account_name, _ in selected_wallets:
+            results.setdefault(account_name, False)
+
+        self.logger_msg(None, None, f"All processes completed their tasks!\n", 'success')
+        return results
 
     async def run_accounts(self):
-        await self.run_parallel()
+        if self.processes > 1:
+            results = await self.run_processes()
+        else:
+            results = await self.run_parallel()
+
+        if self.profiler:
+            self.profiler.report(AVAILABLE_MODULES_INFO)
+        return results
+
+    async def run_wallets_check(self, check_func):
+        selected_wallets = self.get_wallets()
+        await self.prepare_proxies()
+
+        semaphore = asyncio.Semaphore(self.accounts_in_stream)
+
+        async def check_wallet(account_name, private_key):
+            async with semaphore:
+                try:
+                    return await check_func(account_name, private_key, self.get_proxy_for_account(account_name))
+                except Exception as error:
+                    self.logger_msg(account_name, None, f"Check failed! Error: {error}", 'error')
+                    return {'error': str(error)}
+
+        results = await asyncio.gather(*[check_wallet(*wallet) for wallet in selected_wallets])
+        return dict(zip([account_name for account_name, _ in selected_wallets], results))
+
+    async def run_eligibility_scan(self):
+        from modules import StarknetClient, ClaimerStarknet
+        from utils.networks import StarknetRPC
+
+        async def check_eligibility(account_name, private_key, proxy):
+            client = StarknetClient(account_name, private_key, StarknetRPC, proxy)
+            try:
+                await client.initialize_account()
+                eligible_data = ClaimerStarknet(client).get_eligibility()
+            finally:
+                await client.close()
+
+            amount = eligible_data[0] if eligible_data else 0
+            self.logger_msg(*client.acc_info, f"Eligible amount: {amount} $STRK", 'success' if amount else 'warning')
+            return {'address': hex(client.address), 'eligible': bool(eligible_data), 'amount': amount}
+
+        return await self.run_wallets_check(check_eligibility)
+
+    async def run_balances_check(self, token_name: str = 'STRK'):
+        from modules import StarknetClient
+        from utils.networks import StarknetRPC
+
+        async def check_balance(account_name, private_key, proxy):
+            client = StarknetClient(account_name, private_key, StarknetRPC, proxy)
+            try:
+                await client.initialize_account()
+                _, amount, _ = await client.get_token_balance(token_name, check_symbol=False)
+            finally:
+                await client.close()
+
+            self.logger_msg(*client.acc_info, f"Balance: {amount} {token_name}")
+            return {'address': hex(client.address), 'token': token_name, 'amount': amount}
+
+        return await self.run_wallets_check(check_balance)
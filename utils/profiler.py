@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import asyncio
+import cProfile
+
+from collections import defaultdict
+from contextvars import Context, ContextVar
+from datetime import datetime
+
+from modules import Logger
+from settings import PROFILE_MODULES, PROFILE_CPROFILE
+
+PROFILES_PATH = './data/logs/profiles'
+
+CURRENT_PROFILE = ContextVar('current_profile', default=None)
+
+# background work serving every account of the process: gas refresh, CEX sweeps, deposit checks
+SHARED_PROFILE_NAME = 'shared'
+
+TRACE_CONFIGS = []
+
+
+class ModuleProfile:
+    def __init__(self, module_name: str):
+        self.module_name = module_name
+        self.cpu = 0.0
+        self.network = 0.0
+        self.rpc_calls = 0
+        self.retries = 0
+
+    def as_dict(self, wall: float) -> dict:
+        return {
+            'module_name': self.module_name,
+            'wall': round(wall, 3),
+            'cpu': round(self.cpu, 3),
+            'network': round(self.network, 3),
+            'other': round(max(wall - self.cpu - self.network, 0.0), 3),
+            'rpc_calls': self.rpc_calls,
+            'retries': self.retries,
+        }
+
+
+class ProfiledCoroutine:
+    # drives the module coroutine step by step, every step is the time the module holds the event loop
+    def __init__(self, coroutine, profile: ModuleProfile, cprofile: cProfile.Profile = None):
+        self.coroutine = coroutine
+        self.profile = profile
+        self.cprofile = cprofile
+
+    def __await__(self):
+        send_value, error = None, None
+        while True:
+            if self.cprofile:
+                self.cprofile.enable()
+            step_start_time = time.perf_counter()
+            try:
+                if error is None:
+                    future = self.coroutine.send(send_value)
+                else:
+                    future = self.coroutine.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.profile.cpu += time.perf_counter() - step_start_time
+                if self.cprofile:
+                    self.cprofile.disable()
+
+            try:
+                send_value, error = (yield future), None
+            except GeneratorExit:
+                self.coroutine.close()
+                raise
+            except BaseException as exc:
+                send_value, error = None, exc
+
+
+SHARED_PROFILE = ModuleProfile(SHARED_PROFILE_NAME)
+
+
+def create_shared_task(coroutine) -> asyncio.Task:
+    # a task copies the context of the account that started it, the shared one starts from an empty context
+    context = Context()
+    context.run(CURRENT_PROFILE.set, SHARED_PROFILE)
+    return asyncio.create_task(coroutine, context=context)
+
+
+def count_request(duration: float):
+    profile = CURRENT_PROFILE.get()
+    if profile is not None:
+        profile.rpc_calls += 1
+        profile.network += duration
+
+
+def count_retry():
+    profile = CURRENT_PROFILE.get()
+    if profile is not None:
+        profile.retries += 1
+
+
+def get_trace_configs() -> list | None:
+    if not PROFILE_MODULES:
+        return None
+
+    if not TRACE_CONFIGS:
+        from aiohttp import TraceConfig
+
+        async def on_request_start(session, trace_config_ctx, params):
+            trace_config_ctx.start_time = time.perf_counter()
+
+        async def on_request_finish(session, trace_config_ctx, params):
+            count_request(time.perf_counter() - trace_config_ctx.start_time)
+
+        trace_config = TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_finish)
+        trace_config.on_request_exception.append(on_request_finish)
+        TRACE_CONFIGS.append(trace_config)
+
+    return TRACE_CONFIGS
+
+
+async def profile_middleware(make_request, w3):
+    async def middleware(method, params):
+        request_start_time = time.perf_counter()
+        try:
+            return await make_request(method, params)
+        finally:
+            count_request(time.perf_counter() - request_start_time)
+
+    return middleware
+
+
+class ModulesProfiler(Logger):
+    def __init__(self, use_cprofile: bool = PROFILE_CPROFILE):
+        Logger.__init__(self)
+        self.use_cprofile = use_cprofile
+        self.records = defaultdict(list)
+        self.cprofiles = {}
+
+    def start(self, module_name: str) -> ModuleProfile:
+        module_profile = ModuleProfile(module_name)
+        CURRENT_PROFILE.set(module_profile)
+        return module_profile
+
+    def wrap(self, module_profile: ModuleProfile, coroutine) -> ProfiledCoroutine:
+        cprofile = None
+        if self.use_cprofile:
+            cprofile = self.cprofiles.setdefault(module_profile.module_name, cProfile.Profile())
+        return ProfiledCoroutine(coroutine, module_profile, cprofile)
+
+    def finish(self, module_profile: ModuleProfile, wall: float) -> dict:
+        CURRENT_PROFILE.set(None)
+        record = module_profile.as_dict(wall)
+        self.add(record)
+        return record
+
+    def finish_shared(self, wall: float) -> dict:
+        global SHARED_PROFILE
+        shared_profile, SHARED_PROFILE = SHARED_PROFILE, ModuleProfile(SHARED_PROFILE_NAME)
+        record = shared_profile.as_dict(wall)
+        self.add(record)
+        return record
+
+    def add(self, record: dict):
+        self.records[record['module_name']].append(record)
+
+    def get_summary(self, modules_info: dict) -> dict:
+        titles = {module_func.__name__: info[2] for module_func, info in modules_info.items()}
+        titles[SHARED_PROFILE_NAME] = 'Shared background tasks'
+
+        summary = {}
+        for module_name, records in self.records.items():
+            runs = len(records)
+            summary[module_name] = {
+                'title': titles.get(module_name, module_name),
+                'runs': runs,
+                **{
+                    f'{key}_avg': round(sum(record[key] for record in records) / runs, 3)
+                    for key in ('wall', 'cpu', 'network', 'other', 'rpc_calls')
+                },
+                'retries': sum(record['retries'] for record in records),
+            }
+        return summary
+
+    def save_cprofiles(self, timestamp: str) -> list:
+        os.makedirs(PROFILES_PATH, exist_ok=True)
+        saved_paths = []
+        for module_name, cprofile in self.cprofiles.items():
+            file_path = f'{PROFILES_PATH}/{timestamp}-{module_name}-{os.getpid()}.prof'
+            cprofile.dump_stats(file_path)
+            saved_paths.append(file_path)
+        return saved_paths
+
+    def report(self, modules_info: dict):
+        from prettytable import PrettyTable
+
+        timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        summary = self.get_summary(modules_info)
+
+        table = PrettyTable(['Module', 'Runs', 'Wall, s', 'CPU, s', 'Network, s', 'Other, s', 'RPC calls', 'Retries'])
+        for data in summary.values():
+            table.add_row([data['title'], data['runs'], data['wall_avg'], data['cpu_avg'], data['network_avg'],
+                           data['other_avg'], data['rpc_calls_avg'], data['retries']])
+        print(table)
+
+        os.makedirs(PROFILES_PATH, exist_ok=True)
+        with open(f'{PROFILES_PATH}/{timestamp}-summary.json', 'w') as file:
+            json.dump(summary, file, indent=4)
+
+        saved_paths = self.save_cprofiles(timestamp)
+        self.logger_msg(
+            None, None, f"Modules profile saved in {PROFILES_PATH}, cProfile files: {len(saved_paths)}", 'success')
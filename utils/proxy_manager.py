@@ -0,0 +1,151 @@
+import time
+import random
+import asyncio
+
+from collections import Counter
+from contextlib import asynccontextmanager
+from modules import Logger
+from utils.networks import EthereumRPC
+from settings import MAX_ACCOUNTS_PER_PROXY
+
+# the manager of the current run, requests made for no account in particular take their proxy from it
+PROXY_MANAGER = None
+
+
+class ProxyManager(Logger):
+    def __init__(self, proxies: list, max_accounts_per_proxy: int = MAX_ACCOUNTS_PER_PROXY):
+        Logger.__init__(self)
+        self.proxies = list(dict.fromkeys(proxies))
+        self.max_accounts_per_proxy = max(int(max_accounts_per_proxy or 1), 1)
+        self.latencies = {}
+        self.assignment = {}
+        self.semaphores = {proxy: asyncio.Semaphore(self.max_accounts_per_proxy) for proxy in self.proxies}
+        self.failed = set()
+        self.leases = {}
+        self.loads = Counter()
+
+    @staticmethod
+    def get_proxy_info(proxy: str):
+        return proxy[proxy.find("@"):] if "@" in proxy else proxy
+
+    @staticmethod
+    async def check_proxy_latency(proxy: str, timeout: int = 15) -> float | None:
+        from web3 import AsyncWeb3, AsyncHTTPProvider
+
+        try:
+            w3 = AsyncWeb3(AsyncHTTPProvider(random.choice(EthereumRPC.rpc),
+                                             request_kwargs={"proxy": f"http://{proxy}", "timeout": timeout}))
+            start_time = time.perf_counter()
+            if await w3.is_connected():
+                return time.perf_counter() - start_time
+        except Exception:
+            pass
+        return None
+
+    def get_weight(self, proxy: str) -> float:
+        latency = self.latencies.get(proxy)
+        if latency is None or proxy in self.failed:
+            return 0.0
+        return 1 / max(latency, 0.01)
+
+    def healthy_proxies(self) -> list:
+        return [proxy for proxy in self.proxies if self.get_weight(proxy) > 0]
+
+    def assign(self, account_name: str, proxy: str):
+        old_proxy = self.assignment.get(account_name)
+        if old_proxy is not None:
+            self.loads[old_proxy] -= 1
+        self.assignment[account_name] = proxy
+        self.loads[proxy] += 1
+
+    def pick_spare(self, exclude: str = None) -> str | None:
+        candidates = [proxy for proxy in self.healthy_proxies() if proxy != exclude]
+        if not candidates:
+            return None
+
+        # the lightest proxy relative to its health wins, so fast proxies take more accounts
+        return min(candidates, key=lambda proxy: (self.loads[proxy] + 1) / self.get_weight(proxy))
+
+    async def prepare(self, account_names: list, latencies: dict = None):
+        global PROXY_MANAGER
+
+        if latencies is None:
+            self.logger_msg(None, None, f"Measuring {len(self.proxies)} proxies before the run")
+            latencies = dict(zip(self.proxies, await asyncio.gather(
+                *[self.check_proxy_latency(proxy) for proxy in self.proxies])))
+        self.latencies = {proxy: latencies.get(proxy) for proxy in self.proxies}
+
+        healthy_count = len(self.healthy_proxies())
+        if not healthy_count:
+            raise RuntimeError("No working proxy found, check data in accounts_data.xlsx")
+
+        self.assignment = {}
+        self.loads = Counter()
+        moved_accounts = []
+        for account_number, account_name in enumerate(account_names, 1):
+            preferred_proxy = self.proxies[account_number % len(self.proxies)]
+            if self.get_weight(preferred_proxy):
+                self.assign(account_name, preferred_proxy)
+            else:
+                moved_accounts.append(account_name)
+
+        for account_name in moved_accounts:
+            self.assign(account_name, self.pick_spare())
+
+        self.logger_msg(
+            None, None,
+            f"Proxies ready: {healthy_count}/{len(self.proxies)} working, "
+            f"{len(moved_accounts)} accounts moved to spare proxies", 'success')
+        PROXY_MANAGER = self
+
+    def get_proxy(self, account_name: str) -> str | None:
+        return self.assignment.get(account_name)
+
+    async def is_alive(self, proxy: str) -> bool:
+        latency = await self.check_proxy_latency(proxy)
+        if latency is None:
+            self.failed.add(proxy)
+            return False
+        # one failed probe does not retire the proxy for the whole run
+        self.failed.discard(proxy)
+        self.latencies[proxy] = latency
+        return True
+
+    async def failover(self, account_name: str) -> str | None:
+        old_proxy = self.assignment.get(account_name)
+        new_proxy = self.pick_spare(exclude=old_proxy)
+        if new_proxy is None:
+            self.logger_msg(account_name, None, f"There is no working spare proxy left", 'error')
+            return None
+
+        self.release(account_name)
+        self.assign(account_name, new_proxy)
+        await self.acquire(account_name)
+
+        self.logger_msg(
+            account_name, None,
+            f"Proxy {self.get_proxy_info(old_proxy)} failed, moved to {self.get_proxy_info(new_proxy)}", 'warning')
+        return new_proxy
+
+    async def acquire(self, account_name: str):
+        proxy = self.assignment.get(account_name)
+        if proxy in self.semaphores:
+            await self.semaphores[proxy].acquire()
+            self.leases[account_name] = proxy
+
+    def release(self, account_name: str):
+        proxy = self.leases.pop(account_name, None)
+        if proxy is not None:
+            self.semaphores[proxy].release()
+
+    @asynccontextmanager
+    async def lease(self, account_name: str):
+        await self.acquire(account_name)
+        try:
+            yield self.assignment.get(account_name)
+        finally:
+            self.release(account_name)
+
+
+def get_proxy_manager() -> ProxyManager | None:
+    return PROXY_MANAGER
@@ -0,0 +1,81 @@
+import time
+import random
+import asyncio
+
+RATE_LIMITERS = {}
+
+
+class RateLimiter:
+    def __init__(self, requests: int, period: float):
+        self.capacity = max(requests, 1)
+        self.refill_rate = self.capacity / max(period, 0.001)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    async def acquire(self, weight: int = 1) -> float:
+        # every caller books its slot right away, tokens go below zero and the next callers wait in line for them
+        self.refill()
+        self.tokens -= weight
+        delay = -self.tokens / self.refill_rate if self.tokens < 0 else 0.0
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+
+def get_rate_limiter(name: str, requests: int, period: float) -> RateLimiter:
+    if name not in RATE_LIMITERS:
+        RATE_LIMITERS[name] = RateLimiter(requests, period)
+    return RATE_LIMITERS[name]
+
+
+class WeightLimiter:
+    # fixed window limit like Binance request weight, the exchange resets used weight at the start of every window
+    def __init__(self, limit: int, window: int = 60):
+        self.limit = max(limit, 1)
+        self.window = window
+        self.used = 0
+        self.window_start = self.get_window_start()
+        self.blocked_until = 0.0
+
+    def get_window_start(self) -> float:
+        return time.time() // self.window * self.window
+
+    def roll(self):
+        window_start = self.get_window_start()
+        if window_start != self.window_start:
+            self.window_start = window_start
+            self.used = 0
+
+    def update(self, used: int):
+        # the exchange counts every client of the same IP/key, so its number wins when it is higher than ours
+        self.roll()
+        self.used = max(self.used, used)
+
+    def block(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.time() + seconds)
+
+    async def acquire(self, weight: int = 1) -> float:
+        waited = 0.0
+        while True:
+            self.roll()
+            now = time.time()
+            if self.blocked_until > now:
+                delay = self.blocked_until - now
+            elif self.used + weight <= self.limit or self.used == 0:
+                self.used += weight
+                return waited
+            else:
+                delay = self.window_start + self.window - now + random.uniform(0, 1)
+            waited += delay
+            await asyncio.sleep(delay)
+
+
+def get_weight_limiter(name: str, limit: int, window: int = 60) -> WeightLimiter:
+    if name not in RATE_LIMITERS:
+        RATE_LIMITERS[name] = WeightLimiter(limit, window)
+    return RATE_LIMITERS[name]
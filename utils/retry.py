@@ -0,0 +1,136 @@
+import time
+import random
+import asyncio
+
+from contextvars import ContextVar
+from settings import (
+    SLEEP_TIME_RETRY,
+    RETRY_BACKOFF_MAX,
+    RETRY_BUDGET,
+    RETRY_BUDGET_WINDOW,
+    CIRCUIT_FAILURES,
+    CIRCUIT_COOLDOWN
+)
+
+# how fast the pause grows with every attempt for each kind of error
+BACKOFF_FACTORS = {
+    'timeout': 2,
+    'node': 2,
+    'rate_limit': 3,
+    'software': 1.5,
+}
+
+# the pause stops growing long before this, a bigger power of a float factor overflows
+BACKOFF_MAX_EXPONENT = 32
+
+# the nonce is read again on the next attempt, so there is nothing to wait for
+NONCE_RESYNC_SLEEP = (1, 3)
+
+# only these kinds can be caused by a dead proxy, the Runner checks the proxy after them
+NETWORK_ERROR_KINDS = {'timeout', 'node'}
+
+# kind of the last error of the running module, the helper swallows the error itself
+LAST_ERROR_KIND = ContextVar('last_error_kind', default=None)
+
+
+def get_retry_endpoint(worker, error: Exception = None) -> str | None:
+    # CEX modules fail on their exchange API, claimer API errors carry their host, everything else is the client RPC
+    return (getattr(worker, 'class_name', None) or getattr(error, 'endpoint', None)
+            or getattr(worker.client, 'rpc', None))
+
+
+def get_error_kind(error: Exception, error_code=None) -> str:
+    from modules.interfaces import (
+        BlockchainException, BlockchainExceptionWithoutRetry, ErrorCode, RESYNC_NONCE_CODES, classify_error
+    )
+
+    error_code = error_code or classify_error(error)
+    if isinstance(error, asyncio.exceptions.TimeoutError):
+        return 'timeout'
+    if error_code == ErrorCode.RATE_LIMITED:
+        return 'rate_limit'
+    if error_code in RESYNC_NONCE_CODES:
+        return 'nonce'
+    if error_code == ErrorCode.NODE or isinstance(error, (BlockchainException, BlockchainExceptionWithoutRetry)):
+        return 'node'
+    return 'software'
+
+
+def get_backoff_delay(attempt: int, error_kind: str, sleep_time: tuple = SLEEP_TIME_RETRY,
+                      max_delay: int = RETRY_BACKOFF_MAX) -> int:
+    # full jitter: anywhere between the minimum and the grown maximum, so accounts stop retrying in lockstep
+    if error_kind == 'nonce':
+        return random.randint(*NONCE_RESYNC_SLEEP)
+
+    min_time, max_time = sleep_time
+    exponent = min(max(attempt - 1, 0), BACKOFF_MAX_EXPONENT)
+    grown_max_time = max_time * BACKOFF_FACTORS.get(error_kind, 2) ** exponent
+    return round(random.uniform(min_time, max(min(grown_max_time, max_delay), min_time)))
+
+
+class RetryBudget:
+    def __init__(self, retries: int = RETRY_BUDGET, window: int = RETRY_BUDGET_WINDOW):
+        self.capacity = max(retries, 1)
+        self.refill_rate = self.capacity / max(window, 1)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    async def acquire(self) -> float:
+        waited = 0.0
+        while True:
+            self.refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return waited
+            delay = (1 - self.tokens) / self.refill_rate + random.uniform(0, 1)
+            waited += delay
+            await asyncio.sleep(delay)
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int = CIRCUIT_FAILURES, cooldown: int = CIRCUIT_COOLDOWN):
+        self.failures_limit = max(failures, 1)
+        self.cooldown = cooldown
+        self.failures = {}
+        self.opened_until = {}
+
+    def is_open(self, endpoint: str) -> bool:
+        return self.opened_until.get(endpoint, 0) > time.monotonic()
+
+    def record_failure(self, endpoint: str) -> bool:
+        if endpoint is None:
+            return False
+
+        self.failures[endpoint] = self.failures.get(endpoint, 0) + 1
+        if self.failures[endpoint] >= self.failures_limit and not self.is_open(endpoint):
+            self.opened_until[endpoint] = time.monotonic() + self.cooldown
+            # one probe request is let through after the cooldown, a new failure opens the circuit again
+            self.failures[endpoint] = self.failures_limit - 1
+            return True
+        return False
+
+    def record_success(self, endpoint: str):
+        self.failures.pop(endpoint, None)
+        self.opened_until.pop(endpoint, None)
+
+    async def wait(self, endpoint: str) -> float:
+        waited = 0.0
+        while self.is_open(endpoint):
+            delay = self.opened_until[endpoint] - time.monotonic() + random.uniform(0, 3)
+            waited += delay
+            await asyncio.sleep(delay)
+        return waited
+
+    def pick_endpoint(self, endpoints: list, exclude: str = None) -> str | None:
+        candidates = [endpoint for endpoint in endpoints if endpoint != exclude] or list(endpoints)
+        closed_candidates = [endpoint for endpoint in candidates if not self.is_open(endpoint)]
+        return random.choice(closed_candidates or candidates) if candidates else None
+
+
+RETRY_BUDGET_LIMITER = RetryBudget()
+CIRCUIT_BREAKER = CircuitBreaker()
@@ -2,9 +2,8 @@ import json
 import random
 
 from utils.tools import clean_progress_file
+from utils.tx_outbox import clean_outbox
 from functions import *
-from web3 import AsyncWeb3
-from config import ACCOUNT_NAMES
 from modules import Logger
 from settings import CLASSIC_ROUTES_MODULES_USING
 
@@ -30,7 +29,6 @@ def get_func_by_name(module_name, help_message:bool = False):
 class RouteGenerator(Logger):
     def __init__(self):
         super().__init__()
-        self.w3 = AsyncWeb3()
 
     @staticmethod
     def classic_generate_route():
@@ -44,7 +42,9 @@ class RouteGenerator(Logger):
         return route
 
     def classic_routes_json_save(self):
+        from config import ACCOUNT_NAMES
         clean_progress_file()
+        clean_outbox()
         with open('./data/services/wallets_progress.json', 'w') as file:
             accounts_data = {}
             for account_name in ACCOUNT_NAMES:
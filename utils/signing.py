@@ -0,0 +1,92 @@
+import asyncio
+import multiprocessing
+
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from settings import SIGNING_EXECUTOR, SIGNING_WORKERS
+
+SIGNING_POOLS = {}
+
+# Starknet accounts of this process that sign without the node, by their signing data
+OFFLINE_ACCOUNTS = {}
+
+
+def get_signing_pool(executor_type: str | None = SIGNING_EXECUTOR) -> Executor | None:
+    if executor_type not in ('thread', 'process'):
+        return None
+
+    if executor_type not in SIGNING_POOLS:
+        if executor_type == 'process':
+            SIGNING_POOLS[executor_type] = ProcessPoolExecutor(
+                max_workers=SIGNING_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        else:
+            SIGNING_POOLS[executor_type] = ThreadPoolExecutor(
+                max_workers=SIGNING_WORKERS, thread_name_prefix='signer')
+    return SIGNING_POOLS[executor_type]
+
+
+async def run_signing(func, *args, executor_type: str | None = SIGNING_EXECUTOR):
+    pool = get_signing_pool(executor_type)
+    if pool is None:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+
+
+def sign_evm_transaction(transaction: dict, private_key: str) -> bytes:
+    from eth_account import Account
+
+    return bytes(Account.sign_transaction(transaction, private_key).rawTransaction)
+
+
+def run_without_loop(coroutine):
+    # starknet-py builds and signs in coroutines that never wait once nonce, fee and cairo version are known
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coroutine.close()
+    raise RuntimeError('Signing coroutine tried to wait for I/O')
+
+
+def get_offline_account(rpc: str, address: int, chain_id, cairo_version: int, private_key: int | None = None):
+    from starknet_py.net.account.account import Account
+    from starknet_py.net.full_node_client import FullNodeClient
+    from starknet_py.net.signer.base_signer import BaseSigner
+    from starknet_py.net.signer.stark_curve_signer import KeyPair
+
+    key = rpc, address, chain_id, cairo_version, private_key
+    if key in OFFLINE_ACCOUNTS:
+        return OFFLINE_ACCOUNTS[key]
+
+    class OfflineAccount(Account):
+        # the node is never asked for the cairo version, so a signing process needs no session and no proxy
+        @property
+        async def cairo_version(self) -> int:
+            return cairo_version
+
+    class UnsignedSigner(BaseSigner):
+        @property
+        def public_key(self) -> int:
+            return 0
+
+        def sign_transaction(self, transaction) -> list:
+            return []
+
+        def sign_message(self, typed_data, account_address: int) -> list:
+            raise NotImplementedError
+
+    signer_kwargs = {'key_pair': KeyPair.from_private_key(private_key)} if private_key else {'signer': UnsignedSigner()}
+    OFFLINE_ACCOUNTS[key] = OfflineAccount(
+        address=address, client=FullNodeClient(node_url=rpc), chain=chain_id, **signer_kwargs)
+    return OFFLINE_ACCOUNTS[key]
+
+
+def sign_starknet_invoke(account_data: tuple, private_key: int | None, calls, nonce: int, max_fee: int):
+    # without private_key the transaction is built with an empty signature
+    account = get_offline_account(*account_data, private_key=private_key)
+    return run_without_loop(account.sign_invoke_v1(calls, nonce=nonce, max_fee=max_fee))
+
+
+def shutdown_signing_pools():
+    for pool in SIGNING_POOLS.values():
+        pool.shutdown(wait=False, cancel_futures=True)
+    SIGNING_POOLS.clear()
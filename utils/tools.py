@@ -1,17 +1,19 @@
 import io
+import sys
 import json
 import os
+import time
+import zlib
 import random
+import struct
 import asyncio
+import hashlib
 import functools
 import traceback
 
-import msoffcrypto
-import pandas as pd
-
 from getpass import getpass
+from contextlib import contextmanager
 from termcolor import cprint
-from msoffcrypto.exceptions import DecryptionError, InvalidKeyError
 from settings import (
     SLEEP_TIME_RETRY,
     MAXIMUM_RETRY,
@@ -19,6 +21,16 @@ from settings import (
     EXCEL_PAGE_NAME
 )
 
+if sys.platform == 'win32':
+    import msvcrt
+else:
+    import fcntl
+
+ACCOUNTS_DATA_PATH = './data/accounts_data.xlsx'
+ACCOUNTS_CACHE_PATH = './data/services/accounts_cache.bin'
+# changed together with the layout of the cached table data, an old cache is read from the workbook again
+ACCOUNTS_CACHE_MAGIC = b'SCACHE2'
+
 
 async def sleep(self, min_time, max_time):
     duration = random.randint(min_time, max_time)
@@ -28,69 +40,180 @@ async def sleep(self, min_time, max_time):
 
 
 def get_accounts_data(page_name:str = None):
-    decrypted_data = io.BytesIO()
     sheet_page_name = page_name if page_name else EXCEL_PAGE_NAME
-    with open('./data/accounts_data.xlsx', 'rb') as file:
-        if EXCEL_PASSWORD:
-            cprint('⚔️ Enter the password degen', color='light_blue')
-            password = getpass()
-            office_file = msoffcrypto.OfficeFile(file)
-
-            try:
-                office_file.load_key(password=password)
-            except msoffcrypto.exceptions.DecryptionError:
-                cprint('\n⚠️ Incorrect password to decrypt Excel file! ⚠️\n', color='light_red', attrs=["blink"])
-                raise DecryptionError('Incorrect password')
-
-            try:
-                office_file.decrypt(decrypted_data)
-            except msoffcrypto.exceptions.InvalidKeyError:
-                cprint('\n⚠️ Incorrect password to decrypt Excel file! ⚠️\n', color='light_red', attrs=["blink"])
-                raise InvalidKeyError('Incorrect password')
-
-            except msoffcrypto.exceptions.DecryptionError:
-                cprint('\n⚠️ Set password on your Excel file first! ⚠️\n', color='light_red', attrs=["blink"])
-                raise DecryptionError('Excel without password')
-
-            office_file.decrypt(decrypted_data)
-
-            try:
-                wb = pd.read_excel(decrypted_data, sheet_name=sheet_page_name)
-            except ValueError as error:
-                cprint('\n⚠️ Wrong page name! ⚠️\n', color='light_red', attrs=["blink"])
-                raise ValueError(f"{error}")
-        else:
-            try:
-                wb = pd.read_excel(file, sheet_name=sheet_page_name)
-            except ValueError as error:
-                cprint('\n⚠️ Wrong page name! ⚠️\n', color='light_red', attrs=["blink"])
-                raise ValueError(f"{error}")
-
-        accounts_data = {}
-        for index, row in wb.iterrows():
-            account_name = row["Name"]
-            private_key = row["Private Key"]
-            proxy = row["Proxy"]
-            cex_address = row['CEX address']
-            accounts_data[int(index) + 1] = {
-                "account_name": account_name,
-                "private_key": private_key,
-                "proxy": proxy,
-                "cex_wallet": cex_address,
-            }
+    password = None
+    if EXCEL_PASSWORD:
+        cprint('⚔️ Enter the password degen', color='light_blue')
+        password = getpass()
+
+    with open(ACCOUNTS_DATA_PATH, 'rb') as file:
+        workbook_bytes = file.read()
+
+    workbook_stat = os.stat(ACCOUNTS_DATA_PATH)
+    cache_key = {
+        'mtime': workbook_stat.st_mtime_ns,
+        'size': workbook_stat.st_size,
+        'sha256': hashlib.sha256(workbook_bytes).hexdigest(),
+        'sheet': sheet_page_name,
+    }
 
-        acc_name, priv_key, proxy, cex_wallet = [], [], [], []
-        for k, v in accounts_data.items():
-            if isinstance(v['account_name'], str):
-                acc_name.append(v['account_name'])
-                priv_key.append(v['private_key'])
-            proxy.append(v['proxy'] if isinstance(v['proxy'], str) else None)
-            cex_wallet.append(v['cex_wallet'] if isinstance(v['cex_wallet'], str) else None)
+    accounts_data = load_accounts_cache(cache_key, password)
+    if accounts_data is None:
+        accounts_data = read_accounts_workbook(io.BytesIO(workbook_bytes), sheet_page_name, password)
+        save_accounts_cache(cache_key, accounts_data, password)
+
+    return accounts_data
+
+
+def get_cache_cipher(password: str, salt: bytes, nonce: bytes = None):
+    from Crypto.Cipher import AES
+    from Crypto.Protocol.KDF import scrypt
+
+    key = scrypt(password.encode('utf-8'), salt, key_len=32, N=2 ** 14, r=8, p=1)
+    return AES.new(key, AES.MODE_GCM, nonce=nonce)
+
+
+def load_accounts_cache(cache_key: dict, password: str | None = None):
+    try:
+        with open(ACCOUNTS_CACHE_PATH, 'rb') as file:
+            cache_data = file.read()
+
+        if not cache_data.startswith(ACCOUNTS_CACHE_MAGIC):
+            return None
+
+        offset = len(ACCOUNTS_CACHE_MAGIC)
+        encrypted, header_length = struct.unpack_from('>?I', cache_data, offset)
+        offset += struct.calcsize('>?I')
+        header = cache_data[offset:offset + header_length]
+        payload = cache_data[offset + header_length:]
+
+        if json.loads(header) != cache_key or encrypted != bool(password):
+            return None
+
+        if encrypted:
+            salt, nonce, tag, payload = payload[:16], payload[16:32], payload[32:48], payload[48:]
+            cipher = get_cache_cipher(password, salt, nonce)
+            cipher.update(header)
+            payload = cipher.decrypt_and_verify(payload, tag)
+
+        return tuple(json.loads(zlib.decompress(payload)))
+    except Exception:
+        return None
+
+
+def save_accounts_cache(cache_key: dict, accounts_data: tuple, password: str | None = None):
+    header = json.dumps(cache_key).encode('utf-8')
+    payload = zlib.compress(json.dumps(accounts_data).encode('utf-8'))
+
+    if password:
+        salt = os.urandom(16)
+        cipher = get_cache_cipher(password, salt)
+        cipher.update(header)
+        payload, tag = cipher.encrypt_and_digest(payload)
+        payload = salt + cipher.nonce + tag + payload
+
+    try:
+        temp_path = f'{ACCOUNTS_CACHE_PATH}.tmp'
+        with open(temp_path, 'wb') as file:
+            file.write(ACCOUNTS_CACHE_MAGIC + struct.pack('>?I', bool(password), len(header)) + header + payload)
+        os.replace(temp_path, ACCOUNTS_CACHE_PATH)
+    except OSError as error:
+        cprint(f'⚠️ Can`t save accounts cache: {error}', color='light_yellow')
+
+
+def decrypt_accounts_workbook(file, password: str):
+    import msoffcrypto
+    from msoffcrypto.exceptions import DecryptionError, InvalidKeyError
+
+    decrypted_data = io.BytesIO()
+    office_file = msoffcrypto.OfficeFile(file)
+
+    try:
+        office_file.load_key(password=password)
+    except msoffcrypto.exceptions.DecryptionError:
+        cprint('\n⚠️ Incorrect password to decrypt Excel file! ⚠️\n', color='light_red', attrs=["blink"])
+        raise DecryptionError('Incorrect password')
+
+    try:
+        office_file.decrypt(decrypted_data)
+    except msoffcrypto.exceptions.InvalidKeyError:
+        cprint('\n⚠️ Incorrect password to decrypt Excel file! ⚠️\n', color='light_red', attrs=["blink"])
+        raise InvalidKeyError('Incorrect password')
+
+    except msoffcrypto.exceptions.DecryptionError:
+        cprint('\n⚠️ Set password on your Excel file first! ⚠️\n', color='light_red', attrs=["blink"])
+        raise DecryptionError('Excel without password')
+
+    decrypted_data.seek(0)
+    return decrypted_data
+
+
+def read_accounts_workbook(file, sheet_page_name: str, password: str | None = None):
+    from openpyxl import load_workbook
+
+    if password is not None:
+        file = decrypt_accounts_workbook(file, password)
+
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        if sheet_page_name not in wb.sheetnames:
+            cprint('\n⚠️ Wrong page name! ⚠️\n', color='light_red', attrs=["blink"])
+            raise ValueError(f"Worksheet named '{sheet_page_name}' not found")
 
-        proxy = [item for item in proxy if item is not None]
-        cex_wallet = [item for item in cex_wallet if item is not None]
+        sheet = wb[sheet_page_name]
+        header = next(sheet.iter_rows(max_row=1, values_only=True), ())
+        column_names = ("Name", "Private Key", "Proxy", "CEX address")
+        try:
+            columns = [header.index(column_name) for column_name in column_names]
+        except ValueError:
+            missing_columns = [column_name for column_name in column_names if column_name not in header]
+            raise KeyError(f"Missing columns in {sheet_page_name} page: {', '.join(missing_columns)}")
+
+        min_column = min(columns)
+        name_column, key_column, proxy_column, cex_column = [column - min_column for column in columns]
 
-        return acc_name, priv_key, proxy, cex_wallet
+        acc_name, priv_key, proxy, cex_wallet = [], [], [], []
+        for row in sheet.iter_rows(min_row=2, min_col=min_column + 1, max_col=max(columns) + 1, values_only=True):
+            row_length = len(row)
+            account_name = row[name_column] if name_column < row_length else None
+            proxy_value = row[proxy_column] if proxy_column < row_length else None
+            cex_address = row[cex_column] if cex_column < row_length else None
+
+            # the key and the CEX address belong to the name of their row, an empty cell stays in its place
+            if isinstance(account_name, str):
+                acc_name.append(account_name)
+                priv_key.append(row[key_column] if key_column < row_length else None)
+                cex_wallet.append(cex_address if isinstance(cex_address, str) else None)
+            if isinstance(proxy_value, str):
+                proxy.append(proxy_value)
+    finally:
+        wb.close()
+
+    return acc_name, priv_key, proxy, cex_wallet
+
+
+@contextmanager
+def file_lock(file_path: str):
+    # the OS drops the lock when its process dies, a killed worker never leaves the file locked for the others
+    with open(f'{file_path}.lock', 'a') as lock_file:
+        if sys.platform == 'win32':
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+        else:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if sys.platform == 'win32':
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
 
 
 def clean_stark_file():
@@ -130,14 +253,21 @@ def save_buy_tx(account_name, amount):
 
 def create_okx_withdrawal_list():
     from config import ACCOUNT_NAMES, CEX_WALLETS
-    okx_data = {}
-
-    if ACCOUNT_NAMES and CEX_WALLETS:
-        with open('./data/services/cex_withdraw_list.json', 'w') as file:
-            for account_name, okx_wallet in zip(ACCOUNT_NAMES, CEX_WALLETS):
-                okx_data[account_name] = okx_wallet
-            json.dump(okx_data, file, indent=4)
-        cprint('✅ Successfully added and saved CEX wallets data', 'light_blue')
+    from utils.address_book import build_address_book, save_address_book
+
+    if ACCOUNT_NAMES and any(CEX_WALLETS):
+        address_book, errors = build_address_book(ACCOUNT_NAMES, CEX_WALLETS)
+        if errors:
+            for error in errors:
+                cprint(f'❌ {error}', 'light_red')
+            cprint('❌ Fix CEX wallets in the table, nothing was saved', 'light_red')
+            return
+
+        save_address_book(address_book)
+        cprint(f'✅ Successfully added and saved {len(address_book)} CEX wallets', 'light_blue')
+        missing_wallets = [account_name for account_name in ACCOUNT_NAMES if account_name not in address_book]
+        if missing_wallets:
+            cprint(f'⚠️ No CEX wallet for: {", ".join(missing_wallets)}', 'light_yellow')
         cprint('⚠️ Check all CEX deposit wallets by yourself to avoid problems', 'light_yellow', attrs=["blink"])
     else:
         cprint('❌ Put your wallets into files, before running this function', 'light_red')
@@ -148,7 +278,14 @@ def helper(func):
     async def wrapper(self, *args, **kwargs):
         from modules.interfaces import (
             PriceImpactException,BlockchainException, SoftwareException, SoftwareExceptionWithoutRetry,
-            BlockchainExceptionWithoutRetry
+            BlockchainExceptionWithoutRetry, ErrorCode, NON_RETRYABLE_CODES, RESYNC_NONCE_CODES, classify_error
+        )
+
+        from utils.events import emit_event
+        from utils.profiler import count_retry
+        from utils.retry import (
+            CIRCUIT_BREAKER, LAST_ERROR_KIND, RETRY_BUDGET_LIMITER, get_retry_endpoint, get_error_kind,
+            get_backoff_delay
         )
 
         attempts = 0
@@ -156,14 +293,21 @@ def helper(func):
         try:
             while attempts <= MAXIMUM_RETRY:
                 try:
-                    return await func(self, *args, **kwargs)
+                    result = await func(self, *args, **kwargs)
+                    CIRCUIT_BREAKER.record_success(get_retry_endpoint(self))
+                    return result
                 except (PriceImpactException, BlockchainException, SoftwareException, SoftwareExceptionWithoutRetry,
                         BlockchainExceptionWithoutRetry, asyncio.exceptions.TimeoutError, ValueError) as err:
                     error = err
+                    error_code = classify_error(err)
+                    error_kind = get_error_kind(err, error_code)
+                    LAST_ERROR_KIND.set(error_kind)
                     attempts += 1
 
                     msg = f'{error} | Try[{attempts}/{MAXIMUM_RETRY + 1}]'
                     if isinstance(error, asyncio.exceptions.TimeoutError):
+                        emit_event('rpc_error', endpoint=getattr(self.client, 'rpc', None), error='timeout')
+                        CIRCUIT_BREAKER.record_failure(get_retry_endpoint(self, err))
                         error = 'Connection to RPC is not stable'
                         await self.client.change_rpc()
                         msg = f'{error} | Try[{attempts}/{MAXIMUM_RETRY + 1}]'
@@ -172,44 +316,68 @@ def helper(func):
                         stop_flag = True
                         msg = f'{error}'
 
-                    elif isinstance(error, (BlockchainException, BlockchainExceptionWithoutRetry)):
-
-                        if any([i in str(error) for i in ['insufficient funds', 'gas required']]):
-                            stop_flag = True
-                            network_name = self.client.network.name
+                    elif error_code in NON_RETRYABLE_CODES:
+                        stop_flag = True
+                        network_name = self.client.network.name
+                        if error_code == ErrorCode.INSUFFICIENT_FUNDS:
                             msg = f'Insufficient funds on {network_name}, software will stop this action\n'
-                        elif 'execution reverted' in str(error):
-                            stop_flag = True
-                            network_name = self.client.network.name
+                        elif error_code == ErrorCode.EXECUTION_REVERTED:
                             msg = f'Contract execution reverted on {network_name}, software will stop this action\n'
                         else:
-                            if isinstance(error, BlockchainExceptionWithoutRetry):
-                                stop_flag = True
-                                msg = f'{error}'
+                            msg = f'{error} | {error_code.value}, software will stop this action\n'
 
-                            self.logger_msg(
-                                self.client.account_name,
-                                None, msg=f'Maybe problem with node: {self.client.rpc}', type_msg='warning')
-                            await self.client.change_rpc()
+                    elif error_code in RESYNC_NONCE_CODES:
+                        msg = f'{error} | Nonce will be synced again | Try[{attempts}/{MAXIMUM_RETRY + 1}]'
+
+                    elif (isinstance(error, (BlockchainException, BlockchainExceptionWithoutRetry))
+                          or error_code == ErrorCode.NODE):
+                        if isinstance(error, BlockchainExceptionWithoutRetry):
+                            stop_flag = True
+                            msg = f'{error}'
+
+                        emit_event('rpc_error', endpoint=self.client.rpc, error=str(error))
+                        CIRCUIT_BREAKER.record_failure(get_retry_endpoint(self, err))
+                        self.logger_msg(
+                            self.client.account_name,
+                            None, msg=f'Maybe problem with node: {self.client.rpc}', type_msg='warning')
+                        await self.client.change_rpc()
 
                     self.logger_msg(self.client.account_name, None, msg=msg, type_msg='error')
 
                     if stop_flag:
                         break
 
+                    if error_kind == 'rate_limit':
+                        CIRCUIT_BREAKER.record_failure(get_retry_endpoint(self, err))
+
+                    delay = get_backoff_delay(attempts, error_kind, SLEEP_TIME_RETRY)
+                    emit_event('retry', attempt=attempts, error_type=type(err).__name__, stop=stop_flag,
+                               function=func.__name__, error_code=error_code.value, error_kind=error_kind, delay=delay)
+                    count_retry()
+
                     if attempts > MAXIMUM_RETRY:
                         self.logger_msg(self.client.account_name,
                                         None, msg=f"Tries are over, software will stop module\n", type_msg='error')
                     else:
-                        await sleep(self, *SLEEP_TIME_RETRY)
+                        await sleep(self, delay, delay)
+
+                        endpoint = get_retry_endpoint(self, err)
+                        if CIRCUIT_BREAKER.is_open(endpoint):
+                            self.logger_msg(
+                                self.client.account_name, None,
+                                msg=f'{endpoint} is failing for all wallets, retries are paused', type_msg='warning')
+                            await CIRCUIT_BREAKER.wait(endpoint)
+                        await RETRY_BUDGET_LIMITER.acquire()
 
                 except Exception as error:
+                    LAST_ERROR_KIND.set(get_error_kind(error))
                     msg = f'Unknown Error. Description: {error}'
                     self.logger_msg(self.client.account_name, None, msg=msg, type_msg='error')
                     traceback.print_exc()
                     break
         finally:
-            await self.client.session.close()
+            if not self.client.managed:
+                await self.client.close()
         return False
     return wrapper
 
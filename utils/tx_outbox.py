@@ -0,0 +1,84 @@
+import os
+import json
+import hashlib
+import time
+import asyncio
+
+from utils.tools import file_lock
+
+TX_OUTBOX_PATH = './data/services/tx_outbox.json'
+
+
+def get_call_id(calls) -> str:
+    # a step can send several transactions, each one gets its own entry by the calls it carries
+    return hashlib.sha256(repr(calls).encode()).hexdigest()[:16]
+
+
+def get_outbox_key(module_name: str, step: int, call_id: str = None) -> str:
+    return f'{module_name}:{step}:{call_id}' if call_id else f'{module_name}:{step}:'
+
+
+def load_outbox() -> dict:
+    try:
+        with open(TX_OUTBOX_PATH) as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def update_outbox(update_func):
+    # the same write-then-replace as wallets_progress.json, a crash never leaves a half written file
+    with file_lock(TX_OUTBOX_PATH):
+        outbox = load_outbox()
+        update_func(outbox)
+        with open(f'{TX_OUTBOX_PATH}.tmp', 'w') as file:
+            json.dump(outbox, file, indent=4)
+        os.replace(f'{TX_OUTBOX_PATH}.tmp', TX_OUTBOX_PATH)
+
+
+async def save_pending_tx(account_name: str, module_name: str, step: int, call_id: str, tx_hash: int):
+    def add_tx(outbox: dict):
+        outbox.setdefault(str(account_name), {})[get_outbox_key(module_name, step, call_id)] = {
+            'tx_hash': hex(tx_hash),
+            'ts': round(time.time(), 3),
+        }
+
+    # file I/O and the lock wait go to a thread, the event loop keeps serving the other accounts
+    await asyncio.to_thread(update_outbox, add_tx)
+
+
+async def get_pending_tx(account_name: str, module_name: str, step: int, call_id: str) -> int | None:
+    outbox = await asyncio.to_thread(load_outbox)
+    pending_tx = outbox.get(str(account_name), {}).get(get_outbox_key(module_name, step, call_id))
+    return int(pending_tx['tx_hash'], 16) if pending_tx else None
+
+
+async def get_step_txs(account_name: str, module_name: str, step: int) -> list[int]:
+    outbox = await asyncio.to_thread(load_outbox)
+    step_key = get_outbox_key(module_name, step)
+    return [int(pending_tx['tx_hash'], 16) for key, pending_tx in outbox.get(str(account_name), {}).items()
+            if key.startswith(step_key)]
+
+
+async def remove_pending_tx(account_name: str, module_name: str, step: int, call_id: str = None):
+    # without call_id every transaction of the step is removed
+    key = get_outbox_key(module_name, step, call_id)
+
+    def is_removed(account_key: str) -> bool:
+        return account_key == key if call_id else account_key.startswith(key)
+
+    if not any(map(is_removed, (await asyncio.to_thread(load_outbox)).get(str(account_name), {}))):
+        return
+
+    def remove_tx(outbox: dict):
+        account_txs = outbox.get(str(account_name), {})
+        for account_key in list(filter(is_removed, account_txs)):
+            account_txs.pop(account_key)
+        if not account_txs:
+            outbox.pop(str(account_name), None)
+
+    await asyncio.to_thread(update_outbox, remove_tx)
+
+
+def clean_outbox():
+    update_outbox(lambda outbox: outbox.clear())
@@ -0,0 +1,80 @@
+import asyncio
+
+from settings import PROFILE_MODULES, POOL_CONNECTIONS
+
+# one AsyncWeb3 per (rpc, proxy) and one aiohttp connector per proxy for every EVM client of the process
+WEB3_POOL = {}
+CONNECTORS_POOL = {}
+SESSIONS_POOL = {}
+
+
+def get_running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def get_pooled_w3(rpc: str, proxy: str | None = None):
+    from web3 import AsyncHTTPProvider, AsyncWeb3
+    from utils.profiler import profile_middleware
+
+    # the provider keeps its aiohttp session in the web3 cache by endpoint, the proxy goes with every request
+    if (rpc, proxy) not in WEB3_POOL:
+        request_kwargs = {"proxy": f"http://{proxy}"} if proxy else {}
+        w3 = AsyncWeb3(AsyncHTTPProvider(rpc, request_kwargs=request_kwargs))
+        if PROFILE_MODULES:
+            w3.middleware_onion.add(profile_middleware, 'profile')
+        WEB3_POOL[rpc, proxy] = w3
+    return WEB3_POOL[rpc, proxy]
+
+
+def get_pooled_connector(proxy: str | None = None):
+    from aiohttp import TCPConnector
+    from aiohttp_socks import ProxyConnector
+
+    # only connections are shared, cookies stay in the session of every account
+    loop = get_running_loop()
+    connector_loop, connector = CONNECTORS_POOL.get(proxy, (None, None))
+    if connector is None or connector.closed or connector_loop is not loop:
+        connector = ProxyConnector.from_url(f"http://{proxy}", verify_ssl=False, limit=POOL_CONNECTIONS) \
+            if proxy else TCPConnector(verify_ssl=False, limit=POOL_CONNECTIONS)
+        CONNECTORS_POOL[proxy] = loop, connector
+    return connector
+
+
+def get_client_session(proxy: str | None = None):
+    from aiohttp import ClientSession
+    from utils.profiler import get_trace_configs
+
+    return ClientSession(connector=get_pooled_connector(proxy), connector_owner=False,
+                         trace_configs=get_trace_configs())
+
+
+def get_pooled_session(proxy: str | None = None):
+    from aiohttp import ClientSession, DummyCookieJar
+    from utils.profiler import get_trace_configs
+
+    # shared by requests of no account, so it keeps no cookies at all
+    loop = get_running_loop()
+    session_loop, session = SESSIONS_POOL.get(proxy, (None, None))
+    if session is None or session.closed or session_loop is not loop:
+        session = ClientSession(connector=get_pooled_connector(proxy), connector_owner=False,
+                                cookie_jar=DummyCookieJar(), trace_configs=get_trace_configs())
+        SESSIONS_POOL[proxy] = loop, session
+    return session
+
+
+async def close_web3_pool():
+    # connectors are bound to the loop they were created in, so the pool is closed before the loop ends
+    sessions = [session for _, session in SESSIONS_POOL.values()]
+    connectors = [connector for _, connector in CONNECTORS_POOL.values()]
+    SESSIONS_POOL.clear()
+    CONNECTORS_POOL.clear()
+    WEB3_POOL.clear()
+    for session in sessions:
+        if not session.closed:
+            await session.close()
+    for connector in connectors:
+        if not connector.closed:
+            await connector.close()